@@ -1,5 +1,30 @@
-from .core import MTaseAnalyzer
+from .core import MOTIF_PATTERNS, MTaseAnalyzer
+from .engine import StructureSnapshot, SnapshotGeometry, TopologyParams, TopologyResult, analyze_snapshot, s2_direction
+from .chains import analyze_motifs_snapshot, group_identical_chains
+from .linear import TopologyElement, linear_elements, format_elements, topology_strings
+from .report import StrandRow, strand_table, format_strand_table
+from .sweep import parameter_grid, sweep_snapshot
+from .logs import configure_logging, logger
+from .tracing import NULL_TRACER, TraceWriter, Tracer, write_trace
 from .topology import *
 from .coordinates import *
-from .visualization_2d import *
-from .visualization_3d import *
\ No newline at end of file
+from .lazy import lazy_method
+
+import importlib
+
+# Методы визуализации (matplotlib, plotly, py3Dmol): модуль загружается при первом вызове
+_VISUALIZATIONS = {
+    'visualize_topology_interactive': '.visualization_2d',
+    '_merge_display_helices': '.visualization_2d',
+    'visualize_3d_structure': '.visualization_3d'
+}
+for _name, _module in _VISUALIZATIONS.items():
+    lazy_method(MTaseAnalyzer, _name, _module)
+del _name, _module
+
+
+def __getattr__(name):
+    # Функции визуализации как атрибуты пакета (analyzer.visualize_3d_structure)
+    if name in _VISUALIZATIONS and not name.startswith('_'):
+        return getattr(importlib.import_module(_VISUALIZATIONS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
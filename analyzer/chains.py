@@ -0,0 +1,224 @@
+"""
+Группировка идентичных цепей и параллельный анализ мотивов.
+
+Цепи гомоолигомера с одинаковой последовательностью, строкой DSSP и
+(приблизительно) одинаковой геометрией анализируются один раз, результат
+переносится на остальные копии. Разные цепи считаются параллельно.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .core import MTaseAnalyzer
+from .engine import analyze_snapshot, chain_coordinate_system, is_s2_down, s2_direction, same_topology
+from .lazy import distance_matrix
+from .tracing import NULL_TRACER
+
+# Шаг округления (Å) расстояний между центрами SSE в отпечатке геометрии
+GEOMETRY_TOLERANCE = 0.5
+
+
+def chain_fingerprint(snapshot, chain, tolerance=GEOMETRY_TOLERANCE):
+    """
+    Ключ цепи: (последовательность, строка DSSP, номера остатков, отпечаток геометрии).
+    Геометрия - округленная матрица расстояний между центрами тяжей и спиралей,
+    она не зависит от положения цепи в ассамблее.
+    """
+    rows = snapshot.chain_rows(chain)
+    strand_ids = snapshot.chain_strand_ids(chain)
+    helix_ids = snapshot.chain_helix_ids(chain)
+    centers = np.concatenate([snapshot.strand_center[strand_ids], snapshot.helix_center[helix_ids]])
+    geometry = np.round(distance_matrix(centers, centers) / tolerance).astype(int) if len(centers) else np.zeros(0)
+    return (
+        ''.join(snapshot.sequence[r] for r in rows),
+        ''.join(snapshot.ss[r] for r in rows),
+        snapshot.res_nums[rows].tobytes(),
+        (len(strand_ids), len(helix_ids)),
+        geometry.tobytes()
+    )
+
+
+def group_identical_chains(snapshot, tolerance=GEOMETRY_TOLERANCE):
+    """{представитель: [все цепи группы]} в порядке появления цепей"""
+    groups = {}
+    representative = {}
+    for chain in dict.fromkeys(snapshot.chains):
+        key = chain_fingerprint(snapshot, chain, tolerance)
+        rep = representative.setdefault(key, chain)
+        groups.setdefault(rep, []).append(chain)
+    return groups
+
+
+def remap_result(snapshot, topology, motif):
+    """Перенос результата с цепи-представителя на идентичную цепь мотива"""
+    chain = motif.get('chain', 'A')
+    if topology is None or topology.chain == chain:
+        return topology
+
+    # Позиции тяжей и спиралей в цепи-представителе совпадают с позициями в копии
+    # (результат может содержать не все SSE цепи, см. TopologyParams.crop_radius)
+    strand_pos = {s_id: i for i, s_id in enumerate(snapshot.chain_strand_ids(topology.chain))}
+    helix_pos = {h_id: i for i, h_id in enumerate(snapshot.chain_helix_ids(topology.chain))}
+    chain_strands = snapshot.chain_strand_ids(chain)
+    chain_helices = snapshot.chain_helix_ids(chain)
+    strand_ids = [chain_strands[strand_pos[s_id]] for s_id in topology.strand_ids]
+    helix_ids = [chain_helices[helix_pos[h_id]] for h_id in topology.helix_ids]
+
+    # Векторы зависят от положения цепи, поэтому систему координат и v4 считаем заново
+    coord_system = chain_coordinate_system(snapshot, chain, strand_ids, topology.s4_idx, topology.s3_idx)
+    v4 = snapshot.strand_vector[strand_ids[topology.s4_idx]]
+
+    return topology._replace(
+        chain=chain,
+        motif_text=motif.get('text'),
+        motif_res=motif.get('res'),
+        s4_global_idx=motif['s4_idx'],
+        strand_ids=tuple(strand_ids),
+        helix_ids=tuple(helix_ids),
+        v4=tuple(v4.tolist()),
+        helices=tuple(h._replace(helix_id=chain_helices[helix_pos[h.helix_id]]) for h in topology.helices),
+        coord_system=coord_system
+    )
+
+
+def _representative_motif(snapshot, motif, rep_of):
+    """Мотив, перенесенный на цепь-представителя (тот же локальный индекс S4)"""
+    chain = motif.get('chain', 'A')
+    rep = rep_of.get(chain, chain)
+    if rep == chain:
+        return motif
+    strand_ids = snapshot.chain_strand_ids(chain)
+    if motif['s4_idx'] not in strand_ids:
+        return motif
+    local_idx = strand_ids.index(motif['s4_idx'])
+    return dict(motif,
+                chain=rep,
+                key=f"{rep}:{motif['res']}",
+                s4_idx=snapshot.chain_strand_ids(rep)[local_idx])
+
+
+def _representatives(groups):
+    """{цепь: её цепь-представитель} по group_identical_chains"""
+    return {chain: rep for rep, chains in groups.items() for chain in chains}
+
+
+def _job_key(motif):
+    return (motif.get('chain', 'A'), motif['s4_idx'], motif.get('s4_local_idx'), motif.get('text'), motif.get('res'))
+
+
+def s2_directions_snapshot(snapshot, motifs, params, geometry=None, groups=None):
+    """
+    s2_direction каждого мотива (в порядке motifs). Как и analyze_motifs_snapshot,
+    считается на цепи-представителе, так что совпадает с is_s2_down его результата.
+    """
+    if groups is None:
+        groups = group_identical_chains(snapshot)
+    rep_of = _representatives(groups)
+    directions = {}
+    result = []
+    for motif in motifs:
+        rep_motif = _representative_motif(snapshot, motif, rep_of)
+        key = _job_key(rep_motif)
+        if key not in directions:
+            directions[key] = s2_direction(snapshot, rep_motif, params, geometry)
+        result.append(directions[key])
+    return result
+
+
+def analyze_motifs_snapshot(snapshot, motifs, params, executor=None, max_workers=None,
+                            geometry=None, groups=None, tracer=NULL_TRACER):
+    """
+    Анализ списка мотивов: каждый уникальный (цепь-представитель, мотив) считается
+    один раз, уникальные задачи выполняются параллельно - в переданном executor
+    (например, ProcessPoolExecutor) или в пуле потоков на max_workers.
+    geometry (SnapshotGeometry) и groups (group_identical_chains) можно передать
+    готовыми, если снимок анализируется многократно. tracer получает span
+    каждого мотива (кроме задач во внешнем executor - другие процессы).
+    Возвращает список TopologyResult (или None) в порядке motifs.
+    """
+    if groups is None:
+        groups = group_identical_chains(snapshot)
+    rep_of = _representatives(groups)
+
+    jobs = {}
+    job_keys = []
+    for motif in motifs:
+        rep_motif = _representative_motif(snapshot, motif, rep_of)
+        key = _job_key(rep_motif)
+        jobs.setdefault(key, rep_motif)
+        job_keys.append(key)
+
+    job_motifs = list(jobs.values())
+    n = len(job_motifs)
+    if executor is not None:
+        computed = list(executor.map(analyze_snapshot, [snapshot] * n, job_motifs, [params] * n, [geometry] * n))
+    elif n > 1 and max_workers != 1:
+        workers = max_workers or min(n, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            computed = list(pool.map(analyze_snapshot, [snapshot] * n, job_motifs, [params] * n, [geometry] * n,
+                                     [tracer] * n))
+    else:
+        computed = [analyze_snapshot(snapshot, m, params, geometry, tracer) for m in job_motifs]
+
+    by_key = dict(zip(jobs.keys(), computed))
+    return [remap_result(snapshot, by_key[key], motif) for key, motif in zip(job_keys, motifs)]
+
+
+def chain_groups(self):
+    """group_identical_chains текущего снимка (кэшируется до следующей загрузки)"""
+    snapshot = self.snapshot()
+    if self._groups is None or self._groups[0] is not snapshot:
+        self._groups = (snapshot, group_identical_chains(snapshot))
+    return self._groups[1]
+
+
+def analyze_motifs(self, motifs, executor=None, max_workers=None):
+    """Пары (мотив, TopologyResult) для всех мотивов с определимой топологией"""
+    with self.tracer.span('analyze_motifs', motifs=len(motifs)):
+        topologies = analyze_motifs_snapshot(self.snapshot(), motifs, self.params(), executor, max_workers,
+                                             groups=self.chain_groups(), tracer=self.tracer)
+    return [(m, t) for m, t in zip(motifs, topologies) if t is not None]
+
+
+def s2_directions(self, motifs):
+    """Направление S2 ('UP'/'DOWN'/None) каждого мотива по предварительной проверке s2_direction"""
+    with self.tracer.span('s2_precheck', motifs=len(motifs)):
+        return s2_directions_snapshot(self.snapshot(), motifs, self.params(), self.geometry(), self.chain_groups())
+
+
+def analyze_filtered_motifs(self, motifs, executor=None, max_workers=None):
+    """
+    Как analyze_motifs, но только мотивы с S2=DOWN (см. filter_motifs_by_topology);
+    полный анализ проходят только мотивы, принятые предварительной проверкой
+    """
+    candidates = [m for m, d in zip(motifs, self.s2_directions(motifs)) if d == 'DOWN']
+    if not candidates:
+        return []
+    return [(m, t) for m, t in self.analyze_motifs(candidates, executor, max_workers) if is_s2_down(t)]
+
+
+def crop_changes(self, motifs, executor=None, max_workers=None):
+    """
+    Для каждого мотива: изменила ли обрезка (CROP_RADIUS) результат по сравнению
+    с анализом всей цепи. Без CROP_RADIUS - все False.
+    """
+    params = self.params()
+    if params.crop_radius is None:
+        return [False] * len(motifs)
+    snapshot = self.snapshot()
+    with self.tracer.span('crop_check', motifs=len(motifs)):
+        groups = self.chain_groups()
+        cropped = analyze_motifs_snapshot(snapshot, motifs, params, executor, max_workers, groups=groups,
+                                          tracer=self.tracer)
+        full = analyze_motifs_snapshot(snapshot, motifs, params._replace(crop_radius=None), executor, max_workers,
+                                       groups=groups, tracer=self.tracer)
+    return [not same_topology(a, b) for a, b in zip(cropped, full)]
+
+
+# Прикрепляем методы к классу
+MTaseAnalyzer.chain_groups = chain_groups
+MTaseAnalyzer.analyze_motifs = analyze_motifs
+MTaseAnalyzer.s2_directions = s2_directions
+MTaseAnalyzer.analyze_filtered_motifs = analyze_filtered_motifs
+MTaseAnalyzer.crop_changes = crop_changes
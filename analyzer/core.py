@@ -1,22 +1,56 @@
+import logging
 import numpy as np
 import os
 import collections
 import re
-from scipy.spatial import distance_matrix
 
-import numpy as np
-import os
-import collections
-import re
-from scipy.spatial import distance_matrix
+from .lazy import distance_matrix
+from .logs import logger
+from .tracing import NULL_TRACER, traced
+
+# Паттерны каталитического мотива (после S4)
+MOTIF_PATTERNS = [r"[SND]P[PL][YFW]", r"P[CS]"]
+# Шаг роста переиспользуемых буферов координат (строк)
+BUFFER_ROWS = 1024
+
 
 class MTaseAnalyzer:
-    def __init__(self, contact_dist=5.2, helix_radius=20, max_loop=5, min_helix_length=4):
+    def __init__(self, contact_dist=5.2, helix_radius=20, max_loop=5, min_helix_length=4, crop_radius=None,
+                 tracer=None, reuse_buffers=False):
+        # Буферы координат и скомпилированные паттерны переживают reset:
+        # с reuse_buffers один анализатор рабочего процесса обрабатывает
+        # структуру за структурой, не выделяя память под каждую заново
+        # (координаты res_data прежней структуры перезаписывает следующая загрузка,
+        # поэтому она очищает прежний res_data; снимок snapshot() - копия и остаётся верным)
+        self.reuse_buffers = reuse_buffers
+        self._coord_buffer = np.empty((0, 3))
+        self._coord_owner = {}
+        self._strand_buffer = np.empty((0, 3))
+        self._compiled = {}
+
+        self.COLORS = {
+            'Hu': '#27ae60',
+            'Hd': '#e74c3c',
+            'strand': '#1a5276'
+        }
+
+        self.reset(contact_dist, helix_radius, max_loop, min_helix_length, crop_radius, tracer)
+
+    def reset(self, contact_dist=5.2, helix_radius=20, max_loop=5, min_helix_length=4, crop_radius=None,
+              tracer=None):
+        """
+        Параметры и пустое состояние для следующей структуры (как у нового
+        анализатора); буферы и скомпилированные паттерны сохраняются
+        """
         self.CONTACT_DIST = contact_dist
         self.HELIX_RADIUS = helix_radius
         self.MAX_LOOP = max_loop
-        self.MOTIF_PATTERNS = [r"[SND]P[PL][YFW]", r"P[CS]"]
+        self.MOTIF_PATTERNS = list(MOTIF_PATTERNS)
         self.MIN_HELIX_LENGTH = min_helix_length
+        # Радиус (Å) окрестности центра S4 для анализа топологии; None - вся цепь
+        self.CROP_RADIUS = crop_radius
+        # Трассировка этапов (analyzer.tracing.Tracer); None - выключена
+        self.tracer = tracer or NULL_TRACER
 
         self.res_data = {}
         self.full_seq = ""
@@ -32,12 +66,30 @@ class MTaseAnalyzer:
         self.current_chain = None
         self.coord_system = None
         self.strand_names = None
+        self._snapshot = None
+        self._geometry = None
+        self._groups = None
+        return self
 
-        self.COLORS = {
-            'Hu': '#27ae60',
-            'Hd': '#e74c3c',
-            'strand': '#1a5276'
-        }
+    def _buffer(self, name, n):
+        """
+        Первые n строк буфера координат name.
+        Без reuse_buffers - новый массив (на него ссылаются данные загруженной
+        структуры); иначе буфер растёт (кратно BUFFER_ROWS) только под большую структуру
+        """
+        buffer = getattr(self, name)
+        if not self.reuse_buffers or len(buffer) < n:
+            size = -(-n // BUFFER_ROWS) * BUFFER_ROWS if self.reuse_buffers else n
+            buffer = np.empty((size, 3))
+            setattr(self, name, buffer)
+        return buffer[:n]
+
+    def _pattern(self, pattern):
+        """Скомпилированный паттерн мотива (кэш на время жизни анализатора)"""
+        compiled = self._compiled.get(pattern)
+        if compiled is None:
+            compiled = self._compiled[pattern] = re.compile(pattern)
+        return compiled
 
     def _get_res_num(self, key):
         if ':' in key:
@@ -52,18 +104,27 @@ class MTaseAnalyzer:
             return key.split(':')[0]
         return 'A'
 
+    @traced('parse', lambda self, ok, *a: {'residues': len(self.res_data), 'chains': len(self.chain_data)})
     def load_dssp(self, file_path):
         if not os.path.exists(file_path):
-            print(f"Ошибка: Файл {file_path} не найден")
+            logger.error("Ошибка: Файл %s не найден", file_path)
             return False
 
+        if self.reuse_buffers:
+            # Удержанный res_data прежней структуры пустеет, а не получает чужие координаты
+            self._coord_owner.clear()
         self.res_data, self.full_seq, self.res_map = {}, "", []
+        self._coord_owner = self.res_data
         self.chain_data = {}
+        self._snapshot = None
 
         with open(file_path, 'r') as f:
             lines = f.readlines()
 
         header_idx = next(i for i, l in enumerate(lines) if "  #  RESIDUE" in l) + 1
+        # Координаты остатков - строки одного буфера
+        coords = self._buffer('_coord_buffer', len(lines) - header_idx)
+        row = 0
 
         for line in lines[header_idx:]:
             try:
@@ -74,9 +135,10 @@ class MTaseAnalyzer:
 
                 unique_id = f"{chain_id}:{rn}"
 
+                coords[row] = float(line[115:122]), float(line[123:130]), float(line[131:138])
                 self.res_data[unique_id] = {
                     'struct': line[16],
-                    'coords': np.array([float(line[115:122]), float(line[123:130]), float(line[131:138])]),
+                    'coords': coords[row],
                     'aa': line[13] if len(line) > 13 else 'X',
                     'chain': chain_id,
                     'res_num': rn,
@@ -88,23 +150,30 @@ class MTaseAnalyzer:
                 if chain_id not in self.chain_data:
                     self.chain_data[chain_id] = []
                 self.chain_data[chain_id].append(unique_id)
+                row += 1
 
             except:
                 continue
 
-        print(f"\n{'='*60}")
-        print("ИНФОРМАЦИЯ О ЦЕПЯХ В DSSP:")
-        for chain_id, residues in self.chain_data.items():
-            res_nums = [self._get_res_num(r) for r in residues]
-            print(f"Цепь '{chain_id}': {len(residues)} остатков ({min(res_nums)}-{max(res_nums)})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"\n{'='*60}")
+            logger.debug("ИНФОРМАЦИЯ О ЦЕПЯХ В DSSP:")
+            for chain_id, residues in self.chain_data.items():
+                res_nums = [self._get_res_num(r) for r in residues]
+                logger.debug(f"Цепь '{chain_id}': {len(residues)} остатков ({min(res_nums)}-{max(res_nums)})")
 
         return True
 
-    def find_all_motifs(self, custom_patterns=None):
+    @traced('motif_search', lambda self, motifs, *a, **k: {'motifs': len(motifs)})
+    def find_all_motifs(self, custom_patterns=None, max_loop=None):
         """
         Найти все мотивы во всех цепях
         Если custom_patterns передан, использует их вместо стандартных
+        max_loop заменяет self.MAX_LOOP (например, для перебора параметров)
         """
+        if max_loop is None:
+            max_loop = self.MAX_LOOP
+
         # Сохраняем оригинальные паттерны
         original_patterns = self.MOTIF_PATTERNS
         
@@ -115,7 +184,7 @@ class MTaseAnalyzer:
         motifs = []
 
         for pattern in self.MOTIF_PATTERNS:
-            for m in re.finditer(pattern, self.full_seq):
+            for m in self._pattern(pattern).finditer(self.full_seq):
                 seq_pos = m.start()
                 if seq_pos < len(self.res_map):
                     motif_key = self.res_map[seq_pos]
@@ -135,7 +204,7 @@ class MTaseAnalyzer:
 
                         if potential:
                             idx, last_num = max(potential, key=lambda x: x[1])
-                            if motif_res_num - last_num <= self.MAX_LOOP + 1:
+                            if motif_res_num - last_num <= max_loop + 1:
                                 motifs.append({
                                     'text': m.group(),
                                     'res': motif_res_num,
@@ -145,13 +214,14 @@ class MTaseAnalyzer:
                                     's4_start': self._get_res_num(self.strands[idx][0]),
                                     's4_end': last_num
                                 })
-                                print(f"  ✅ Цепь {chain}: мотив {m.group()} ({motif_res_num}), S4 {last_num} (глобальный индекс {idx})")
+                                logger.debug("  ✅ Цепь %s: мотив %s (%s), S4 %s (глобальный индекс %s)",
+                                             chain, m.group(), motif_res_num, last_num, idx)
         
         # Восстанавливаем оригинальные паттерны, если они были изменены
         if custom_patterns:
             self.MOTIF_PATTERNS = original_patterns
 
-        print(f"\n📊 Всего найдено мотивов: {len(motifs)}")
+        logger.info("\n📊 Всего найдено мотивов: %d", len(motifs))
         return motifs
 
     def find_motifs_with_custom_patterns(self, custom_patterns):
@@ -209,6 +279,7 @@ class MTaseAnalyzer:
 
         return unique
 
+    @traced('segmentation', lambda self, value: {'strands': len(self.strands), 'helices': len(self.helices)})
     def find_all_strands(self):
         """Нахождение всех бета-тяжей и альфа-спиралей"""
         self.strands, self.helices = [], []
@@ -252,7 +323,8 @@ class MTaseAnalyzer:
                 self.helices.append(curr_h)
 
         self.helices = self._merge_helices(self.helices)
-        print(f"Найдено спиралей после объединения: {len(self.helices)}")
+        self._snapshot = None
+        logger.debug("Найдено спиралей после объединения: %d", len(self.helices))
         return self.strands, self.helices
 
     def _get_strand_vector(self, strand_keys):
@@ -267,13 +339,20 @@ class MTaseAnalyzer:
                 coords.append(self.res_data[key]['coords'])
         return np.array(coords).mean(axis=0)
 
+    @traced('adjacency', lambda self, adj: {'strands': len(self.strands),
+                                            'contacts': sum(len(v) for v in adj.values()) // 2})
     def build_sheet_adjacency(self):
         self.adj = collections.defaultdict(set)
+        # Координаты всех тяжей подряд в одном буфере; тяж - срез без копии
+        keys = [r for strand in self.strands for r in strand]
+        coords = self._buffer('_strand_buffer', len(keys))
+        for row, key in enumerate(keys):
+            coords[row] = self.res_data[key]['coords']
+        bounds = np.cumsum([0] + [len(strand) for strand in self.strands])
+        strand_coords = [coords[bounds[i]:bounds[i + 1]] for i in range(len(self.strands))]
         for i in range(len(self.strands)):
             for j in range(i + 1, len(self.strands)):
-                s1_c = np.array([self.res_data[r]['coords'] for r in self.strands[i]])
-                s2_c = np.array([self.res_data[r]['coords'] for r in self.strands[j]])
-                if np.min(distance_matrix(s1_c, s2_c)) < self.CONTACT_DIST:
+                if np.min(distance_matrix(strand_coords[i], strand_coords[j])) < self.CONTACT_DIST:
                     self.adj[i].add(j)
                     self.adj[j].add(i)
         return self.adj
@@ -0,0 +1,640 @@
+"""
+Чистое ядро анализа топологии.
+
+StructureSnapshot - неизменяемый снимок структуры (координаты Cα, тяжи, спирали),
+TopologyResult - компактный результат анализа одного мотива (только индексы
+и вычисленные поля). Функция analyze_snapshot не меняет ни снимок, ни анализатор,
+поэтому её можно вызывать из потоков и пулов процессов.
+"""
+import collections
+
+import numpy as np
+
+from .core import MTaseAnalyzer
+from .coordinates import build_coordinate_system, helix_side_by_coords
+from .lazy import cKDTree, distance_matrix
+from .tracing import NULL_TRACER
+
+ALLOWED_HELIX_STRANDS = frozenset({'S1', 'S2', 'S3', 'S4', 'S5', 'S6', 'S7'})
+# Элементов в одном блоке матрицы расстояний Cα-Cα (segment_min_distances): 2 МБ,
+# и scipy distance_matrix считает блок целиком, без цикла по строкам
+BLOCK_SIZE = 250000
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+class TopologyParams(collections.namedtuple(
+        'TopologyParams', ['contact_dist', 'helix_radius', 'max_loop', 'min_helix_length', 'crop_radius'])):
+    """
+    Параметры анализа (те же, что у MTaseAnalyzer.__init__).
+    crop_radius - анализировать только SSE с центром не дальше crop_radius от центра S4.
+    """
+    __slots__ = ()
+
+    def __new__(cls, contact_dist=5.2, helix_radius=20, max_loop=5, min_helix_length=4, crop_radius=None):
+        return super().__new__(cls, contact_dist, helix_radius, max_loop, min_helix_length, crop_radius)
+
+
+class StructureSnapshot(collections.namedtuple('StructureSnapshot', [
+        'keys', 'coords', 'res_nums', 'chains', 'sequence', 'ss',
+        'strand_rows', 'strand_chain', 'strand_start', 'strand_end', 'strand_center', 'strand_vector',
+        'helix_rows', 'helix_chain', 'helix_start', 'helix_end', 'helix_center'])):
+    """
+    Неизменяемый снимок структуры.
+    Остатки пронумерованы строками (rows) массива coords; sequence и ss -
+    аминокислоты и символы DSSP в том же порядке; тяж или спираль -
+    массив номеров строк в порядке N->C.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, res_data, strands, helices):
+        """Снимок из res_data и списков ключей тяжей/спиралей (как в MTaseAnalyzer)"""
+        keys = tuple(res_data.keys())
+        row_of = {key: i for i, key in enumerate(keys)}
+        coords = np.array([res_data[k]['coords'] for k in keys], dtype=float).reshape(-1, 3)
+        res_nums = np.array([res_data[k]['res_num'] for k in keys], dtype=int)
+        chains = tuple(res_data[k]['chain'] for k in keys)
+        sequence = ''.join(res_data[k]['aa'] for k in keys)
+        ss = ''.join(res_data[k]['struct'] for k in keys)
+
+        def segments(groups):
+            rows = tuple(_frozen(np.array([row_of[k] for k in g], dtype=int)) for g in groups if g)
+            seg_chain = tuple(chains[r[0]] for r in rows)
+            start = _frozen(np.array([res_nums[r[0]] for r in rows], dtype=int))
+            end = _frozen(np.array([res_nums[r[-1]] for r in rows], dtype=int))
+            center = _frozen(np.array([coords[r].mean(axis=0) for r in rows]).reshape(-1, 3))
+            return rows, seg_chain, start, end, center
+
+        s_rows, s_chain, s_start, s_end, s_center = segments(strands)
+        s_vector = _frozen(np.array([coords[r[-1]] - coords[r[0]] for r in s_rows]).reshape(-1, 3))
+        h_rows, h_chain, h_start, h_end, h_center = segments(helices)
+
+        return cls(keys, _frozen(coords), _frozen(res_nums), chains, sequence, ss,
+                   s_rows, s_chain, s_start, s_end, s_center, s_vector,
+                   h_rows, h_chain, h_start, h_end, h_center)
+
+    def chain_rows(self, chain):
+        return [i for i, c in enumerate(self.chains) if c == chain]
+
+    def chain_strand_ids(self, chain):
+        return [i for i, c in enumerate(self.strand_chain) if c == chain]
+
+    def chain_helix_ids(self, chain):
+        return [i for i, c in enumerate(self.helix_chain) if c == chain]
+
+    def strand_keys(self, strand_id):
+        return [self.keys[r] for r in self.strand_rows[strand_id]]
+
+    def helix_keys(self, helix_id):
+        return [self.keys[r] for r in self.helix_rows[helix_id]]
+
+
+class CoordinateSystem(collections.namedtuple('CoordinateSystem', [
+        'chain', 's4_center', 's4_idx', 's3_idx', 'north', 'east', 'up', 'hbond_used'])):
+    """Система координат цепи (векторы хранятся кортежами)"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'chain': self.chain,
+            's4_center': np.array(self.s4_center),
+            's4_idx': self.s4_idx,
+            's3_idx': self.s3_idx,
+            'north': np.array(self.north),
+            'east': np.array(self.east),
+            'up': np.array(self.up),
+            'hbond_used': self.hbond_used
+        }
+
+
+class HelixAssignment(collections.namedtuple('HelixAssignment', [
+        'helix_id', 'start', 'end', 'side', 'distance', 'nearest_strand', 'proj'])):
+    __slots__ = ()
+
+
+class TopologyResult(collections.namedtuple('TopologyResult', [
+        'chain', 'motif_text', 'motif_res', 's4_global_idx',
+        'strand_ids', 'helix_ids', 'full_path', 'strand_names', 'path_map',
+        's4_idx', 's3_idx', 's4_start', 's4_end', 'v4', 'strand_dirs',
+        'helices', 'coord_system'])):
+    """
+    Результат анализа одного мотива.
+    Локальный индекс тяжа i соответствует глобальному strand_ids[i];
+    strand_names и path_map - кортежи пар в порядке присвоения имён,
+    strand_dirs - направления тяжей full_path относительно S4 (1 / -1).
+    """
+    __slots__ = ()
+
+    @property
+    def names(self):
+        return dict(self.strand_names)
+
+    @property
+    def ranges(self):
+        return dict(self.path_map)
+
+    def direction(self, local_idx):
+        return self.strand_dirs[self.full_path.index(local_idx)]
+
+    def to_dict(self, snapshot):
+        """Словарь в прежнем формате analyze_topology (для визуализаций и страниц)"""
+        strand_names = self.names
+        return {
+            'full_path': list(self.full_path),
+            'path_map': self.ranges,
+            'strands': [snapshot.strand_keys(i) for i in self.strand_ids],
+            'helices': [snapshot.helix_keys(i) for i in self.helix_ids],
+            'strand_names': strand_names,
+            's4_idx': self.s4_idx,
+            's4_start': self.s4_start,
+            's4_end': self.s4_end,
+            'v4': np.array(self.v4),
+            'chain': self.chain,
+            's4_global_idx': self.s4_global_idx,
+            's3_idx': self.s3_idx,
+            'helix_sides': {h.start: h.side for h in self.helices},
+            'helix_distances': {h.start: h.distance for h in self.helices},
+            'helix_nearest_strand': {h.start: h.nearest_strand for h in self.helices},
+            'coord_system': self.coord_system.to_dict(),
+            'motif_text': self.motif_text,
+            'motif_res': self.motif_res,
+            'strand_to_idx': {name: idx for idx, name in strand_names.items()},
+            'topology': self
+        }
+
+
+def segment_min_distances(snapshot, rows_a, rows_b):
+    """
+    Матрица минимальных расстояний Cα-Cα между сегментами rows_a и rows_b
+    (списки массивов строк снимка). Полная матрица остаток x остаток не
+    строится: сегменты rows_a идут блоками не больше BLOCK_SIZE элементов.
+    """
+    result = np.empty((len(rows_a), len(rows_b)))
+    if not rows_a or not rows_b:
+        return result
+    b_coords = snapshot.coords[np.concatenate(rows_b)]
+    b_bounds = np.cumsum([0] + [len(r) for r in rows_b[:-1]])
+    max_rows = max(1, BLOCK_SIZE // len(b_coords))
+    i = 0
+    while i < len(rows_a):
+        j, n = i + 1, len(rows_a[i])
+        while j < len(rows_a) and n + len(rows_a[j]) <= max_rows:
+            n += len(rows_a[j])
+            j += 1
+        block = rows_a[i:j]
+        a_bounds = np.cumsum([0] + [len(r) for r in block[:-1]])
+        full = distance_matrix(snapshot.coords[np.concatenate(block)], b_coords)
+        result[i:j] = np.minimum.reduceat(np.minimum.reduceat(full, a_bounds, axis=0), b_bounds, axis=1)
+        i = j
+    return result
+
+
+def strand_min_distances(snapshot, strand_ids):
+    """Матрица минимальных расстояний Cα-Cα между тяжами"""
+    if len(strand_ids) == 0:
+        return np.zeros((0, 0))
+    rows = [snapshot.strand_rows[i] for i in strand_ids]
+    return segment_min_distances(snapshot, rows, rows)
+
+
+def helix_center_distances(snapshot, helix_ids, strand_ids):
+    """Матрица расстояний центр-центр спираль x тяж"""
+    if not helix_ids or not strand_ids:
+        return np.zeros((len(helix_ids), len(strand_ids)))
+    return distance_matrix(snapshot.helix_center[helix_ids], snapshot.strand_center[strand_ids])
+
+
+def helix_strand_distances(snapshot, helix_ids, strand_ids):
+    """
+    (центр-центр, минимальные Cα-Cα) - матрицы расстояний спираль x тяж.
+    Первая выбирает ближайший тяж спирали, вторая - списки Hu/Hd таблицы тяжей.
+    """
+    shape = (len(helix_ids), len(strand_ids))
+    if not helix_ids or not strand_ids:
+        return np.zeros(shape), np.zeros(shape)
+    centers = helix_center_distances(snapshot, helix_ids, strand_ids)
+    min_dist = segment_min_distances(snapshot, [snapshot.helix_rows[i] for i in helix_ids],
+                                     [snapshot.strand_rows[i] for i in strand_ids])
+    return centers, min_dist
+
+
+def sse_tree(snapshot, chain):
+    """(cKDTree центров тяжей и спиралей цепи, strand_ids, helix_ids); тяжи идут первыми"""
+    strand_ids = snapshot.chain_strand_ids(chain)
+    helix_ids = snapshot.chain_helix_ids(chain)
+    centers = np.concatenate([snapshot.strand_center[strand_ids], snapshot.helix_center[helix_ids]])
+    return cKDTree(centers.reshape(-1, 3)), strand_ids, helix_ids
+
+
+def crop_chain(snapshot, chain, center, radius, geometry=None):
+    """
+    Позиции (в chain_strand_ids и chain_helix_ids) тяжей и спиралей цепи,
+    центры которых не дальше radius от center.
+    """
+    tree, strand_ids, _ = geometry.sse_tree(chain) if geometry is not None else sse_tree(snapshot, chain)
+    n = len(strand_ids)
+    hits = sorted(tree.query_ball_point(center, radius))
+    return [i for i in hits if i < n], [i - n for i in hits if i >= n]
+
+
+def same_topology(a, b):
+    """
+    Совпадают ли два результата для одного мотива (например, с обрезкой и без):
+    сравниваются глобальные индексы и имена тяжей, направления и стороны спиралей.
+    """
+    if a is None or b is None:
+        return a is None and b is None
+
+    def signature(t):
+        return (
+            sorted((t.strand_ids[idx], name) for idx, name in t.strand_names),
+            [t.strand_ids[idx] for idx in t.full_path],
+            t.strand_dirs,
+            [(h.helix_id, h.side, h.nearest_strand) for h in t.helices]
+        )
+    return signature(a) == signature(b)
+
+
+class SnapshotGeometry:
+    """
+    Геометрия снимка, не зависящая от TopologyParams: расстояния тяж-тяж и
+    спираль-тяж по цепям. Считается при первом обращении к цепи, затем
+    переиспользуется при любых параметрах (см. analyzer.sweep).
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._strands = {}
+        self._helices = {}
+        self._trees = {}
+        self._sheets = {}
+        self._crops = {}
+
+    def strand_distances(self, chain):
+        """strand_min_distances для тяжей цепи (в порядке chain_strand_ids)"""
+        if chain not in self._strands:
+            self._strands[chain] = _frozen(
+                strand_min_distances(self.snapshot, self.snapshot.chain_strand_ids(chain)))
+        return self._strands[chain]
+
+    def cropped_strand_distances(self, chain, s_pos):
+        """
+        strand_min_distances тяжей цепи на позициях s_pos (окрестность S4 при
+        crop_radius): считается только для них, матрица всей цепи не строится
+        """
+        key = (chain, tuple(s_pos))
+        if key not in self._crops:
+            if chain in self._strands:
+                min_dist = self._strands[chain][np.ix_(s_pos, s_pos)]
+            else:
+                strand_ids = self.snapshot.chain_strand_ids(chain)
+                min_dist = strand_min_distances(self.snapshot, [strand_ids[i] for i in s_pos])
+            self._crops[key] = _frozen(min_dist)
+        return self._crops[key]
+
+    def helix_distances(self, chain):
+        """helix_strand_distances для спиралей и тяжей цепи"""
+        if chain not in self._helices:
+            snapshot = self.snapshot
+            self._helices[chain] = tuple(_frozen(m) for m in helix_strand_distances(
+                snapshot, snapshot.chain_helix_ids(chain), snapshot.chain_strand_ids(chain)))
+        return self._helices[chain]
+
+    def sse_tree(self, chain):
+        """sse_tree цепи"""
+        if chain not in self._trees:
+            self._trees[chain] = sse_tree(self.snapshot, chain)
+        return self._trees[chain]
+
+    def sheet_graph(self, chain, contact_dist):
+        """sheet_adjacency всех тяжей цепи (каждый тяж - ключ, в том числе без контактов)"""
+        key = (chain, contact_dist)
+        if key not in self._sheets:
+            adj = sheet_adjacency(self.strand_distances(chain), contact_dist)
+            self._sheets[key] = {i: adj[i] for i in range(len(self.snapshot.chain_strand_ids(chain)))}
+        return self._sheets[key]
+
+
+def sheet_adjacency(min_dist, contact_dist):
+    """Граф контактов тяжей (порядок вставки как в build_sheet_adjacency)"""
+    adj = collections.defaultdict(set)
+    n = len(min_dist)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if min_dist[i, j] < contact_dist:
+                adj[i].add(j)
+                adj[j].add(i)
+    return adj
+
+
+def _expand_path(adj, starts, start_node, visited):
+    p_list = [start_node]
+    while True:
+        ns = [x for x in adj[p_list[-1]] if x not in visited]
+        if not ns:
+            break
+        nxt = min(ns, key=lambda x: abs(starts[x] - starts[p_list[-1]]))
+        p_list.append(nxt)
+        visited.add(nxt)
+    return p_list
+
+
+def _walk_names(adj, start_idx, number, step, full_path, processed, names, path_map, starts, ends):
+    """Присваивает имена S{number}, S{number+step}... вдоль листа от start_idx"""
+    current_idx = start_idx
+    while True:
+        next_idx = None
+        for neighbor in adj[current_idx]:
+            if neighbor not in processed:
+                next_idx = neighbor
+                break
+        if next_idx is None or next_idx not in full_path:
+            break
+        name = f"S{number}"
+        names[next_idx] = name
+        path_map[name] = (starts[next_idx], ends[next_idx])
+        processed.add(next_idx)
+        current_idx = next_idx
+        number += step
+
+
+def name_sheet_strands(adj, s4_idx, starts, ends):
+    """
+    Обход листа от S4 и присвоение имён тяжам.
+    Возвращает (full_path, strand_names, path_map, s3_idx); s3_idx = None, если S3 не найден.
+    """
+    s4_start, s4_end = starts[s4_idx], ends[s4_idx]
+
+    v_set = {s4_idx}
+    side_down = _expand_path(adj, starts, s4_idx, v_set)
+    side_up = _expand_path(adj, starts, s4_idx, v_set)
+    full_path = side_up[::-1][:-1] + side_down
+    s4_pos = full_path.index(s4_idx)
+
+    names = {s4_idx: "S4"}
+    path_map = {"S4": (s4_start, s4_end)}
+    processed = {s4_idx}
+    s3_idx = None
+
+    def assign(idx, name):
+        names[idx] = name
+        path_map[name] = (starts[idx], ends[idx])
+        processed.add(idx)
+
+    left_neighbors = []
+    right_neighbors = []
+    for neighbor in adj[s4_idx]:
+        if neighbor in processed:
+            continue
+        if ends[neighbor] < s4_start:
+            left_neighbors.append((neighbor, ends[neighbor]))
+        elif starts[neighbor] > s4_end:
+            right_neighbors.append((neighbor, starts[neighbor]))
+
+    walk_args = (full_path, processed, names, path_map, starts, ends)
+
+    # C-конец: первый правый сосед - S3, второй - S5
+    if right_neighbors:
+        right_neighbors.sort(key=lambda x: x[1])
+        s3_idx = right_neighbors[0][0]
+        assign(s3_idx, "S3")
+        if len(right_neighbors) > 1:
+            s5_idx = right_neighbors[1][0]
+            assign(s5_idx, "S5")
+            _walk_names(adj, s5_idx, 6, 1, *walk_args)
+        _walk_names(adj, s3_idx, 2, -1, *walk_args)
+
+    # N-конец: первый левый сосед - S5, второй - S3
+    if left_neighbors:
+        left_neighbors.sort(key=lambda x: x[1], reverse=True)
+        s5_idx = left_neighbors[0][0]
+        assign(s5_idx, "S5")
+        _walk_names(adj, s5_idx, 6, 1, *walk_args)
+        if len(left_neighbors) > 1:
+            s3_idx = left_neighbors[1][0]
+            assign(s3_idx, "S3")
+            _walk_names(adj, s3_idx, 2, -1, *walk_args)
+
+    # Остальные тяжи пути
+    for i, idx in enumerate(full_path):
+        if idx not in names and idx != s4_idx:
+            assign(idx, f"S{4 - (i - s4_pos)}")
+
+    return full_path, names, path_map, s3_idx
+
+
+def assign_helix_sides(snapshot, helix_ids, strand_ids, full_path, names, up, params, center_dist=None):
+    """
+    Сторона (Hu/Hd) каждой спирали относительно ближайшего тяжа S1-S7.
+    center_dist - готовая матрица центр-центр спираль x тяж (helix_strand_distances).
+    """
+    candidates = [idx for idx in full_path if names.get(idx) in ALLOWED_HELIX_STRANDS]
+    centers = snapshot.strand_center[[strand_ids[idx] for idx in candidates]] if candidates else None
+
+    assignments = []
+    for i, h_id in enumerate(helix_ids):
+        if len(snapshot.helix_rows[h_id]) < params.min_helix_length or centers is None:
+            continue
+        h_center = snapshot.helix_center[h_id]
+        if center_dist is None:
+            dists = np.linalg.norm(centers - h_center, axis=1)
+        else:
+            dists = center_dist[i, candidates]
+        best = int(np.argmin(dists))
+        min_dist = float(dists[best])
+        if min_dist < params.helix_radius:
+            side, proj = helix_side_by_coords(h_center, centers[best], up)
+            assignments.append(HelixAssignment(
+                h_id, int(snapshot.helix_start[h_id]), int(snapshot.helix_end[h_id]),
+                side, min_dist, names[candidates[best]], float(proj)))
+    return tuple(assignments)
+
+
+def chain_coordinate_system(snapshot, chain, strand_ids, s4_idx, s3_idx):
+    """CoordinateSystem цепи по локальным индексам S4 и S3"""
+    s4_rows = snapshot.strand_rows[strand_ids[s4_idx]]
+    s3_rows = snapshot.strand_rows[strand_ids[s3_idx]]
+    s4_center, north, east, up, hbond_pair = build_coordinate_system(
+        snapshot.coords[s4_rows], snapshot.res_nums[s4_rows],
+        snapshot.coords[s3_rows], snapshot.res_nums[s3_rows])
+    return CoordinateSystem(
+        chain, tuple(s4_center.tolist()), s4_idx, s3_idx,
+        tuple(north.tolist()), tuple(east.tolist()), tuple(up.tolist()), hbond_pair)
+
+
+def _motif_sses(snapshot, motif, params, geometry):
+    """
+    Тяжи и спирали цепи мотива с учётом обрезки:
+    (strand_ids, helix_ids, s4_idx, s_pos, h_pos) или None, если S4 не в цепи;
+    s_pos, h_pos - позиции оставленных SSE в цепи (None без обрезки).
+    """
+    motif_chain = motif.get('chain', 'A')
+    strand_ids = snapshot.chain_strand_ids(motif_chain)
+    if not strand_ids:
+        return None
+
+    s4_idx = motif.get('s4_local_idx')
+    if s4_idx is None:
+        if motif['s4_idx'] not in strand_ids:
+            return None
+        s4_idx = strand_ids.index(motif['s4_idx'])
+
+    helix_ids = snapshot.chain_helix_ids(motif_chain)
+    s_pos = h_pos = None
+    if params.crop_radius is not None:
+        # Только окрестность S4: S4 всегда внутри, локальные индексы - в обрезанном списке
+        s4_center = snapshot.strand_center[strand_ids[s4_idx]]
+        s_pos, h_pos = crop_chain(snapshot, motif_chain, s4_center, params.crop_radius, geometry)
+        s4_idx = s_pos.index(s4_idx)
+        strand_ids = [strand_ids[i] for i in s_pos]
+        helix_ids = [helix_ids[i] for i in h_pos]
+    return strand_ids, helix_ids, s4_idx, s_pos, h_pos
+
+
+def _sheet_graph(snapshot, chain, strand_ids, s_pos, params, geometry):
+    """
+    Граф листа тяжей strand_ids: для всей цепи - из кэша geometry, при обрезке -
+    по матрице только оставленных тяжей
+    """
+    if geometry is None:
+        return sheet_adjacency(strand_min_distances(snapshot, strand_ids), params.contact_dist)
+    if s_pos is None:
+        return geometry.sheet_graph(chain, params.contact_dist)
+    return sheet_adjacency(geometry.cropped_strand_distances(chain, s_pos), params.contact_dist)
+
+
+def s2_direction(snapshot, motif, params=TopologyParams(), geometry=None):
+    """
+    Предварительная проверка мотива: направление S2 относительно S4 ('UP'/'DOWN')
+    по графу листа и именам тяжей, без системы координат и сторон спиралей.
+    None - топология не определяется или S2 нет. Совпадает с is_s2_down
+    результата analyze_snapshot: мотив с 'UP' или None можно отбросить сразу.
+    """
+    sses = _motif_sses(snapshot, motif, params, geometry)
+    if sses is None:
+        return None
+    strand_ids, _, s4_idx, s_pos, _ = sses
+    starts = [int(snapshot.strand_start[i]) for i in strand_ids]
+    ends = [int(snapshot.strand_end[i]) for i in strand_ids]
+    adj = _sheet_graph(snapshot, motif.get('chain', 'A'), strand_ids, s_pos, params, geometry)
+    _, names, _, s3_idx = name_sheet_strands(adj, s4_idx, starts, ends)
+    if s3_idx is None:
+        return None
+    for idx, name in names.items():
+        if name == 'S2':
+            v4 = snapshot.strand_vector[strand_ids[s4_idx]]
+            # Как strand_dirs в _analyze_snapshot
+            return "UP" if (snapshot.strand_vector[[strand_ids[idx]]] @ v4)[0] > 0 else "DOWN"
+    return None
+
+
+def is_s2_down(topology):
+    """S2 антипараллелен S4 (критерий filter_motifs_by_topology)"""
+    for idx, name in topology.strand_names:
+        if name == 'S2':
+            return topology.direction(idx) < 0
+    return False
+
+
+def analyze_snapshot(snapshot, motif, params=TopologyParams(), geometry=None, tracer=NULL_TRACER):
+    """
+    Анализ топологии одного мотива без побочных эффектов.
+    geometry - SnapshotGeometry того же снимка, если расстояния уже посчитаны;
+    tracer - span 'motif' с вложенными 'sheet_walk' и 'helix_assignment'.
+    Возвращает TopologyResult или None, если топологию определить нельзя.
+    """
+    if not tracer.enabled:
+        return _analyze_snapshot(snapshot, motif, params, geometry, tracer)
+    with tracer.span('motif', chain=motif.get('chain', 'A'), motif=motif.get('text'), res=motif.get('res')) as span:
+        topology = _analyze_snapshot(snapshot, motif, params, geometry, tracer)
+        if topology is not None:
+            span.set(strands=len(topology.full_path), helices=len(topology.helices))
+    return topology
+
+
+def _analyze_snapshot(snapshot, motif, params, geometry, tracer):
+    motif_chain = motif.get('chain', 'A')
+    s4_global_idx = motif['s4_idx']
+
+    sses = _motif_sses(snapshot, motif, params, geometry)
+    if sses is None:
+        return None
+    strand_ids, helix_ids, s4_idx, s_pos, h_pos = sses
+
+    center_dist = None
+    if geometry is not None:
+        if s_pos is None:
+            center_dist = geometry.helix_distances(motif_chain)[0]
+        else:
+            # Обрезка: только спирали и тяжи окрестности S4
+            center_dist = helix_center_distances(snapshot, helix_ids, strand_ids)
+
+    starts = [int(snapshot.strand_start[i]) for i in strand_ids]
+    ends = [int(snapshot.strand_end[i]) for i in strand_ids]
+    with tracer.span('sheet_walk', chain=motif_chain, motif=motif.get('text')) as span:
+        adj = _sheet_graph(snapshot, motif_chain, strand_ids, s_pos, params, geometry)
+        full_path, names, path_map, s3_idx = name_sheet_strands(adj, s4_idx, starts, ends)
+        span.set(strands=len(full_path))
+    if s3_idx is None:
+        return None
+
+    coord_system = chain_coordinate_system(snapshot, motif_chain, strand_ids, s4_idx, s3_idx)
+    up = np.array(coord_system.up)
+
+    v4 = snapshot.strand_vector[strand_ids[s4_idx]]
+    dirs = snapshot.strand_vector[[strand_ids[idx] for idx in full_path]] @ v4
+
+    with tracer.span('helix_assignment', chain=motif_chain, motif=motif.get('text')) as span:
+        helices = assign_helix_sides(snapshot, helix_ids, strand_ids, full_path, names, up, params, center_dist)
+        span.set(helices=len(helices))
+
+    return TopologyResult(
+        chain=motif_chain,
+        motif_text=motif.get('text'),
+        motif_res=motif.get('res'),
+        s4_global_idx=s4_global_idx,
+        strand_ids=tuple(strand_ids),
+        helix_ids=tuple(helix_ids),
+        full_path=tuple(full_path),
+        strand_names=tuple(names.items()),
+        path_map=tuple(path_map.items()),
+        s4_idx=s4_idx,
+        s3_idx=s3_idx,
+        s4_start=starts[s4_idx],
+        s4_end=ends[s4_idx],
+        v4=tuple(v4.tolist()),
+        strand_dirs=tuple(1 if d > 0 else -1 for d in dirs),
+        helices=helices,
+        coord_system=coord_system
+    )
+
+
+def params(self):
+    """Текущие параметры анализа в виде TopologyParams"""
+    return TopologyParams(self.CONTACT_DIST, self.HELIX_RADIUS, self.MAX_LOOP, self.MIN_HELIX_LENGTH,
+                          self.CROP_RADIUS)
+
+
+def snapshot(self):
+    """Неизменяемый снимок загруженной структуры (кэшируется до следующей загрузки)"""
+    if self._snapshot is None:
+        self._snapshot = StructureSnapshot.build(self.res_data, self.strands, self.helices)
+    return self._snapshot
+
+
+def geometry(self):
+    """SnapshotGeometry текущего снимка (кэш расстояний и графов листа до следующей загрузки)"""
+    snapshot = self.snapshot()
+    if self._geometry is None or self._geometry.snapshot is not snapshot:
+        self._geometry = SnapshotGeometry(snapshot)
+    return self._geometry
+
+
+# Прикрепляем методы к классу
+MTaseAnalyzer.params = params
+MTaseAnalyzer.snapshot = snapshot
+MTaseAnalyzer.geometry = geometry
@@ -0,0 +1,44 @@
+"""
+Отложенный импорт тяжёлых зависимостей.
+
+import analyzer не загружает scipy, matplotlib, plotly и py3Dmol: scipy.spatial
+импортируется при первом расчёте расстояний, модули визуализации - при первом
+вызове их методов. Пакетные запуски, рабочие процессы пула и короткие вызовы
+CLI не платят за то, чем не пользуются.
+"""
+import importlib
+
+_spatial = None
+
+
+def _scipy_spatial():
+    global _spatial
+    if _spatial is None:
+        import scipy.spatial
+        _spatial = scipy.spatial
+    return _spatial
+
+
+def distance_matrix(x, y):
+    """scipy.spatial.distance_matrix"""
+    return _scipy_spatial().distance_matrix(x, y)
+
+
+def cKDTree(data):
+    """scipy.spatial.cKDTree"""
+    return _scipy_spatial().cKDTree(data)
+
+
+def lazy_method(cls, name, module):
+    """
+    Заглушка метода cls.name: первый вызов импортирует module (относительно
+    пакета analyzer), который прикрепляет настоящий метод, и вызывает его
+    """
+    def method(self, *args, **kwargs):
+        importlib.import_module(module, __package__)
+        if getattr(cls, name) is method:
+            raise AttributeError(f"{module} did not define {cls.__name__}.{name}")
+        return getattr(self, name)(*args, **kwargs)
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"Загружается из analyzer{module} при первом вызове"
+    setattr(cls, name, method)
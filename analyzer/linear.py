@@ -0,0 +1,112 @@
+"""
+Линейная топология (N -> C) как упорядоченный список элементов.
+
+Строки для таблиц и интерфейса собираются из этого списка, без перехвата
+stdout и повторного разбора текста регулярными выражениями.
+"""
+import collections
+
+from .core import MTaseAnalyzer
+from .coordinates import helix_name, helix_number
+from .tracing import traced
+
+# Разрыв (а.к.) между соседними элементами, после которого рисуется BIG LOOP
+BIG_LOOP_GAP = 50
+
+
+class TopologyElement(collections.namedtuple('TopologyElement', [
+        'type', 'name', 'direction', 'start', 'end', 'distance'])):
+    """
+    Элемент линейной топологии.
+    type - 'strand' или 'helix'; direction - '↑'/'↓' для тяжей (относительно S4),
+    None для спиралей; distance - расстояние до ближайшего тяжа (только спирали).
+    """
+    __slots__ = ()
+
+    @property
+    def is_strand(self):
+        return self.type == 'strand'
+
+    def label(self, distances=False):
+        if self.is_strand:
+            return f"{self.name}({self.direction})[{self.start}-{self.end}]"
+        label = f"{self.name}[{self.start}-{self.end}]"
+        if distances:
+            label += f" ({self.distance:.1f} Å)"
+        return label
+
+
+def linear_elements(snapshot, topology):
+    """Упорядоченный (N -> C) список TopologyElement для результата analyze_snapshot"""
+    path_map = topology.ranges
+    names = topology.names
+
+    helices = {}
+    for h in topology.helices:
+        helix_key = (h.start, h.end)
+        if helix_key not in helices:
+            name = helix_name(h.side, h.start, helix_number(h.start, h.end, path_map))
+            helices[helix_key] = TopologyElement('helix', name, None, h.start, h.end, h.distance)
+    elements = sorted(helices.values(), key=lambda e: e.start)
+
+    s4_pos = topology.full_path.index(topology.s4_idx)
+    for i, (idx, direction) in enumerate(zip(topology.full_path, topology.strand_dirs)):
+        strand_id = topology.strand_ids[idx]
+        elements.append(TopologyElement(
+            'strand',
+            names.get(idx, f"S{4 - (i - s4_pos)}"),
+            "↑" if direction > 0 else "↓",
+            int(snapshot.strand_start[strand_id]),
+            int(snapshot.strand_end[strand_id]),
+            None
+        ))
+
+    elements.sort(key=lambda e: e.start)
+    return elements
+
+
+def format_elements(elements, distances=False, big_loops=False):
+    """Строка 'A — B — C'; big_loops вставляет маркер BIG LOOP на больших разрывах"""
+    parts = []
+    for i, element in enumerate(elements):
+        parts.append(element.label(distances))
+        if big_loops and i < len(elements) - 1 and elements[i + 1].start - element.end > BIG_LOOP_GAP:
+            parts.append("🔴 **BIG LOOP** 🔴")
+    return ' — '.join(parts)
+
+
+def _strand_number(element):
+    return int(element.name[1:])
+
+
+def strand_direction_string(elements):
+    """Направления тяжей по убыванию номера (S7 → S6 → ... → S-1), например '↑↑↑↑↑↓↑↑↓'"""
+    directions = {}
+    for element in elements:
+        if element.is_strand:
+            directions.setdefault(_strand_number(element), element.direction)
+    return ''.join(directions[num] for num in sorted(directions, reverse=True))
+
+
+def topology_strings(elements):
+    """(полная топология, только тяжи, направления) - колонки batch_analyze"""
+    if not elements:
+        return "", "", ""
+    return (
+        format_elements(elements),
+        format_elements([e for e in elements if e.is_strand]),
+        strand_direction_string(elements)
+    )
+
+
+@traced('linear_topology', lambda self, elements, result: {'elements': len(elements)})
+def linear_topology(self, result):
+    """Список TopologyElement для результата (TopologyResult или словарь analyze_topology)"""
+    if not result:
+        return []
+    topology = result['topology'] if isinstance(result, dict) else result
+    return linear_elements(self.snapshot(), topology)
+
+
+# Прикрепляем методы к классу
+MTaseAnalyzer.linear_topology = linear_topology
@@ -0,0 +1,53 @@
+"""
+Логирование анализатора.
+
+Все сообщения идут через logger 'analyzer' с отложенным форматированием
+(logger.debug("...%s", x)): ниже активного уровня строка не строится, а
+многострочные отчёты (система координат, таблица тяжей) проверяют
+logger.isEnabledFor. Без configure_logging анализатор молчит.
+Уровни: DEBUG - баннеры, таблицы и строки по каждому элементу,
+INFO - итоги по структуре, WARNING/ERROR - ошибки.
+"""
+import logging
+import sys
+
+logger = logging.getLogger('analyzer')
+logger.addHandler(logging.NullHandler())
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR
+}
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """StreamHandler в текущий sys.stdout (учитывает contextlib.redirect_stdout)"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def configure_logging(level='info'):
+    """
+    Вывод сообщений анализатора в stdout (только текст сообщения), начиная
+    с level ('debug', 'info', 'warning', 'error' или число logging).
+    Повторный вызов меняет уровень, не добавляя обработчиков.
+    """
+    level = LEVELS[level] if isinstance(level, str) else level
+    logger.setLevel(level)
+    if not any(isinstance(h, _StdoutHandler) for h in logger.handlers):
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
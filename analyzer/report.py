@@ -0,0 +1,122 @@
+"""
+Таблица тяжей результата: направление, тип связи и списки спиралей Hu/Hd.
+
+Таблица - представление над TopologyResult по запросу (интерфейс, отчёт
+analyze_topology на уровне DEBUG): сам анализ её не строит, так что пакетные
+запуски и фильтрация мотивов её не оплачивают.
+"""
+import collections
+
+from .core import MTaseAnalyzer
+from .coordinates import helix_name, helix_number
+from .engine import helix_strand_distances
+from .linear import TopologyElement
+
+
+class StrandRow(collections.namedtuple('StrandRow', [
+        'name', 'start', 'end', 'direction', 'bond', 'hu', 'hd'])):
+    """
+    Строка таблицы тяжей.
+    direction - 'UP'/'DOWN' относительно S4; bond - 'Edge', 'Para' или 'Anti'
+    (относительно предыдущего тяжа листа); hu, hd - спирали (TopologyElement)
+    не дальше helix_radius от тяжа, с расстоянием до их ближайшего тяжа.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def helix_label(helix):
+        return f"{helix.name} ({helix.start}-{helix.end}) [{helix.distance:.1f} Å]"
+
+    def cells(self):
+        """Словарь строки с текстовыми списками спиралей (для таблиц интерфейса)"""
+        return {
+            'Strand': self.name,
+            'Range': f"{self.start}-{self.end}",
+            'Dir': self.direction,
+            'Bond': self.bond,
+            'Hu (Up)': ', '.join(map(self.helix_label, self.hu)) or '--',
+            'Hd (Down)': ', '.join(map(self.helix_label, self.hd)) or '--'
+        }
+
+
+def _table_order(item):
+    # S7, S6, ..., S1, S0, S-1 - по убыванию номера; прочие имена в конце
+    name = item[1]
+    if name.startswith('S'):
+        try:
+            return -int(name[1:].split('_')[0].split('(')[0])
+        except ValueError:
+            return 0
+    return 0
+
+
+def strand_table(snapshot, topology, params, geometry=None):
+    """
+    Список StrandRow для результата analyze_snapshot (тяжи по убыванию номера).
+    geometry - SnapshotGeometry того же снимка: минимальные расстояния
+    спираль-тяж берутся из неё, иначе считаются только для спиралей со
+    стороной и именованных тяжей.
+    """
+    named = sorted(topology.strand_names, key=_table_order)
+    strand_ids = [topology.strand_ids[idx] for idx, _ in named]
+    helix_ids = [h.helix_id for h in topology.helices]
+    if geometry is None:
+        min_dist = helix_strand_distances(snapshot, helix_ids, strand_ids)[1]
+    else:
+        h_pos = {h: i for i, h in enumerate(snapshot.chain_helix_ids(topology.chain))}
+        s_pos = {s: i for i, s in enumerate(snapshot.chain_strand_ids(topology.chain))}
+        min_dist = geometry.helix_distances(topology.chain)[1][
+            [h_pos[h] for h in helix_ids]][:, [s_pos[s] for s in strand_ids]]
+
+    path_map = topology.ranges
+    helices = [TopologyElement('helix', helix_name(h.side, h.start, helix_number(h.start, h.end, path_map)),
+                               None, h.start, h.end, h.distance)
+               for h in topology.helices]
+
+    v4 = snapshot.strand_vector[topology.strand_ids[topology.s4_idx]]
+    rows = []
+    for j, (idx, name) in enumerate(named):
+        strand_id = topology.strand_ids[idx]
+        vector = snapshot.strand_vector[strand_id]
+        bond = "Edge"
+        pos = topology.full_path.index(idx) if idx in topology.full_path else 0
+        if pos > 0:
+            prev_vector = snapshot.strand_vector[topology.strand_ids[topology.full_path[pos - 1]]]
+            bond = "Para" if vector @ prev_vector > 0 else "Anti"
+
+        hu, hd = [], []
+        for i, helix in enumerate(helices):
+            if min_dist[i, j] < params.helix_radius:
+                side_list = hu if topology.helices[i].side == "Hu" else hd
+                if helix not in side_list:
+                    side_list.append(helix)
+
+        rows.append(StrandRow(name, int(snapshot.strand_start[strand_id]), int(snapshot.strand_end[strand_id]),
+                              "UP" if vector @ v4 > 0 else "DOWN", bond, tuple(hu), tuple(hd)))
+    return rows
+
+
+def format_strand_table(rows):
+    """Текст таблицы тяжей (строки отчёта analyze_topology)"""
+    lines = [
+        "-" * 120,
+        f"{'Strand':<7} | {'Range':<10} | {'Dir':<7} | {'Bond':<10} | {'Hu (Up)':<30} | {'Hd (Down)'}",
+        "-" * 120
+    ]
+    for row in rows:
+        cells = row.cells()
+        lines.append(f"{row.name:<7} | {row.start:>4}-{row.end:<5} | {row.direction:<7} | {row.bond:<10} | "
+                     f"{cells['Hu (Up)']:<30} | {cells['Hd (Down)']}")
+    return lines
+
+
+def strand_report(self, result):
+    """Таблица тяжей (список StrandRow) для результата analyze_topology или TopologyResult"""
+    if not result:
+        return []
+    topology = result['topology'] if isinstance(result, dict) else result
+    return strand_table(self.snapshot(), topology, self.params())
+
+
+# Прикрепляем методы к классу
+MTaseAnalyzer.strand_report = strand_report
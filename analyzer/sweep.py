@@ -0,0 +1,127 @@
+"""
+Перебор параметров анализа (contact_dist, helix_radius, max_loop, min_helix_length).
+
+Геометрия структуры (SnapshotGeometry: расстояния тяж-тяж и спираль-тяж)
+считается один раз; для каждой точки сетки заново выполняются только
+дешёвые шаги - смежность листа, отбор мотивов по max_loop, присвоение
+спиралей и линейная топология. Классификацию строк добавляет batch_analyze.
+"""
+import itertools
+
+import numpy as np
+
+from .core import MTaseAnalyzer
+from .engine import SnapshotGeometry, TopologyParams, is_s2_down, segment_min_distances
+from .chains import analyze_motifs_snapshot, group_identical_chains
+from .linear import linear_elements, topology_strings
+
+PARAM_NAMES = TopologyParams._fields
+
+# Статусы мотива в точке сетки
+STATUS_OK = 'ok'
+STATUS_MAX_LOOP = 'rejected_max_loop'
+STATUS_NO_TOPOLOGY = 'no_topology'
+STATUS_S2_UP = 's2_not_down'
+
+
+def parameter_grid(base=TopologyParams(), **values):
+    """
+    Все сочетания значений параметров (TopologyParams).
+    Параметры, не переданные в values, берутся из base.
+    """
+    unknown = set(values) - set(PARAM_NAMES)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+    axes = [list(values.get(name) or [getattr(base, name)]) for name in PARAM_NAMES]
+    return [TopologyParams(*combo) for combo in itertools.product(*axes)]
+
+
+def motif_loop(motif):
+    """Расстояние от конца S4 до мотива (сравнивается с max_loop + 1)"""
+    return motif['res'] - motif['s4_end']
+
+
+def helix_contacts(geometry, topology, params):
+    """Число пар (тяж, спираль) ближе helix_radius - непустые ячейки Hu/Hd таблицы тяжей"""
+    snapshot = geometry.snapshot
+    # Только спирали со стороной Hu/Hd - строки таблицы тяжей
+    helix_ids = [h.helix_id for h in topology.helices]
+    strand_ids = [topology.strand_ids[idx] for idx, _ in topology.strand_names]
+    if not helix_ids or not strand_ids:
+        return 0
+    if params.crop_radius is not None:
+        # Обрезка: расстояния только для SSE результата, без матрицы всей цепи
+        min_dist = segment_min_distances(snapshot, [snapshot.helix_rows[i] for i in helix_ids],
+                                         [snapshot.strand_rows[i] for i in strand_ids])
+    else:
+        # Матрица geometry индексирована позициями в цепи
+        h_pos = {h: i for i, h in enumerate(snapshot.chain_helix_ids(topology.chain))}
+        s_pos = {s: i for i, s in enumerate(snapshot.chain_strand_ids(topology.chain))}
+        min_dist = geometry.helix_distances(topology.chain)[1][
+            np.ix_([h_pos[h] for h in helix_ids], [s_pos[s] for s in strand_ids])]
+    return int((min_dist < params.helix_radius).sum())
+
+
+def sweep_snapshot(snapshot, motifs, grid, geometry=None):
+    """
+    Строки перебора: по одной на (точка сетки, мотив).
+    motifs должны быть найдены с max_loop не меньше максимального в сетке;
+    топология считается один раз на (contact_dist, helix_radius, min_helix_length),
+    max_loop только отбирает мотивы.
+    """
+    if geometry is None:
+        geometry = SnapshotGeometry(snapshot)
+    groups = group_identical_chains(snapshot)
+
+    computed = {}
+    rows = []
+    for params in grid:
+        key = params._replace(max_loop=None)
+        if key not in computed:
+            computed[key] = analyze_motifs_snapshot(
+                snapshot, motifs, params, max_workers=1, geometry=geometry, groups=groups)
+
+        for motif, topology in zip(motifs, computed[key]):
+            row = dict(params._asdict())
+            row.update({
+                'chain': motif['chain'],
+                'found_motif': motif['text'],
+                'found_motif_position': f"{motif['res']}-{motif['res'] + len(motif['text']) - 1}",
+                'status': STATUS_OK,
+                'full_secondary_elements': None,
+                'strands_secondary_elements': None,
+                'strand_directions': None,
+                'n_strands': None,
+                'n_helices': None,
+                'helix_contacts': None
+            })
+            if motif_loop(motif) > params.max_loop + 1:
+                row['status'] = STATUS_MAX_LOOP
+            elif topology is None:
+                row['status'] = STATUS_NO_TOPOLOGY
+            elif not is_s2_down(topology):
+                row['status'] = STATUS_S2_UP
+            else:
+                elements = linear_elements(snapshot, topology)
+                full, strands_only, directions = topology_strings(elements)
+                row.update({
+                    'full_secondary_elements': full,
+                    'strands_secondary_elements': strands_only,
+                    'strand_directions': directions,
+                    'n_strands': len(topology.full_path),
+                    'n_helices': len(topology.helices),
+                    'helix_contacts': helix_contacts(geometry, topology, params)
+                })
+            rows.append(row)
+    return rows
+
+
+def sweep_parameters(self, grid, custom_patterns=None):
+    """Строки перебора (sweep_snapshot) для загруженной структуры"""
+    max_loop = max(params.max_loop for params in grid)
+    motifs = self.find_all_motifs(custom_patterns, max_loop=max_loop)
+    return sweep_snapshot(self.snapshot(), motifs, grid)
+
+
+# Прикрепляем методы к классу
+MTaseAnalyzer.sweep_parameters = sweep_parameters
@@ -0,0 +1,174 @@
+"""
+Трассировка этапов анализа в формате Chrome trace-event.
+
+Tracer записывает вложенные интервалы (span) с атрибутами - цепь, мотив,
+число тяжей и спиралей - как события "X" с pid/tid процесса и потока, так
+что параллельный запуск виден как временная шкала по потокам и процессам
+(chrome://tracing, Perfetto). NULL_TRACER - трассировка выключена: span
+возвращает один и тот же пустой контекст, ничего не записывается.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Выключенная трассировка"""
+    enabled = False
+
+    def span(self, name, **attrs):
+        return _NULL_SPAN
+
+
+NULL_TRACER = NullTracer()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'start')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._record(self.name, self.start, end, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Атрибуты, известные только после вычисления (число тяжей, спиралей)"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """
+    Запись интервалов в память (list.append потокобезопасен).
+    Время - perf_counter в микросекундах: на Linux это общие монотонные часы,
+    поэтому события разных процессов одного узла ложатся на одну шкалу.
+    """
+    enabled = True
+
+    def __init__(self, category='mtase'):
+        self.category = category
+        self.events = []
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def span(self, name, **attrs):
+        return _Span(self, name, attrs)
+
+    def _record(self, name, start, end, attrs):
+        pid, tid = os.getpid(), threading.get_native_id()
+        if (pid, tid) not in self._threads:
+            with self._lock:
+                if (pid, tid) not in self._threads:
+                    self._threads.add((pid, tid))
+                    self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                        'args': {'name': threading.current_thread().name}})
+        self.events.append({'name': name, 'cat': self.category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                            'ts': start * 1e6, 'dur': (end - start) * 1e6, 'args': attrs})
+
+    def drain(self):
+        """События, записанные с прошлого вызова (для передачи из рабочего процесса)"""
+        with self._lock:
+            events, self.events = self.events, []
+            self._threads = set()
+        return events
+
+
+def traced(name, attrs=None):
+    """
+    Декоратор метода MTaseAnalyzer: вызов - span name в self.tracer;
+    attrs(self, value, *args, **kwargs) - атрибуты по результату вызова
+    (вычисляются только при включённой трассировке)
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if not tracer.enabled:
+                return method(self, *args, **kwargs)
+            with tracer.span(name) as span:
+                value = method(self, *args, **kwargs)
+                if attrs is not None:
+                    span.set(**attrs(self, value, *args, **kwargs))
+            return value
+        return wrapper
+    return decorate
+
+
+def _json_value(value):
+    # numpy-скаляры в атрибутах
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class TraceWriter:
+    """
+    Потоковая запись событий в файл формата Chrome trace-event (JSON Array
+    Format: незакрытый массив тоже читается, так что прерванный запуск
+    оставляет пригодный файл).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, 'w', encoding='utf-8')
+        self._f.write('[\n')
+        self._first = True
+        self._processes = set()
+
+    def write(self, events, process_name=None):
+        """Дописывает события; process_name - подпись процессов этих событий"""
+        lines = []
+        if process_name:
+            for pid in {e['pid'] for e in events} - self._processes:
+                self._processes.add(pid)
+                lines.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                              'args': {'name': f"{process_name} {pid}"}})
+        lines.extend(events)
+        for event in lines:
+            self._f.write(('' if self._first else ',\n') + json.dumps(event, ensure_ascii=False, default=_json_value))
+            self._first = False
+        self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            self._f.write('\n]\n')
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_trace(path, events):
+    """Все события одним файлом Chrome trace-event"""
+    with TraceWriter(path) as writer:
+        writer.write(events)
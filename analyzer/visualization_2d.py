@@ -4,10 +4,14 @@ import matplotlib.patches as patches
 from matplotlib.path import Path
 from scipy.spatial import distance_matrix
 from .core import MTaseAnalyzer
+from .logs import logger
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+from .tracing import traced
 
+@traced('render_2d', lambda self, fig, result: {'chain': (result or {}).get('chain'),
+                                                'motif': (result or {}).get('motif_text')})
 def visualize_topology_interactive(self, result):
     """ИНТЕРАКТИВНАЯ 2D визуализация с Plotly"""
     if not result:
@@ -74,7 +78,7 @@ def visualize_topology_interactive(self, result):
                 unique_helices_2d[helix_key] = (display_name, side, h_start, h_end, contacts, dist)
                 helix_count += 1
 
-    print(f"Найдено {helix_count} спиралей для отображения")
+    logger.debug("Найдено %d спиралей для отображения", helix_count)
     
     for helix_key, (display_name, side, h_start, h_end, contacts, dist) in unique_helices_2d.items():
         elements.append({
@@ -89,7 +93,7 @@ def visualize_topology_interactive(self, result):
     
     elements.sort(key=lambda x: x['start'])
     
-    print(f"Всего элементов для отображения: {len(elements)}")
+    logger.debug("Всего элементов для отображения: %d", len(elements))
     
     # =================================================================
     # ПОЗИЦИОНИРОВАНИЕ ПО ЦЕНТРУ МАСС
@@ -188,7 +192,7 @@ def visualize_topology_interactive(self, result):
     # S7 (7) -> S6 (6) -> S5 (5) -> S4 (4) -> S3 (3) -> S2 (2) -> S1 (1) -> S0 (0) -> S-1 (-1)
     strand_positions.sort(key=lambda x: x['num'], reverse=True)
     
-    print(f"Правильный порядок тяжей (слева направо): {[s['name'] for s in strand_positions]}")
+    logger.debug("Правильный порядок тяжей (слева направо): %s", [s['name'] for s in strand_positions])
     
     # Разносим пересекающиеся тяжи, НО НЕ МЕНЯЕМ ПОРЯДОК!
     moved = True
@@ -240,7 +244,7 @@ def visualize_topology_interactive(self, result):
     # ПОЗИЦИОНИРОВАНИЕ СПИРАЛЕЙ С ИСКУССТВЕННЫМ РАЗВЕДЕНИЕМ
     # =================================================================
     helices = [e for e in elements if e['type'] == 'helix']
-    print(f"Позиционирование {len(helices)} спиралей")
+    logger.debug("Позиционирование %d спиралей", len(helices))
     
     # Сначала размещаем все спирали на базовых позициях
     helix_positions = []
@@ -346,7 +350,7 @@ def visualize_topology_interactive(self, result):
     for elem in sorted(elements, key=lambda x: x['start']):
         sequence_order.append(elem['name'])
     
-    print(f"Порядок следования: {sequence_order}")
+    logger.debug("Порядок следования: %s", sequence_order)
     
     # Функция для подсчета пересечений линии с элементами
     def count_line_intersections(x1, y1, x2, y2, excluded_names):
@@ -483,7 +487,7 @@ def visualize_topology_interactive(self, result):
                         'is_large': is_large_insertion
                     })
     
-    print(f"Создано {len(connections)} соединений")
+    logger.debug("Создано %d соединений", len(connections))
     
     # =================================================================
     # СОЗДАНИЕ PLOTLY ФИГУРЫ
@@ -664,12 +668,14 @@ def visualize_topology_interactive(self, result):
     ))
     
     # Настройка макета
+    motif_text = result.get('motif_text') or self.motif_info['text']
+    motif_res = result.get('motif_res') or self.motif_info['res']
     all_x = [data['x'] for data in pos_map.values()]
     max_x = max(all_x) if all_x else 10
     min_x = min(all_x) if all_x else 0
     
     fig.update_layout(
-        title=f"2D Protein Topology: Chain {result['chain']}<br>Motif: {self.motif_info['text']} ({self.motif_info['res']}) | S4: {path_map['S4'][0]}-{path_map['S4'][1]}",
+        title=f"2D Protein Topology: Chain {result['chain']}<br>Motif: {motif_text} ({motif_res}) | S4: {path_map['S4'][0]}-{path_map['S4'][1]}",
         title_font_size=18,
         width=1400,
         height=900,
@@ -704,7 +710,7 @@ def visualize_topology_interactive(self, result):
     fig.add_hline(y=2.2, line_dash="dot", line_color="lightgray", opacity=0.1)
     fig.add_hline(y=-0.2, line_dash="dot", line_color="lightgray", opacity=0.1)
     
-    print("Фигура создана успешно")
+    logger.debug("Фигура создана успешно")
     return fig
 
 
@@ -2,19 +2,23 @@ import numpy as np
 import os
 from scipy.spatial import distance_matrix
 from .core import MTaseAnalyzer
+from .logs import logger
 import py3Dmol
+from .tracing import traced
 
+@traced('render_3d', lambda self, view, result, *a, **k: {'chain': (result or {}).get('chain'),
+                                                        'motif': (result or {}).get('motif_text')})
 def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None):
     """3D визуализация структуры с учетом цепи"""
-    print(f"🔍 3D DEBUG - pdb_id: {pdb_id}, chain: {chain}, pdb_file: {pdb_file}")
-    print(f"🔍 3D DEBUG - result keys: {result.keys() if result else 'None'}")
+    logger.debug("🔍 3D DEBUG - pdb_id: %s, chain: %s, pdb_file: %s", pdb_id, chain, pdb_file)
+    logger.debug("🔍 3D DEBUG - result keys: %s", result.keys() if result else 'None')
     
     if not result:
-        print("Ошибка: нет результата анализа")
+        logger.error("Ошибка: нет результата анализа")
         return None
 
-    if not self.motif_info:
-        print("Ошибка: каталитический мотив не найден")
+    if not self.motif_info and 'motif_res' not in result:
+        logger.error("Ошибка: каталитический мотив не найден")
         return None
 
     motif_text = result.get('motif_text', 'Motif')
@@ -25,13 +29,13 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
     if chain is None:
         chain = motif_chain
     elif chain != motif_chain:
-        print(f"⚠️ Запрошена цепь {chain}, но мотив в цепи {motif_chain}")
+        logger.warning("⚠️ Запрошена цепь %s, но мотив в цепи %s", chain, motif_chain)
         chain = motif_chain
 
-    print(f"\n{'='*60}")
-    print(f"3D ВИЗУАЛИЗАЦИЯ ТОПОЛОГИИ")
-    print(f"Цепь анализа: '{chain}'")
-    print(f"{'='*60}")
+    logger.debug("\n%s", '='*60)
+    logger.debug("3D ВИЗУАЛИЗАЦИЯ ТОПОЛОГИИ")
+    logger.debug("Цепь анализа: '%s'", chain)
+    logger.debug('='*60)
 
     # -----------------------------------------------------------------
     # 1. СБОР ЭЛЕМЕНТОВ ДЛЯ РАСКРАСКИ
@@ -65,7 +69,7 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
                     'type': 'strand',
                     'chain': chain
                 })
-                print(f"  Тяж {s_name}: {s_start}-{s_end} (цепь {chain})")
+                logger.debug("  Тяж %s: %s-%s (цепь %s)", s_name, s_start, s_end, chain)
 
     # Добавляем спирали из result['helices']
     for h_keys in result['helices']:
@@ -94,12 +98,12 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
                 'side': side,
                 'chain': chain
             })
-            print(f"  Спираль {name}: {h_start}-{h_end} (цепь {chain}, {side})")
+            logger.debug("  Спираль %s: %s-%s (цепь %s, %s)", name, h_start, h_end, chain, side)
 
     elements.sort(key=lambda x: x['start'])
 
     if not elements:
-        print("Ошибка: не найдены элементы для раскраски")
+        logger.error("Ошибка: не найдены элементы для раскраски")
         return None
 
     # -----------------------------------------------------------------
@@ -118,17 +122,17 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
             with open(pdb_file, 'r') as f:
                 pdb_data = f.read()
             view = py3Dmol.view(data=pdb_data, format='pdb')
-            print(f"  Загружен локальный PDB файл: {pdb_file}")
+            logger.debug("  Загружен локальный PDB файл: %s", pdb_file)
         elif pdb_id:
             # Загружаем по PDB ID
             view = py3Dmol.view(query=f'pdb:{pdb_id}')
-            print(f"  Загружена структура PDB: {pdb_id}")
+            logger.debug("  Загружена структура PDB: %s", pdb_id)
         else:
             # Пустой viewer
             view = py3Dmol.view()
-            print("  Используется пустой viewer")
+            logger.debug("  Используется пустой viewer")
     except Exception as e:
-        print(f"  Ошибка загрузки: {e}")
+        logger.error("  Ошибка загрузки: %s", e)
         return None
 
     # -----------------------------------------------------------------
@@ -141,7 +145,7 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
     if chain:
         view.addStyle({'chain': chain}, {'cartoon': {'color': '#e0e0e0', 'opacity': 0.6}})
     
-    print(f"  Базовый стиль: весь белок светло-серый, цепь {chain} выделена")
+    logger.debug("  Базовый стиль: весь белок светло-серый, цепь %s выделена", chain)
 
     # -----------------------------------------------------------------
     # 5. РАСКРАСКА ЭЛЕМЕНТОВ ПО ТОПОЛОГИИ
@@ -262,8 +266,8 @@ def visualize_3d_structure(self, result, pdb_id=None, chain=None, pdb_file=None)
     view.setBackgroundColor('white')
     view.render()
     
-    print(f"\n✅ 3D визуализация готова для цепи {chain}")
-    print(f"{'='*60}")
+    logger.debug("\n✅ 3D визуализация готова для цепи %s", chain)
+    logger.debug('='*60)
     
     return view
 
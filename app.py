@@ -1,7 +1,10 @@
+import os
 import streamlit as st
 from components.sidebar import render_sidebar
 from pages.analysis_page import show as show_analysis  # ✅ правильный импорт
 from pages.documentation_page import show as show_docs
+from metrics import app_metrics
+from analyzer import configure_logging
 
 # Конфигурация страницы
 st.set_page_config(
@@ -10,6 +13,12 @@ st.set_page_config(
     layout="wide"
 )
 
+# Эндпоинт метрик Prometheus (если задан MTASE_METRICS_PORT)
+app_metrics()
+
+# Вывод анализатора в консоль сервера (MTASE_LOG_LEVEL=debug - отчёт по каждому мотиву)
+configure_logging(os.environ.get('MTASE_LOG_LEVEL', 'warning'))
+
 # Заголовок
 st.title("🧬 **MTase Topology Analyzer**")
 st.markdown("---")
@@ -9,18 +9,35 @@ Supports:
 Outputs topology and structural class (A-F) for each chain
 """
 
-import pandas as pd
-import sys
+import argparse
+import collections
+import contextlib
+import functools
+import glob
+import hashlib
 import io
+import itertools
+import json
+import multiprocessing
+import pandas as pd
+import queue as queue_module
 import re
+import sys
 import os
 import tempfile
+import time
 import urllib.request
 import subprocess
 import stat
 import shutil
-from analyzer import MTaseAnalyzer
-from classifier import classify_topology
+from analyzer import (MOTIF_PATTERNS, NULL_TRACER, MTaseAnalyzer, TopologyParams, TraceWriter, Tracer,
+                      configure_logging, linear_elements, parameter_grid, topology_strings)
+from classifier import classify_topology, reclassify_table
+from batch_io import Journal, ResultWriter, RunSummary, count_entries, keep_rows, load_rows, merge_shards, read_entries
+from batch_queue import FAILED, Heartbeat, WorkQueue, worker_name
+from batch_telemetry import EntryTelemetry, TelemetryLog, read_records, reused_record, stage, stage_summary
+from profiling import RunProfile, profile_call
+from metrics import PipelineMetrics, start_server
 
 # Path to DSSP executable
 DSSP_BIN = os.path.join(os.getcwd(), "mkdssp")
@@ -28,6 +45,42 @@ DSSP_BIN = os.path.join(os.getcwd(), "mkdssp")
 # Minimum strand length for reliable direction determination
 MIN_STRAND_LENGTH = 3
 
+# Output columns of a normal (non-sweep) run
+RESULT_COLUMNS = [
+    'chain', 'found_motif', 'found_motif_position', 'full_secondary_elements',
+    'strands_secondary_elements', 'strand_directions', 'class', 'class_confidence',
+    'class_reasons', 'strand_order', 'has_s0', 'has_s-1', 'gap_s6_s7',
+    'has_n_helix', 'has_c_helix'
+]
+
+# Entry status: analyzed, no motif with topology, skipped by the sequence prefilter, failed
+STATUS_OK = 'ok'
+STATUS_NO_MOTIFS = 'no_motifs'
+STATUS_SKIPPED = 'skipped_no_sequence_motif'
+STATUS_ERROR = 'error'
+
+# One-letter codes for the sequence prefilter; common modified residues map to
+# their parent amino acid (HETATM records of other residues are ignored)
+THREE_TO_ONE = {
+    'ALA': 'A', 'ARG': 'R', 'ASN': 'N', 'ASP': 'D', 'CYS': 'C', 'GLN': 'Q', 'GLU': 'E',
+    'GLY': 'G', 'HIS': 'H', 'ILE': 'I', 'LEU': 'L', 'LYS': 'K', 'MET': 'M', 'PHE': 'F',
+    'PRO': 'P', 'SER': 'S', 'THR': 'T', 'TRP': 'W', 'TYR': 'Y', 'VAL': 'V'
+}
+MODIFIED_TO_ONE = {
+    'MSE': 'M', 'SEP': 'S', 'TPO': 'T', 'PTR': 'Y', 'CSO': 'C', 'CSD': 'C', 'CME': 'C',
+    'MLY': 'K', 'M3L': 'K', 'HYP': 'P', 'KCX': 'K', 'LLP': 'K'
+}
+BACKBONE_ATOMS = frozenset({'N', 'CA', 'C', 'O'})
+
+# Shared counter of running DSSP processes (metrics.InFlight, --metrics-port), set by init_worker
+DSSP_IN_FLIGHT = None
+# Analyzer of this process, reused for every entry (see worker_analyzer)
+ANALYZER = None
+
+# Value types of the --sweep parameters
+SWEEP_TYPES = {'contact_dist': float, 'helix_radius': float, 'max_loop': int, 'min_helix_length': int,
+               'crop_radius': float}
+
 
 def clean_pdb_file(pdb_path):
     """Removes DBREF and REMARK lines from PDB file"""
@@ -42,7 +95,194 @@ def clean_pdb_file(pdb_path):
     return pdb_path
 
 
-def get_structure(id_value, type_value):
+def is_alphafold_model(pdb_file):
+    """True if the PDB header marks the file as an AlphaFold prediction (B-factor = pLDDT)"""
+    with open(pdb_file, 'r') as f:
+        for line in f:
+            if line.startswith(('ATOM  ', 'HETATM', 'MODEL ')):
+                return False
+            if 'ALPHAFOLD' in line.upper():
+                return True
+    return False
+
+
+def mask_low_plddt(pdb_file, threshold, mode='trim', out_file=None):
+    """
+    Removes residues with pLDDT (B-factor of CA) below threshold.
+    mode='trim' removes only low-confidence runs at the chain termini,
+    mode='mask' removes every low-confidence residue.
+    Writes out_file (default: in place) and returns (out_file, number of removed residues).
+    """
+    with open(pdb_file, 'r') as f:
+        lines = f.readlines()
+    
+    plddt = {}
+    chain_residues = {}
+    for line in lines:
+        if line.startswith(('ATOM  ', 'HETATM')):
+            key = (line[21], line[22:27])
+            if key not in plddt or line[12:16].strip() == 'CA':
+                plddt[key] = float(line[60:66])
+            chain_residues.setdefault(line[21], {})[key] = True
+    
+    removed = set()
+    for residues in chain_residues.values():
+        keys = list(residues)
+        low = [plddt[k] < threshold for k in keys]
+        if mode == 'mask':
+            removed.update(k for k, is_low in zip(keys, low) if is_low)
+            continue
+        start = next((i for i, is_low in enumerate(low) if not is_low), len(keys))
+        end = len(keys) - next((i for i, is_low in enumerate(reversed(low)) if not is_low), len(keys))
+        removed.update(keys[:start])
+        removed.update(keys[max(end, start):])
+    
+    kept = [line for line in lines
+            if not (line.startswith(('ATOM  ', 'HETATM', 'ANISOU')) and (line[21], line[22:27]) in removed)]
+    
+    out_file = out_file or pdb_file
+    with open(out_file, 'w') as f:
+        f.writelines(kept)
+    
+    return out_file, len(removed)
+
+
+def preprocess_structure(pdb_file, temp_dir, type_value, plddt_min=None, plddt_mode='trim'):
+    """
+    Applies pLDDT masking to AlphaFold models (downloaded or local files with an
+    AlphaFold header). Local files are never modified: the masked copy goes to a
+    new temporary directory. Returns (pdb_file, temp_dir, masked residue count or None).
+    """
+    if plddt_min is None or not (type_value == 'alphafold' or is_alphafold_model(pdb_file)):
+        return pdb_file, temp_dir, None
+    
+    out_file = pdb_file
+    if temp_dir is None:
+        temp_dir = tempfile.mkdtemp()
+        out_file = os.path.join(temp_dir, os.path.basename(pdb_file))
+    pdb_file, n_masked = mask_low_plddt(pdb_file, plddt_min, plddt_mode, out_file)
+    print(f"  ✂️ pLDDT < {plddt_min}: {n_masked} residue(s) removed ({plddt_mode})")
+    return pdb_file, temp_dir, n_masked
+
+
+def pdb_chain_sequences(pdb_file):
+    """
+    {chain: one-letter sequence} of the first model, in file order.
+    Like DSSP, only residues with a complete backbone (N, CA, C, O) are kept,
+    so a CA-only model has no sequence; SEQRES is used only when the file has
+    no ATOM records.
+    """
+    residues = {}
+    atoms = {}
+    seqres = {}
+    with open(pdb_file, 'r') as f:
+        for line in f:
+            record = line[:6]
+            if record == 'ENDMDL':
+                break
+            res_name = line[17:20].strip()
+            if record == 'ATOM  ' or (record == 'HETATM' and res_name in MODIFIED_TO_ONE):
+                chain = line[21].strip() or 'A'
+                key = (chain, line[22:27])
+                if key not in residues:
+                    residues[key] = THREE_TO_ONE.get(res_name) or MODIFIED_TO_ONE.get(res_name, 'X')
+                    atoms[key] = set()
+                atoms[key].add(line[12:16].strip())
+            elif record == 'SEQRES':
+                chain = line[11].strip() or 'A'
+                seqres.setdefault(chain, []).extend(
+                    THREE_TO_ONE.get(r) or MODIFIED_TO_ONE.get(r, 'X') for r in line[19:].split())
+    
+    if not residues:
+        return {chain: ''.join(seq) for chain, seq in seqres.items()}
+    
+    sequences = {}
+    for (chain, _), aa in residues.items():
+        if BACKBONE_ATOMS <= atoms[(chain, _)]:
+            sequences[chain] = sequences.get(chain, '') + aa
+    return sequences
+
+
+def sequence_motif_chains(sequences, patterns):
+    """
+    Chains where a motif pattern starts. As in MTaseAnalyzer.find_all_motifs the
+    patterns run over all chains concatenated in file order, so no DSSP hit is missed.
+    """
+    chain_at = []
+    for chain, seq in sequences.items():
+        chain_at.extend([chain] * len(seq))
+    full_seq = ''.join(sequences.values())
+    
+    chains = []
+    for pattern in patterns:
+        for m in re.finditer(pattern, full_seq):
+            if chain_at[m.start()] not in chains:
+                chains.append(chain_at[m.start()])
+    return chains
+
+
+def output_columns(args):
+    """Output CSV columns of a normal run (optional ones depend on the options)"""
+    columns = ['source_id', 'source_type'] + RESULT_COLUMNS + ['status']
+    if args.crop_check and args.crop_radius is not None:
+        columns.append('crop_changed')
+    if args.plddt_min is not None:
+        columns.append('masked_residues')
+    return columns + ['error', 'input_row']
+
+
+def source_fingerprint():
+    """Hash of the analyzer, classifier and batch sources (changes with the code version)"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    files = sorted(glob.glob(os.path.join(root, 'analyzer', '*.py')))
+    files += [os.path.join(root, 'classifier.py'), os.path.join(root, 'batch_analyze.py')]
+    digest = hashlib.sha1()
+    for path in files:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def run_hash(args):
+    """Hash of everything that affects the rows of an entry: code version and options"""
+    settings = {
+        'code': source_fingerprint(),
+        'params': TopologyParams(crop_radius=args.crop_radius)._asdict(),
+        'crop_check': args.crop_check,
+        'plddt_min': args.plddt_min,
+        'plddt_mode': args.plddt_mode,
+        'prefilter': args.prefilter
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def parse_shard(spec):
+    """'i/N' -> (i, N) with 0 <= i < N; raises ValueError"""
+    try:
+        index, n_shards = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 0/4)")
+    if n_shards < 1 or not 0 <= index < n_shards:
+        raise ValueError(f"Invalid shard '{spec}': i must be in 0..N-1")
+    return index, n_shards
+
+
+def shard_output(output_file, shard):
+    """Output file of one shard: output.csv -> output.shard0-of-4.csv"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.shard{shard[0]}-of-{shard[1]}{ext}"
+
+
+def empty_result(id_value, type_value, status, **extra):
+    """Output row of an entry without analyzed motifs"""
+    row = {'source_id': id_value, 'source_type': type_value}
+    row.update(dict.fromkeys(RESULT_COLUMNS))
+    row['status'] = status
+    row.update(extra)
+    return row
+
+
+def get_structure(id_value, type_value, telemetry=None, tracer=NULL_TRACER):
     """Downloads or opens structure depending on type"""
     temp_dir = tempfile.mkdtemp()
     
@@ -50,13 +290,15 @@ def get_structure(id_value, type_value):
         # Download from PDB
         url = f"https://files.rcsb.org/download/{id_value}.pdb"
         pdb_file = os.path.join(temp_dir, f"{id_value}.pdb")
-        urllib.request.urlretrieve(url, pdb_file)
+        with stage(telemetry, 'get_structure'), tracer.span('download', id=id_value, type=type_value):
+            urllib.request.urlretrieve(url, pdb_file)
         
     elif type_value == 'alphafold':
         # Download from AlphaFold
         url = f"https://alphafold.ebi.ac.uk/files/AF-{id_value}-F1-model_v6.pdb"
         pdb_file = os.path.join(temp_dir, f"{id_value}.pdb")
-        urllib.request.urlretrieve(url, pdb_file)
+        with stage(telemetry, 'get_structure'), tracer.span('download', id=id_value, type=type_value):
+            urllib.request.urlretrieve(url, pdb_file)
         
     elif type_value == 'file':
         # Use local file
@@ -71,7 +313,8 @@ def get_structure(id_value, type_value):
     
     # Clean downloaded file
     if type_value != 'file':
-        clean_pdb_file(pdb_file)
+        with stage(telemetry, 'clean_pdb_file'), tracer.span('clean_pdb_file'):
+            clean_pdb_file(pdb_file)
     
     return pdb_file, temp_dir
 
@@ -87,12 +330,13 @@ def run_dssp(pdb_file):
     env = os.environ.copy()
     env["LD_LIBRARY_PATH"] = os.getcwd() + ":" + env.get("LD_LIBRARY_PATH", "")
     
-    result = subprocess.run(
-        [DSSP_BIN, pdb_file, dssp_file],
-        capture_output=True,
-        text=True,
-        env=env
-    )
+    with DSSP_IN_FLIGHT or contextlib.nullcontext():
+        result = subprocess.run(
+            [DSSP_BIN, pdb_file, dssp_file],
+            capture_output=True,
+            text=True,
+            env=env
+        )
     
     if result.returncode != 0:
         raise RuntimeError(f"DSSP Error: {result.stderr}")
@@ -100,100 +344,103 @@ def run_dssp(pdb_file):
     return dssp_file
 
 
+def worker_analyzer(crop_radius=None, tracer=NULL_TRACER):
+    """
+    The analyzer of this process, reset for the next structure. Its coordinate
+    buffers (grown to the largest structure seen) and compiled motif patterns
+    are kept between entries, so long-lived workers do not reallocate them
+    for every structure.
+    """
+    global ANALYZER
+    if ANALYZER is None:
+        ANALYZER = MTaseAnalyzer(reuse_buffers=True)
+    return ANALYZER.reset(crop_radius=crop_radius, tracer=tracer)
+
+
 def get_topology_string(analyzer, result):
     """Returns topology string same as in web application"""
     if not result:
         return "", "", ""
-    
-    old_stdout = sys.stdout
-    new_stdout = io.StringIO()
-    sys.stdout = new_stdout
-    
-    analyzer.print_linear_topology_from_result(result)
-    
-    sys.stdout = old_stdout
-    linear_topology = new_stdout.getvalue()
-    
-    lines = linear_topology.strip().split('\n')
-    topology_line = ""
-    
-    for line in lines:
-        if ('↑' in line or '↓' in line) and '[' in line and ']' in line:
-            topology_line = line.strip()
-            break
-    
-    if not topology_line:
-        return "", "", ""
-    
-    # Remove distance annotations
-    topology_line = re.sub(r'\s*\([\d.]+ Å\)', '', topology_line)
-    full_topology = topology_line
-    
-    # Strands only (without Hd/Hu helices)
-    strands_only = topology_line
-    strands_only = re.sub(r'H[ud][_a-zA-Z0-9]*\[[\d-]+\]\s*—\s*', '', strands_only)
-    strands_only = re.sub(r'^[Hh][ud][_a-zA-Z0-9]*\[[\d-]+\]\s*—\s*', '', strands_only)
-    strands_only = re.sub(r'\s*—\s*[Hh][ud][_a-zA-Z0-9]*\[[\d-]+\]$', '', strands_only)
-    
-    # Extract directions in descending strand number order (S7 → S6 → ... → S-1)
-    s_numbers = re.findall(r'S(-?\d+)\([↑↓]\)', full_topology)
-    s_numbers_sorted = sorted(set(int(n) for n in s_numbers), reverse=True)
-    
-    directions = []
-    for num in s_numbers_sorted:
-        s_name = f"S{num}"
-        match = re.search(f'{s_name}\([↑↓]\)', full_topology)
-        if match:
-            if '(↑)' in match.group():
-                directions.append('↑')
-            elif '(↓)' in match.group():
-                directions.append('↓')
-    
-    directions_str = ''.join(directions)
-    
-    return full_topology, strands_only, directions_str
+    return topology_strings(analyzer.linear_topology(result))
 
 
-def analyze_structure(pdb_file):
-    """Analyzes a single PDB structure"""
+def analyze_structure(pdb_file, crop_radius=None, crop_check=False, max_workers=None, telemetry=None,
+                      tracer=NULL_TRACER):
+    """
+    Analyzes a single PDB structure.
+    crop_radius limits the analysis to SSEs near S4; crop_check also runs the
+    full-chain analysis and adds a crop_changed flag to every row.
+    max_workers limits the threads used for distinct chains (1 inside a process pool).
+    telemetry (EntryTelemetry) records stage times and structure sizes;
+    tracer (analyzer.Tracer) records nested spans of DSSP, the analyzer and classification.
+    """
     temp_dirs = []
     
     try:
         # Run DSSP
-        dssp_file = run_dssp(pdb_file)
+        with stage(telemetry, 'run_dssp'), tracer.span('dssp'):
+            dssp_file = run_dssp(pdb_file)
         
         # Create analyzer
-        analyzer = MTaseAnalyzer()
-        if not analyzer.load_dssp(dssp_file):
-            return None
+        analyzer = worker_analyzer(crop_radius, tracer)
+        with stage(telemetry, 'load_dssp'):
+            if not analyzer.load_dssp(dssp_file):
+                return None
         
-        analyzer.find_all_strands()
-        analyzer.build_sheet_adjacency()
+        with stage(telemetry, 'find_all_strands'):
+            analyzer.find_all_strands()
+        with stage(telemetry, 'build_sheet_adjacency'):
+            analyzer.build_sheet_adjacency()
         
-        motifs = analyzer.find_all_motifs()
-        motifs = analyzer.filter_motifs_by_topology(motifs)
+        with stage(telemetry, 'find_all_motifs'):
+            motifs = analyzer.find_all_motifs()
+        # Identical chains are analyzed once, distinct chains in parallel
+        with stage(telemetry, 'analyze_topology'):
+            analyzed = analyzer.analyze_filtered_motifs(motifs, max_workers=max_workers)
         
-        if not motifs:
+        if telemetry is not None:
+            telemetry.count(
+                residues=len(analyzer.res_data),
+                chains=len({r['chain'] for r in analyzer.res_data.values()}),
+                strands=len(analyzer.strands),
+                helices=len(analyzer.helices),
+                motifs=len(motifs),
+                motifs_s2_down=len(analyzed)
+            )
+        
+        if not analyzed:
             return None
         
+        crop_changed = {}
+        if crop_check:
+            motif_list = [m for m, _ in analyzed]
+            with stage(telemetry, 'crop_check'):
+                changes = analyzer.crop_changes(motif_list, max_workers=max_workers)
+            crop_changed = {id(m): c for m, c in zip(motif_list, changes)}
+            n_changed = sum(crop_changed.values())
+            if n_changed:
+                print(f"  ⚠️ Cropping to {crop_radius} Å changed {n_changed} motif result(s)")
+        
+        snapshot = analyzer.snapshot()
         results = []
-        for motif_data in motifs:
+        for motif_data, topology in analyzed:
             chain = motif_data['chain']
             motif_text = motif_data['text']
             motif_res = motif_data['res']
             motif_position = f"{motif_res}-{motif_res + len(motif_text) - 1}"
             
-            result = analyzer.analyze_topology(motif_data=motif_data)
-            if not result:
-                continue
-            
-            full_topology, strands_only, directions = get_topology_string(analyzer, result)
+            with stage(telemetry, 'linear_topology'), tracer.span('linear_topology', chain=chain, motif=motif_text):
+                elements = linear_elements(snapshot, topology)
+                full_topology, strands_only, directions = topology_strings(elements)
             
             if not full_topology:
                 continue
             
-            # Classify topology
-            classification = classify_topology(full_topology, motif_text)
+            # Classify topology (from the element list, no string re-parsing)
+            with stage(telemetry, 'classify_topology'), \
+                    tracer.span('classification', chain=chain, motif=motif_text) as span:
+                classification = classify_topology(elements, motif_text)
+                span.set(topology_class=classification['class'])
             
             results.append({
                 'chain': chain,
@@ -212,6 +459,8 @@ def analyze_structure(pdb_file):
                 'has_n_helix': classification['has_n_helix'],
                 'has_c_helix': classification['has_c_helix']
             })
+            if crop_check:
+                results[-1]['crop_changed'] = crop_changed[id(motif_data)]
         
         return results
     
@@ -220,162 +469,689 @@ def analyze_structure(pdb_file):
         return None
 
 
-def main():
-    print("=" * 70)
-    print("MTase Batch Analyzer")
-    print("=" * 70)
-    print("Input CSV format: ID,Type")
-    print("  Type: pdb, alphafold, file")
-    print("=" * 70)
+def parse_sweep(specs, base=TopologyParams()):
+    """['contact_dist=4.8,5.2', 'max_loop=3,5'] -> parameter grid (list of TopologyParams)"""
+    values = {}
+    for spec in specs:
+        name, _, raw = spec.partition('=')
+        name = name.strip()
+        if name not in SWEEP_TYPES or not raw:
+            raise ValueError(f"Bad --sweep value '{spec}', expected PARAM=V1,V2,... "
+                             f"with PARAM one of: {', '.join(SWEEP_TYPES)}")
+        # 'none' switches cropping off (full chain) within a crop_radius sweep
+        values[name] = [None if name == 'crop_radius' and v.strip().lower() == 'none' else SWEEP_TYPES[name](v)
+                        for v in raw.split(',') if v.strip()]
+    return parameter_grid(base, **values)
+
+
+def sweep_structure(pdb_file, grid):
+    """Runs DSSP once and evaluates every grid point on the same structure"""
+    dssp_file = run_dssp(pdb_file)
+    
+    analyzer = worker_analyzer()
+    if not analyzer.load_dssp(dssp_file):
+        return []
+    analyzer.find_all_strands()
+    return analyzer.sweep_parameters(grid)
+
+
+def sweep_report(df, baseline):
+    """
+    One row per motif: class call at the baseline parameters and every
+    grid point where the call differs (rejected motifs count as calls too)
+    """
+    params = list(TopologyParams._fields)
+    keys = ['source_id', 'source_type', 'chain', 'found_motif', 'found_motif_position']
+    df = df[df['found_motif'].notna()].copy()
+    df['call'] = df['class'].where(df['status'] == 'ok', df['status']).fillna('unclassified')
+    
+    def same(value, base):
+        # None parameters (crop_radius) are NaN in the table
+        return pd.isna(value) if base is None else value == base
+    
+    is_baseline = pd.concat([df[p].map(lambda v, b=getattr(baseline, p): same(v, b)) for p in params], axis=1).all(axis=1)
+    
+    report = []
+    for key, group in df.groupby(keys, sort=False):
+        base_calls = group.loc[is_baseline[group.index], 'call']
+        base_call = base_calls.iloc[0] if len(base_calls) else None
+        changed = group[group['call'] != base_call]
+        counts = group['call'].value_counts()
+        report.append(dict(zip(keys, key), **{
+            'baseline_class': base_call,
+            'n_calls': len(counts),
+            'calls': '; '.join(f"{call}: {n}" for call, n in counts.items()),
+            'changed_at': ' | '.join(
+                ', '.join(f"{p}={row[p]}" for p in params if not same(row[p], getattr(baseline, p))) + f" -> {row['call']}"
+                for _, row in changed.iterrows()
+            )
+        }))
+    return pd.DataFrame(report, columns=keys + ['baseline_class', 'n_calls', 'calls', 'changed_at'])
+
+
+def entry_tasks(entries, total, args, *extra, skip=()):
+    """
+    Worker tasks (index, total, ID, type, options, *extra), one per distinct
+    (ID, Type) in entries (input_row, ID, Type); keys in skip are left out
+    """
+    seen = set(skip)
+    for idx, id_value, type_value in entries:
+        if (id_value, type_value) not in seen:
+            seen.add((id_value, type_value))
+            yield (idx, total, id_value, type_value, args) + extra
+
+
+def _captured(worker, task):
+    """Runs worker(task) with its output captured, so pool logs stay in input order"""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = worker(task)
+    return buf.getvalue(), result
+
+
+def log_level(args):
+    """Analyzer log level: warnings only by default, -v adds per-structure summaries, -vv debug output"""
+    return ('warning', 'info', 'debug')[min(args.verbose, 2)]
+
+
+def init_worker(dssp_in_flight=None, level='warning'):
+    """
+    Per-process state of a worker: the shared DSSP counter of the metrics
+    endpoint and the analyzer log level (see log_level)
+    """
+    global DSSP_IN_FLIGHT
+    DSSP_IN_FLIGHT = dssp_in_flight
+    configure_logging(level)
+
+
+def run_entries(worker, tasks, jobs=1, max_tasks_per_child=None, initargs=(), max_pending=10000):
+    """
+    Yields worker(task) for every task, in input order.
+    With jobs > 1 the tasks run in a process pool whose workers are replaced
+    after max_tasks_per_child entries (bounds memory growth of long runs).
+    At most max_pending tasks are submitted ahead of the one being yielded,
+    so tasks are read from the generator only as results are consumed.
+    Every worker process is set up with init_worker(*initargs).
+    """
+    if jobs <= 1:
+        init_worker(*initargs)
+        for task in tasks:
+            yield worker(task)
+        return
+    
+    run = functools.partial(_captured, worker)
+    tasks = iter(tasks)
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=initargs,
+                              maxtasksperchild=max_tasks_per_child) as pool:
+        pending = collections.deque(pool.apply_async(run, (task,))
+                                    for task in itertools.islice(tasks, max(max_pending, 1)))
+        while pending:
+            log, result = pending.popleft().get()
+            for task in itertools.islice(tasks, 1):
+                pending.append(pool.apply_async(run, (task,)))
+            sys.stdout.write(log)
+            yield result
+
+
+class EntryResult(collections.namedtuple('EntryResult', ['rows', 'record', 'profile', 'trace'])):
+    """
+    Worker result of one input entry: output rows, telemetry record
+    (args.telemetry), profile (args.profile, see profiling.profiled) and
+    trace events (args.trace); the optional parts are None when disabled
+    """
+    __slots__ = ()
+
+
+def process_entry(task):
+    """EntryResult of one input entry"""
+    idx, total, id_value, type_value, args = task
+    # Records also feed the metrics endpoint
+    telemetry = EntryTelemetry(idx, id_value, type_value) if args.telemetry or args.metrics_port else None
+    tracer = Tracer() if args.trace else NULL_TRACER
+    profile = None
+    with tracer.span('entry', id=id_value, type=type_value) as span:
+        if args.profile:
+            rows, profile = profile_call(entry_rows, task, telemetry, tracer)
+        else:
+            rows = entry_rows(task, telemetry, tracer)
+        span.set(status=rows[0]['status'], rows=len(rows))
+    record = None if telemetry is None else telemetry.finish(rows[0]['status'])
+    return EntryResult(rows, record, profile, tracer.drain() if args.trace else None)
+
+
+def entry_rows(task, telemetry=None, tracer=NULL_TRACER):
+    """Output rows of one input entry: download, pLDDT masking, prefilter, DSSP, analysis"""
+    idx, total, id_value, type_value, args = task
+    print(f"\n🔬 {idx+1}/{total}: {id_value} ({type_value})")
+    
+    temp_dir = None
+    rows = []
+    try:
+        # Get structure
+        pdb_file, temp_dir = get_structure(id_value, type_value, telemetry, tracer)
+        
+        # Drop low-confidence residues of AlphaFold models before DSSP
+        with stage(telemetry, 'preprocess_structure'), tracer.span('preprocess_structure'):
+            pdb_file, temp_dir, n_masked = preprocess_structure(
+                pdb_file, temp_dir, type_value, args.plddt_min, args.plddt_mode)
+        extra = {} if n_masked is None else {'masked_residues': n_masked}
+        
+        # Cheap sequence prefilter: no motif pattern in any chain -> no DSSP
+        with stage(telemetry, 'sequence_prefilter'), tracer.span('sequence_prefilter'):
+            has_motif = not args.prefilter or sequence_motif_chains(pdb_chain_sequences(pdb_file), MOTIF_PATTERNS)
+        if not has_motif:
+            print(f"  ⏭️ No motif in sequence, skipped")
+            return [empty_result(id_value, type_value, STATUS_SKIPPED, **extra)]
+        
+        # Analyze (inside a process pool each worker stays single-threaded;
+        # cProfile only sees the thread it runs in)
+        results = analyze_structure(pdb_file, args.crop_radius, args.crop_check and args.crop_radius is not None,
+                                    max_workers=1 if args.jobs > 1 or args.profile else None,
+                                    telemetry=telemetry, tracer=tracer)
+        
+        if not results:
+            print(f"  ⚠️ No motifs found")
+            return [empty_result(id_value, type_value, STATUS_NO_MOTIFS, **extra)]
+        
+        for res in results:
+            row = {'source_id': id_value, 'source_type': type_value}
+            row.update(res)
+            row['status'] = STATUS_OK
+            row.update(extra)
+            rows.append(row)
+        print(f"  ✅ Found {len(results)} chain(s)")
+        return rows
+    
+    except Exception as e:
+        print(f"  ❌ Error: {str(e)}")
+        if telemetry is not None:
+            telemetry.error(e)
+        return [empty_result(id_value, type_value, STATUS_ERROR, error=str(e))]
     
-    # Parse command line arguments
-    input_file = 'input.csv'
-    output_file = 'output.csv'
+    finally:
+        # Clean up temporary directory
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+
+def sweep_entry(task):
+    """Sweep rows of one input entry (worker function, see run_entries)"""
+    idx, total, id_value, type_value, args, grid = task
+    print(f"\n🔬 {idx+1}/{total}: {id_value} ({type_value})")
+    
+    temp_dir = None
+    try:
+        pdb_file, temp_dir = get_structure(id_value, type_value)
+        pdb_file, temp_dir, n_masked = preprocess_structure(
+            pdb_file, temp_dir, type_value, args.plddt_min, args.plddt_mode)
+        extra = {} if n_masked is None else {'masked_residues': n_masked}
+        if args.prefilter and not sequence_motif_chains(pdb_chain_sequences(pdb_file), MOTIF_PATTERNS):
+            print(f"  ⏭️ No motif in sequence, skipped")
+            return [dict(source_id=id_value, source_type=type_value, status=STATUS_SKIPPED, **extra)]
+        rows = sweep_structure(pdb_file, grid)
+        print(f"  ✅ {len(rows)} grid row(s)")
+        return [dict(source_id=id_value, source_type=type_value, **r, **extra) for r in rows]
+    except Exception as e:
+        print(f"  ❌ Error: {str(e)}")
+        return [{'source_id': id_value, 'source_type': type_value, 'status': STATUS_ERROR, 'error': str(e)}]
+    finally:
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+
+def run_sweep(total, grid, output_file, args):
+    """
+    Parameter sweep over all distinct input structures (duplicate ID/Type rows
+    are swept once); writes grid rows and a per-motif report
+    """
+    baseline = TopologyParams(crop_radius=args.crop_radius)
+    if baseline not in grid:
+        baseline = grid[0]
+    
+    print(f"\n📊 Sweeping {len(grid)} parameter combination(s)...")
+    print("-" * 70)
+    
+    all_rows = []
+    tasks = entry_tasks(read_entries(args.input_file, args.chunk_size), total, args, grid)
+    for rows in run_entries(sweep_entry, tasks, args.jobs, args.max_tasks_per_child, (None, log_level(args)),
+                            args.chunk_size):
+        all_rows.extend(rows)
+    
+    df_out = pd.DataFrame(all_rows)
+    if 'full_secondary_elements' in df_out.columns:
+        df_out = reclassify_table(df_out, column='full_secondary_elements')
+    df_out.to_csv(output_file, index=False, encoding='utf-8-sig')
+    
+    report_file = os.path.splitext(output_file)[0] + '_sweep_report.csv'
+    report = sweep_report(df_out, baseline) if 'found_motif' in df_out.columns else pd.DataFrame()
+    report.to_csv(report_file, index=False, encoding='utf-8-sig')
+    
+    print("\n" + "=" * 70)
+    print(f"✅ Done! Grid rows saved to {output_file}, report to {report_file}")
+    print(f"📊 Baseline: {', '.join(f'{k}={v}' for k, v in baseline._asdict().items())}")
+    if len(report):
+        stable = int((report['n_calls'] == 1).sum())
+        print(f"📊 Motifs with a stable class call: {stable}/{len(report)}")
+        calls = df_out['class'].where(df_out['status'] == 'ok', df_out['status'])
+        for param in TopologyParams._fields:
+            if df_out[param].nunique(dropna=False) > 1:
+                print(f"\n📊 Class calls by {param}:")
+                print(pd.crosstab(df_out[param].astype(object).fillna('none'), calls).to_string())
+    print("=" * 70)
+
+
+def queue_worker(queue_file, args, telemetry_file=None, observe=None, dssp_in_flight=None):
+    """
+    Processes entries leased from the work queue until no entry is pending or
+    leased; observe(record) receives the telemetry record of every entry
+    """
+    init_worker(dssp_in_flight, log_level(args))
+    worker = worker_name()
+    # Poll for leases of other workers that may still expire and come back
+    poll = min(30, args.lease_seconds / 4)
+    with WorkQueue(queue_file, args.lease_seconds, args.max_attempts) as queue, \
+            (TelemetryLog(telemetry_file, append=True) if telemetry_file else contextlib.nullcontext()) as log:
+        total = queue.meta('total')
+        while True:
+            leased = queue.lease(worker)
+            if leased is None:
+                if queue.finished():
+                    return
+                time.sleep(poll)
+                continue
+            idx, id_value, type_value = leased
+            key = (id_value, type_value)
+            with Heartbeat(queue, key, worker, args.lease_seconds / 3):
+                result = process_entry((idx, total, id_value, type_value, args))
+            rows = result.rows
+            error = rows[0].get('error') if rows[0]['status'] == STATUS_ERROR else None
+            if not queue.complete(key, worker, rows, error):
+                print(f"  ⚠️ Lease of {id_value} ({type_value}) expired, result dropped")
+            if result.record is not None:
+                if telemetry_file:
+                    log.write(result.record)
+                if observe is not None:
+                    observe(result.record)
+
+
+def run_queue(input_file, output_file, args):
+    """
+    --queue: seeds the queue from input_file (first worker only), works on it
+    with args.jobs local worker processes and exports output_file when it is done
+    """
+    entry_hash = run_hash(args)
+    with WorkQueue(args.queue, args.lease_seconds, args.max_attempts) as queue:
+        if not queue.meta('seeded'):
+            try:
+                if queue.seed(input_file, args.chunk_size, run_hash=entry_hash, columns=output_columns(args)):
+                    print(f"\n✅ Queue {args.queue} seeded from {input_file}")
+            except (FileNotFoundError, ValueError) as e:
+                input_error(input_file, e)
+        if queue.meta('run_hash') != entry_hash:
+            print(f"\n❌ Queue {args.queue} was created with other options or code version")
+            sys.exit(1)
+        counts = queue.counts()
+        print(f"\n✅ Queue: {queue.meta('total')} input rows, "
+              + ', '.join(f"{n} {state}" for state, n in sorted(counts.items())))
     
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-    if len(sys.argv) > 2:
-        output_file = sys.argv[2]
+    # Workers of every node append to the same telemetry file
+    telemetry = telemetry_file(output_file) if args.telemetry else None
+    metrics = start_metrics(args.metrics_port)
+    if metrics is not None:
+        # Queue depth of all nodes, read from the queue at scrape time
+        metrics.queue_depth.callback = functools.partial(queue_depth, args.queue)
+    print("\n📊 Analyzing structures...")
+    print("-" * 70)
+    if args.jobs > 1:
+        # Local workers send their records to this process for the metrics endpoint
+        records = multiprocessing.Queue() if metrics is not None else None
+        observe = records.put if records is not None else None
+        dssp_in_flight = metrics.dssp_in_flight if metrics is not None else None
+        workers = [multiprocessing.Process(target=queue_worker, args=(
+            args.queue, args, telemetry, observe, dssp_in_flight)) for _ in range(args.jobs)]
+        for p in workers:
+            p.start()
+        # Records are drained while the workers run (a worker exits only once its records are read)
+        while records is not None:
+            try:
+                metrics.observe_record(records.get(timeout=1))
+            except queue_module.Empty:
+                if not any(p.is_alive() for p in workers):
+                    break
+        for p in workers:
+            p.join()
+    elif metrics is not None:
+        queue_worker(args.queue, args, telemetry, metrics.observe_record, metrics.dssp_in_flight)
+    else:
+        queue_worker(args.queue, args, telemetry)
     
-    # Load input CSV
+    with WorkQueue(args.queue, args.lease_seconds, args.max_attempts) as queue:
+        summary = queue.export(output_file, queue.meta('columns'), args.buffer_size)
+        failed = queue.counts().get(FAILED, 0)
+        total = queue.meta('total')
+    print_summary(summary, output_file, total, failed=failed)
+    if telemetry and os.path.exists(telemetry):
+        print_stage_summary(read_records(telemetry), telemetry)
+
+
+def start_metrics(port):
+    """PipelineMetrics served on localhost:port, or None without a port"""
+    if not port:
+        return None
+    metrics = PipelineMetrics()
     try:
-        df = pd.read_csv(input_file)
-        print(f"\n✅ Loaded {len(df)} entries from {input_file}")
-    except FileNotFoundError:
+        start_server(metrics.registry, port)
+    except OSError as e:
+        print(f"\n❌ Cannot serve metrics on port {port}: {e}")
+        sys.exit(1)
+    print(f"\n📈 Metrics at http://127.0.0.1:{port}/metrics")
+    return metrics
+
+
+def queue_depth(queue_file):
+    """{(state,): entries} of the pending and leased entries of a work queue"""
+    with WorkQueue(queue_file) as queue:
+        counts = queue.counts()
+    return {(state,): counts.get(state, 0) for state in ('pending', 'leased')}
+
+
+def telemetry_file(output_file):
+    """Telemetry sidecar of an output file: output.csv -> output_telemetry.jsonl"""
+    return os.path.splitext(output_file)[0] + '_telemetry.jsonl'
+
+
+def profile_files(output_file):
+    """Profile outputs of an output file: output.csv -> output_profile.prof, output_hotspots.txt"""
+    root = os.path.splitext(output_file)[0]
+    return root + '_profile.prof', root + '_hotspots.txt'
+
+
+def write_profile(run_profile, output_file, top=30):
+    """Writes the merged profile and the hotspot report, prints the top hotspots"""
+    if not run_profile.structures:
+        return
+    prof_file, report_file = profile_files(output_file)
+    run_profile.dump(prof_file)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(run_profile.report(top))
+    print(f"\n🔥 Top hotspots (own time) of {run_profile.structures} profiled entries, "
+          f"report in {report_file}, stats in {prof_file}:")
+    print(run_profile.hotspots('tottime', 10).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("=" * 70)
+
+
+def print_stage_summary(records, path):
+    """Per-stage percentiles of the telemetry records"""
+    table = stage_summary(records)
+    if table.empty:
+        return
+    print(f"\n⏱️ Stage times (s) of {table['entries'].max()} entries, details in {path}:")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("=" * 70)
+
+
+def input_error(input_file, error):
+    """Exits with the message for a missing input file or missing columns"""
+    if isinstance(error, FileNotFoundError):
         print(f"\n❌ File {input_file} not found!")
         print("   Please create input.csv with columns: ID,Type")
-        sys.exit(1)
-    
-    # Validate columns
-    if 'ID' not in df.columns or 'Type' not in df.columns:
+    else:
         print("\n❌ CSV must have columns: ID, Type")
         print("   Example:")
         print("   ID,Type")
         print("   3S1S,pdb")
         print("   A0A7R8ZSU6,alphafold")
         print("   /path/to/file.pdb,file")
+    sys.exit(1)
+
+
+def print_summary(summary, output_file, total, reused=0, failed=0):
+    """End-of-run summary (RunSummary of the written rows)"""
+    print("\n" + "=" * 70)
+    print(f"✅ Done! Saved to {output_file}")
+    print(f"📊 Processed: {total} entries")
+    if reused:
+        print(f"📊 Duplicate entries (results reused): {reused}")
+    print(f"📊 Chains with motifs: {summary.chains_with_motifs}")
+    skipped = summary.status_counts[STATUS_SKIPPED]
+    if skipped:
+        print(f"📊 Skipped by sequence prefilter: {skipped}")
+    if failed:
+        print(f"📊 Failed entries (out of attempts): {failed}")
+    
+    # Class distribution
+    if summary.class_counts:
+        print(f"\n📊 Class distribution:")
+        for cls, count in summary.class_counts.most_common():
+            print(f"   Class {cls}: {count}")
+    
+    print("=" * 70)
+
+
+def merge_outputs(output_file, n_shards, buffer_size=100):
+    """Merges the outputs of shards 0..n_shards-1 (see --shard) into output_file"""
+    paths = [shard_output(output_file, (i, n_shards)) for i in range(n_shards)]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"\n❌ Missing shard outputs: {', '.join(missing)}")
         sys.exit(1)
     
-    # Results container
-    all_results = []
+    print(f"\n📊 Merging {n_shards} shard(s) into {output_file}...")
+    summary, entries = merge_shards(paths, output_file, buffer_size)
+    print_summary(summary, output_file, entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MTase Batch Analyzer")
+    parser.add_argument('input_file', nargs='?', default='input.csv', help="CSV with columns ID,Type")
+    parser.add_argument('output_file', nargs='?', default='output.csv', help="output CSV")
+    parser.add_argument('--sweep', action='append', metavar='PARAM=V1,V2,...',
+                        help="parameter sweep instead of a single run; PARAM is one of "
+                             f"{', '.join(SWEEP_TYPES)} (repeat for several parameters)")
+    parser.add_argument('--no-prefilter', dest='prefilter', action='store_false',
+                        help="run DSSP even when no chain sequence contains a motif pattern")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="process entries in a pool of N worker processes (output keeps input order)")
+    parser.add_argument('--max-tasks-per-child', type=int, default=50, metavar='K',
+                        help="replace each pool worker after K entries (default: 50)")
+    parser.add_argument('--force', action='store_true',
+                        help="ignore the journal of a previous run and recompute every entry")
+    parser.add_argument('--chunk-size', type=int, default=10000, metavar='R',
+                        help="input CSV rows read at a time, also the limit of entries queued "
+                             "ahead of the pool workers (default: 10000)")
+    parser.add_argument('--buffer-size', type=int, default=100, metavar='R',
+                        help="rows buffered before each append to the output file (default: 100)")
+    parser.add_argument('--plddt-min', type=float, metavar='T',
+                        help="AlphaFold models: remove residues with pLDDT below T before DSSP")
+    parser.add_argument('--plddt-mode', choices=['trim', 'mask'], default='trim',
+                        help="trim: only low-pLDDT chain termini (default); mask: every low-pLDDT residue")
+    parser.add_argument('--crop-radius', type=float, metavar='R',
+                        help="analyze only strands and helices within R Å of the motif's S4 centre")
+    parser.add_argument('--crop-check', action='store_true',
+                        help="with --crop-radius, also run the full-chain analysis and add a crop_changed column")
+    parser.add_argument('--shard', metavar='i/N',
+                        help="process only shard i (0-based) of N; writes <output>.shard<i>-of-<N>.csv")
+    parser.add_argument('--merge', type=int, metavar='N',
+                        help="merge the outputs of shards 0..N-1 into output_file and print the combined summary")
+    parser.add_argument('--telemetry', action='store_true',
+                        help="record per-stage times, memory and structure sizes of every entry "
+                             "in <output>_telemetry.jsonl and print stage percentiles")
+    parser.add_argument('--profile', action='store_true',
+                        help="run every entry under cProfile (chains single-threaded) and write the merged stats "
+                             "to <output>_profile.prof and a ranked hotspot report to <output>_hotspots.txt")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="write nested spans (download, DSSP, parse, segmentation, adjacency, sheet walk, "
+                             "helix assignment, classification) of every entry to FILE in Chrome trace-event JSON")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve live Prometheus metrics (throughput, queue depth, running DSSP processes, "
+                             "cache hits, errors, stage latencies) at http://127.0.0.1:PORT/metrics")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="analyzer log output: -v per-structure summaries, -vv coordinate systems, "
+                             "helix sides and strand tables of every motif (use with a single structure)")
+    parser.add_argument('--queue', metavar='DB',
+                        help="pull entries from a shared SQLite work queue (seeded from input_file on first use)")
+    parser.add_argument('--lease-seconds', type=float, default=600, metavar='S',
+                        help="with --queue, lease lifetime without heartbeat (default: 600)")
+    parser.add_argument('--max-attempts', type=int, default=3, metavar='K',
+                        help="with --queue, attempts per entry before it is marked failed (default: 3)")
+    args = parser.parse_args()
     
-    print("\n📊 Analyzing structures...")
-    print("-" * 70)
+    print("=" * 70)
+    print("MTase Batch Analyzer")
+    print("=" * 70)
+    print("Input CSV format: ID,Type")
+    print("  Type: pdb, alphafold, file")
+    print("=" * 70)
     
-    for idx, row in df.iterrows():
-        id_value = str(row['ID']).strip()
-        type_value = str(row['Type']).strip().lower()
-        
-        print(f"\n🔬 {idx+1}/{len(df)}: {id_value} ({type_value})")
-        
-        pdb_file = None
-        temp_dir = None
-        
+    input_file = args.input_file
+    output_file = args.output_file
+    
+    if args.merge:
+        merge_outputs(output_file, args.merge, args.buffer_size)
+        return
+    
+    shard = None
+    if args.shard:
         try:
-            # Get structure
-            pdb_file, temp_dir = get_structure(id_value, type_value)
-            
-            # Analyze
-            results = analyze_structure(pdb_file)
-            
-            if results:
-                for res in results:
-                    all_results.append({
-                        'source_id': id_value,
-                        'source_type': type_value,
-                        'chain': res['chain'],
-                        'found_motif': res['found_motif'],
-                        'found_motif_position': res['found_motif_position'],
-                        'full_secondary_elements': res['full_secondary_elements'],
-                        'strands_secondary_elements': res['strands_secondary_elements'],
-                        'strand_directions': res['strand_directions'],
-                        'class': res['class'],
-                        'class_confidence': res['class_confidence'],
-                        'class_reasons': res['class_reasons'],
-                        'strand_order': res['strand_order'],
-                        'has_s0': res['has_s0'],
-                        'has_s-1': res['has_s-1'],
-                        'gap_s6_s7': res['gap_s6_s7'],
-                        'has_n_helix': res['has_n_helix'],
-                        'has_c_helix': res['has_c_helix']
-                    })
-                print(f"  ✅ Found {len(results)} chain(s)")
-            else:
-                all_results.append({
-                    'source_id': id_value,
-                    'source_type': type_value,
-                    'chain': None,
-                    'found_motif': None,
-                    'found_motif_position': None,
-                    'full_secondary_elements': None,
-                    'strands_secondary_elements': None,
-                    'strand_directions': None,
-                    'class': None,
-                    'class_confidence': None,
-                    'class_reasons': None,
-                    'strand_order': None,
-                    'has_s0': None,
-                    'has_s-1': None,
-                    'gap_s6_s7': None,
-                    'has_n_helix': None,
-                    'has_c_helix': None
-                })
-                print(f"  ⚠️ No motifs found")
-            
-            # Clean up temporary directory
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)}")
-            all_results.append({
-                'source_id': id_value,
-                'source_type': type_value,
-                'chain': None,
-                'found_motif': None,
-                'found_motif_position': None,
-                'full_secondary_elements': None,
-                'strands_secondary_elements': None,
-                'strand_directions': None,
-                'class': None,
-                'class_confidence': None,
-                'class_reasons': None,
-                'strand_order': None,
-                'has_s0': None,
-                'has_s-1': None,
-                'gap_s6_s7': None,
-                'has_n_helix': None,
-                'has_c_helix': None,
-                'error': str(e)
-            })
-            
-            # Clean up on error
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"\n❌ {e}")
+            sys.exit(1)
+        if args.sweep:
+            print("\n❌ --shard cannot be combined with --sweep")
+            sys.exit(1)
+        output_file = shard_output(output_file, shard)
     
-    # Create output DataFrame
-    df_out = pd.DataFrame(all_results)
+    for option in ('profile', 'trace'):
+        if getattr(args, option) and (args.sweep or args.queue):
+            print(f"\n❌ --{option} cannot be combined with --sweep or --queue")
+            sys.exit(1)
     
-    # Save results
-    df_out.to_csv(output_file, index=False, encoding='utf-8-sig')
+    if args.queue:
+        if args.sweep or shard:
+            print("\n❌ --queue cannot be combined with --sweep or --shard")
+            sys.exit(1)
+        run_queue(input_file, output_file, args)
+        return
     
-    # Print summary
-    print("\n" + "=" * 70)
-    print(f"✅ Done! Saved to {output_file}")
-    print(f"📊 Processed: {len(df)} entries")
+    grid = None
+    if args.sweep:
+        if args.telemetry or args.metrics_port:
+            print("\n❌ --telemetry and --metrics-port cannot be combined with --sweep")
+            sys.exit(1)
+        try:
+            grid = parse_sweep(args.sweep, TopologyParams(crop_radius=args.crop_radius))
+        except ValueError as e:
+            print(f"\n❌ {e}")
+            sys.exit(1)
     
-    chains_with_motifs = len([r for r in all_results if r['found_motif']])
-    print(f"📊 Chains with motifs: {chains_with_motifs}")
+    # Count input rows and (ID, Type) duplicates in one streamed pass
+    try:
+        counts, input_rows = count_entries(input_file, args.chunk_size, shard)
+    except (FileNotFoundError, ValueError) as e:
+        input_error(input_file, e)
+    total = sum(counts.values())
+    print(f"\n✅ Loaded {total} entries ({len(counts)} distinct) from {input_file}")
+    if shard:
+        print(f"   Shard {shard[0]}/{shard[1]} of {input_rows} input rows, saving to {output_file}")
     
-    # Class distribution
-    class_counts = df_out['class'].value_counts()
-    if len(class_counts) > 0:
-        print(f"\n📊 Class distribution:")
-        for cls, count in class_counts.items():
-            if cls:
-                print(f"   Class {cls}: {count}")
+    if grid:
+        run_sweep(input_rows, grid, output_file, args)
+        return
     
-    print("=" * 70)
+    # Journal of finished entries: a restarted run skips them and retries failures
+    journal_file = output_file + '.journal'
+    if args.force:
+        for path in (output_file, journal_file):
+            if os.path.exists(path):
+                os.remove(path)
+    journal = Journal(journal_file)
+    entry_hash = run_hash(args)
+    completed = journal.completed(entry_hash)
+    done_rows = set()
+    # Counters of the final output: kept rows plus the rows written by this run
+    summary = RunSummary()
+    if completed:
+        # Drop rows of failed, stale or unjournaled entries; they are recomputed,
+        # as are journaled entries with no rows left in the output
+        done_rows, on_disk = keep_rows(output_file, completed, summary)
+        completed &= on_disk
+        if completed:
+            print(f"\n♻️ Resuming: {len(completed)} entries already done (see {journal_file})")
+    
+    print("\n📊 Analyzing structures...")
+    print("-" * 70)
+    
+    # Each distinct (ID, Type) is computed once; the input is streamed twice -
+    # once to feed the workers, once to emit rows for every input row in order
+    metrics = start_metrics(args.metrics_port)
+    if metrics is not None:
+        metrics.queue_depth.set(total, state='pending')
+    tasks = entry_tasks(read_entries(input_file, args.chunk_size, shard), input_rows, args, skip=completed)
+    results = run_entries(process_entry, tasks, args.jobs, args.max_tasks_per_child,
+                          (metrics.dssp_in_flight if metrics is not None else None, log_level(args)),
+                          args.chunk_size)
+    
+    # Rows of keys that still occur later in the input (bounded by open duplicates);
+    # on resume, finished keys with input rows missing from the output are read back
+    remaining = counts
+    cache = {}
+    if completed:
+        pending = {(id_value, type_value)
+                   for input_row, id_value, type_value in read_entries(input_file, args.chunk_size, shard)
+                   if input_row not in done_rows and (id_value, type_value) in completed}
+        cache = load_rows(output_file, pending)
+    
+    reused = 0
+    emitted = 0
+    run_profile = RunProfile() if args.profile else None
+    trace = TraceWriter(args.trace) if args.trace else None
+    log = TelemetryLog(telemetry_file(output_file), append=bool(completed)) if args.telemetry else None
+    with ResultWriter(output_file, output_columns(args), args.buffer_size,
+                      append=bool(completed), journal=journal, summary=summary) as writer:
+        for input_row, id_value, type_value in read_entries(input_file, args.chunk_size, shard):
+            key = (id_value, type_value)
+            remaining[key] -= 1
+            if input_row not in done_rows:
+                if key in cache:
+                    rows = cache[key]
+                    entry = None
+                    reused += 1
+                    record = reused_record(input_row, id_value, type_value,
+                                          'resume' if key in completed else 'duplicate')
+                else:
+                    result = next(results)
+                    rows, record = result.rows, result.record
+                    if result.profile is not None:
+                        run_profile.add(f"{id_value} ({type_value})", result.profile)
+                    if result.trace is not None:
+                        trace.write(result.trace, 'worker' if args.jobs > 1 else 'batch_analyze')
+                    entry = {'id': id_value, 'type': type_value, 'hash': entry_hash, 'status': rows[0]['status']}
+                writer.write_rows([dict(r, input_row=input_row) for r in rows], entry=entry)
+                if log is not None:
+                    log.write(record)
+                if metrics is not None:
+                    if entry is None:
+                        metrics.observe_reused()
+                    else:
+                        metrics.observe_record(record)
+                if remaining[key] > 0:
+                    cache[key] = rows
+            if metrics is not None:
+                emitted += 1
+                metrics.queue_depth.set(total - emitted, state='pending')
+            if remaining[key] == 0:
+                cache.pop(key, None)
+    journal.close()
+    print_summary(writer.summary, output_file, total, reused)
+    if log is not None:
+        log.close()
+        print_stage_summary(log.records, log.path)
+    if run_profile is not None:
+        write_profile(run_profile, output_file)
+    if trace is not None:
+        trace.close()
+        print(f"🧭 Trace saved to {trace.path} (open in chrome://tracing or ui.perfetto.dev)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,349 @@
+"""
+Input and output helpers for batch_analyze.py
+
+read_entries streams the input CSV in chunks, optionally only one shard of
+it (entry_shard); merge_shards joins the shard outputs back together.
+ResultWriter streams result rows to the output CSV while the run goes on,
+so an interrupted run keeps everything written so far and memory does not
+grow with the number of entries. Journal records finished entries, so a
+restarted run continues where the previous one stopped.
+"""
+
+import collections
+import csv
+import hashlib
+import heapq
+import io
+import json
+import os
+
+import pandas as pd
+
+# Entry statuses that are retried when a run is resumed
+RETRY_STATUSES = frozenset({'error'})
+
+
+def entry_shard(id_value, type_value, n_shards):
+    """Stable shard number of an (ID, Type) pair (the same on every node and run)"""
+    digest = hashlib.sha1(f"{id_value}\t{type_value}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % n_shards
+
+
+def read_entries(path, chunk_size=10000, shard=None):
+    """
+    Yields (input_row, ID, Type) for every row of the input CSV, reading it in
+    chunks of chunk_size rows; input_row is the 0-based data row index.
+    shard=(i, N) keeps only the rows with entry_shard(...) == i.
+    Raises ValueError if the ID or Type column is missing.
+    """
+    for chunk in pd.read_csv(path, usecols=['ID', 'Type'], dtype=str, chunksize=chunk_size):
+        for input_row, id_value, type_value in zip(chunk.index, chunk['ID'], chunk['Type']):
+            id_value, type_value = str(id_value).strip(), str(type_value).strip().lower()
+            if shard is None or entry_shard(id_value, type_value, shard[1]) == shard[0]:
+                yield int(input_row), id_value, type_value
+
+
+def count_entries(path, chunk_size=10000, shard=None):
+    """(Counter of (ID, Type) of the shard, number of rows in the whole input) - one streamed pass"""
+    counts = collections.Counter()
+    total = 0
+    for _, id_value, type_value in read_entries(path, chunk_size):
+        total += 1
+        if shard is None or entry_shard(id_value, type_value, shard[1]) == shard[0]:
+            counts[(id_value, type_value)] += 1
+    return counts, total
+
+
+class RunSummary:
+    """Counters for the end-of-run summary, updated row by row"""
+
+    def __init__(self):
+        self.rows = 0
+        self.chains_with_motifs = 0
+        self.status_counts = collections.Counter()
+        self.class_counts = collections.Counter()
+
+    def add(self, row):
+        self.rows += 1
+        if row.get('found_motif'):
+            self.chains_with_motifs += 1
+        if row.get('status'):
+            self.status_counts[row['status']] += 1
+        if row.get('class'):
+            self.class_counts[row['class']] += 1
+
+
+class Journal:
+    """
+    Checkpoint journal: one JSON line {"id", "type", "hash", "status"} per
+    finished entry, appended only after the entry's rows are on disk.
+    hash identifies the code and options the entry was computed with.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._fd = None
+        if os.path.exists(path):
+            _cut_torn_line(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[(entry['id'], entry['type'])] = (entry['hash'], entry['status'])
+
+    def completed(self, run_hash):
+        """(ID, Type) of entries finished with run_hash (failures are not finished)"""
+        return {key for key, (entry_hash, status) in self.entries.items()
+                if entry_hash == run_hash and status not in RETRY_STATUSES}
+
+    def record(self, entries):
+        """Appends journal lines for a list of {"id", "type", "hash", "status"} dicts"""
+        if not entries:
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        _write_all(self._fd, ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entries))
+        for e in entries:
+            self.entries[(e['id'], e['type'])] = (e['hash'], e['status'])
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ResultWriter:
+    """
+    Appends result rows to a CSV file in batches.
+
+    Rows are buffered (at most buffer_size) and every flush is a single
+    write() to a file opened with O_APPEND, followed by fsync, so after a
+    crash the file holds only complete rows of the flushed batches.
+    With append=True rows are added to an existing file (its header is
+    kept, a torn last record is cut off); otherwise the file is recreated.
+    With a journal, finished entries are recorded after their rows are flushed.
+    summary (RunSummary) continues the counters of rows already in the file.
+    """
+
+    def __init__(self, path, columns, buffer_size=100, append=False, journal=None, summary=None):
+        self.path = path
+        self.columns = list(columns)
+        self.buffer_size = buffer_size
+        self.journal = journal
+        self.summary = RunSummary() if summary is None else summary
+        self._buffer = []
+        self._entries = []
+
+        if not append and os.path.exists(path):
+            os.remove(path)
+        _cut_torn_row(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size == 0:
+            # Same encoding as DataFrame.to_csv(encoding='utf-8-sig')
+            self._append('\ufeff' + self._format([dict(zip(self.columns, self.columns))]))
+
+    def _format(self, rows):
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=self.columns, lineterminator='\n')
+        writer.writerows(rows)
+        return buf.getvalue()
+
+    def _append(self, text):
+        _write_all(self._fd, text)
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.summary.add(row)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_rows(self, rows, entry=None):
+        """Writes rows; entry (a journal dict) is recorded once the rows are flushed"""
+        for row in rows:
+            self.write(row)
+        # Added after the rows: a flush in the middle of the entry must not journal it
+        if entry is not None:
+            self._entries.append(entry)
+
+    def flush(self):
+        if self._buffer:
+            self._append(self._format(self._buffer))
+            self._buffer = []
+        if self._entries and self.journal is not None:
+            self.journal.record(self._entries)
+        self._entries = []
+
+    def close(self):
+        if self._fd is not None:
+            self.flush()
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def keep_rows(path, keys, summary=None):
+    """
+    Rewrites an output CSV keeping only rows whose (source_id, source_type) is in keys
+    (streamed line by line, replaced atomically). Returns (set of input_row
+    values of the kept rows, set of their keys); kept rows are added to summary
+    (RunSummary), if given.
+    """
+    if not os.path.exists(path):
+        return set(), set()
+    _cut_torn_row(path)
+    tmp_path = path + '.tmp'
+    kept = set()
+    kept_keys = set()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as src, \
+            open(tmp_path, 'w', encoding='utf-8-sig', newline='') as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst, lineterminator='\n')
+        header = next(reader, None)
+        if header is not None:
+            writer.writerow(header)
+            id_col, type_col = header.index('source_id'), header.index('source_type')
+            row_col = header.index('input_row')
+            for record in reader:
+                key = (record[id_col], record[type_col])
+                if key in keys:
+                    writer.writerow(record)
+                    kept.add(int(record[row_col]))
+                    kept_keys.add(key)
+                    if summary is not None:
+                        summary.add(dict(zip(header, record)))
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, path)
+    return kept, kept_keys
+
+
+def load_rows(path, keys):
+    """
+    {(source_id, source_type): rows} for keys, read back from an output CSV
+    (rows of the first input row of each key, values as strings)
+    """
+    rows = {}
+    first_row = {}
+    if not keys or not os.path.exists(path):
+        return rows
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f):
+            key = (record['source_id'], record['source_type'])
+            if key in keys and first_row.setdefault(key, record['input_row']) == record['input_row']:
+                rows.setdefault(key, []).append(record)
+    return rows
+
+
+def _is_ordered(path):
+    """True if input_row never decreases in the file"""
+    last = -1
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f):
+            if int(record['input_row']) < last:
+                return False
+            last = int(record['input_row'])
+    return True
+
+
+def _shard_rows(path):
+    """Rows of one shard output ordered by input_row (streamed if the file is already ordered)"""
+    if _is_ordered(path):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+        return
+    # A resumed run appends recomputed entries at the end; such a shard is sorted in memory
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    df = df.iloc[df['input_row'].astype(int).argsort(kind='stable')]
+    yield from df.to_dict('records')
+
+
+def merge_shards(paths, output_file, buffer_size=100):
+    """
+    Merges shard outputs into one table ordered by input_row (k-way merge).
+    Returns (RunSummary of the merged rows, number of input rows).
+    """
+    columns = []
+    for path in paths:
+        # Output of a shard run that was killed mid-write
+        _cut_torn_row(path)
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            header = next(csv.reader(f), [])
+        columns += [c for c in header if c not in columns]
+
+    merged = heapq.merge(*[_shard_rows(p) for p in paths], key=lambda r: int(r['input_row']))
+    entries = 0
+    last = None
+    with ResultWriter(output_file, columns, buffer_size) as writer:
+        for row in merged:
+            if row['input_row'] != last:
+                entries += 1
+                last = row['input_row']
+            writer.write(row)
+    return writer.summary, entries
+
+
+def _write_all(fd, text):
+    data = text.encode('utf-8')
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+    os.fsync(fd)
+
+
+def _cut_torn_line(path, chunk_size=65536):
+    """Truncates a file after its last complete line (a write interrupted by a crash)"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        pos = f.seek(0, os.SEEK_END)
+        if pos == 0:
+            return
+        f.seek(pos - 1)
+        if f.read(1) == b'\n':
+            return
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b'\n')
+            if newline >= 0:
+                f.truncate(pos + newline + 1)
+                return
+        f.truncate(0)
+
+
+def _cut_torn_row(path, chunk_size=65536):
+    """
+    Truncates a CSV file after its last complete record. Quoted fields may
+    hold newlines (DSSP stderr in the error column), so a record ends only at
+    a newline preceded by an even number of quote characters ('"' never
+    occurs inside multi-byte UTF-8 sequences).
+    """
+    if not os.path.exists(path):
+        return
+    end = 0
+    quoted = False
+    with open(path, 'rb+') as f:
+        pos = 0
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            start = 0
+            while True:
+                newline = chunk.find(b'\n', start)
+                if newline < 0:
+                    quoted ^= chunk.count(b'"', start) % 2 == 1
+                    break
+                quoted ^= chunk.count(b'"', start, newline) % 2 == 1
+                if not quoted:
+                    end = pos + newline + 1
+                start = newline + 1
+            pos += len(chunk)
+        if end < pos:
+            f.truncate(end)
@@ -0,0 +1,260 @@
+"""
+File-backed work queue for batch_analyze.py (--queue)
+
+The queue is a single SQLite database, e.g. on shared storage, that any
+number of workers on any number of nodes pull entries from. A worker leases
+one distinct (ID, Type) at a time and renews the lease with heartbeats while
+it works; leases of crashed or stalled workers expire and the entry goes
+back to the queue. Every entry keeps an attempt count, failures are retried
+up to max_attempts. Result rows of all workers are stored in the same
+database; export writes them as one output table in input order.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from batch_io import ResultWriter, read_entries
+
+# Item states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    first_row INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    error TEXT,
+    PRIMARY KEY (id, type)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, first_row);
+CREATE TABLE IF NOT EXISTS inputs (
+    input_row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (id, type, seq)
+);
+"""
+
+
+def worker_name():
+    """Worker identity stored with its leases: host:pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _json_value(value):
+    # numpy scalars in result rows
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class WorkQueue:
+    """
+    SQLite work queue of distinct (ID, Type) entries.
+
+    lease_seconds is how long a lease lives without a heartbeat;
+    max_attempts is how many times an entry is tried before it is FAILED.
+    Every state change is one short IMMEDIATE transaction, so concurrent
+    workers never lease the same entry twice.
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=3, timeout=60):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        # isolation_level=None: transactions are opened explicitly (BEGIN IMMEDIATE)
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def meta(self, name, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def seed(self, input_file, chunk_size=10000, **meta):
+        """
+        Fills the queue from the input CSV (once; later calls are no-ops).
+        meta values (e.g. the run hash and output columns) are stored with it.
+        Returns False if the queue was already seeded.
+        """
+        with self._transaction() as db:
+            if self.meta('seeded'):
+                return False
+            batch = []
+            for entry in read_entries(input_file, chunk_size):
+                batch.append(entry)
+                if len(batch) >= chunk_size:
+                    self._insert(db, batch)
+                    batch = []
+            self._insert(db, batch)
+            meta['seeded'] = True
+            meta['total'] = db.execute("SELECT COUNT(*) FROM inputs").fetchone()[0]
+            db.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                           [(name, json.dumps(value)) for name, value in meta.items()])
+        return True
+
+    @staticmethod
+    def _insert(db, entries):
+        db.executemany("INSERT INTO inputs (input_row, id, type) VALUES (?, ?, ?)", entries)
+        db.executemany("INSERT OR IGNORE INTO items (id, type, first_row) VALUES (?, ?, ?)",
+                       [(id_value, type_value, input_row) for input_row, id_value, type_value in entries])
+
+    def lease(self, worker):
+        """
+        Leases the next pending entry: (first input_row, ID, Type), or None if
+        nothing is pending. Expired leases are put back to the queue first.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            self._requeue_expired(db, now)
+            row = db.execute("SELECT id, type, first_row FROM items WHERE state = ? "
+                             "ORDER BY first_row LIMIT 1", (PENDING,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE items SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                       "WHERE id = ? AND type = ?",
+                       (LEASED, worker, now + self.lease_seconds, row[0], row[1]))
+        return row[2], row[0], row[1]
+
+    def _requeue_expired(self, db, now):
+        # Entries out of attempts are failed instead of requeued
+        db.execute("UPDATE items SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                   "worker = NULL, lease_expires = NULL, error = COALESCE(error, 'lease expired') "
+                   "WHERE state = ? AND lease_expires < ?",
+                   (self.max_attempts, FAILED, PENDING, LEASED, now))
+
+    def heartbeat(self, key, worker):
+        """Extends the lease of key; False if the worker no longer holds it"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE items SET lease_expires = ? "
+                                "WHERE id = ? AND type = ? AND state = ? AND worker = ?",
+                                (time.time() + self.lease_seconds, key[0], key[1], LEASED, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, key, worker, rows, error=None):
+        """
+        Stores the result rows of a leased entry. With error the entry is
+        requeued while it has attempts left, otherwise it is FAILED and its
+        (error) rows are kept. Returns False if the lease was lost meanwhile.
+        """
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts FROM items WHERE id = ? AND type = ? AND state = ? AND worker = ?",
+                             (key[0], key[1], LEASED, worker)).fetchone()
+            if row is None:
+                return False
+            if error is not None and row[0] < self.max_attempts:
+                db.execute("UPDATE items SET state = ?, worker = NULL, lease_expires = NULL, error = ? "
+                           "WHERE id = ? AND type = ?", (PENDING, error, key[0], key[1]))
+                return True
+            db.execute("DELETE FROM results WHERE id = ? AND type = ?", key)
+            db.executemany("INSERT INTO results (id, type, seq, row) VALUES (?, ?, ?, ?)",
+                           [(key[0], key[1], seq, json.dumps(r, ensure_ascii=False, default=_json_value))
+                            for seq, r in enumerate(rows)])
+            db.execute("UPDATE items SET state = ?, worker = NULL, lease_expires = NULL, error = ? "
+                       "WHERE id = ? AND type = ?", (FAILED if error else DONE, error, key[0], key[1]))
+        return True
+
+    def counts(self):
+        """{state: number of entries}"""
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+
+    def finished(self):
+        """True when no entry is pending or leased"""
+        counts = self.counts()
+        return not counts.get(PENDING) and not counts.get(LEASED)
+
+    def export(self, output_file, columns, buffer_size=100):
+        """
+        Writes the stored rows of every input row (duplicates included) to
+        output_file in input order, atomically. Returns the RunSummary.
+        Call once the queue is finished().
+        """
+        tmp_path = f"{output_file}.{os.getpid()}.tmp"
+        rows = self._db.execute(
+            "SELECT inputs.input_row, inputs.id, inputs.type, results.row, items.error FROM inputs "
+            "JOIN items ON items.id = inputs.id AND items.type = inputs.type "
+            "LEFT JOIN results ON results.id = inputs.id AND results.type = inputs.type "
+            "ORDER BY inputs.input_row, results.seq")
+        with ResultWriter(tmp_path, columns, buffer_size) as writer:
+            for input_row, id_value, type_value, row, error in rows:
+                if row is None:
+                    # Failed without rows (every lease expired): an error row
+                    row = {'source_id': id_value, 'source_type': type_value, 'status': 'error', 'error': error}
+                else:
+                    row = json.loads(row)
+                writer.write(dict(row, input_row=input_row))
+        os.replace(tmp_path, output_file)
+        return writer.summary
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an autocommit connection"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class Heartbeat:
+    """Background thread renewing a lease every interval seconds (own connection)"""
+
+    def __init__(self, queue, key, worker, interval):
+        self.queue = queue
+        self.key = key
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # SQLite connections belong to the thread that opened them
+        with WorkQueue(self.queue.path, self.queue.lease_seconds, self.queue.max_attempts,
+                       self.queue.timeout) as queue:
+            while not self._stop.wait(self.interval):
+                if not queue.heartbeat(self.key, self.worker):
+                    break
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
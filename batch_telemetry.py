@@ -0,0 +1,144 @@
+"""
+Per-entry stage telemetry for batch_analyze.py (--telemetry)
+
+Every computed entry gets one JSON line in a sidecar file with the wall and
+CPU time of each pipeline stage (CPU time includes child processes such as
+DSSP), the peak resident memory of the worker after the stage, structure
+sizes (residues, chains, strands, helices, motifs) and cache flags (entry
+computed or reused from a duplicate / resumed run). stage_summary turns the
+lines into per-stage percentiles for the end-of-run summary.
+"""
+
+import contextlib
+import json
+import os
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (50, 90, 99)
+
+
+def _cpu_seconds():
+    # This process (all threads) and its finished children (mkdssp)
+    t = os.times()
+    return time.process_time() + t.children_user + t.children_system
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class EntryTelemetry:
+    """Telemetry record of one entry; stages with the same name are summed"""
+
+    def __init__(self, input_row, id_value, type_value):
+        self.record = {'input_row': input_row, 'id': id_value, 'type': type_value,
+                       'stages': {}, 'counts': {}, 'cache': {'entry': 'miss'}}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            stats = self.record['stages'].setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            stats['wall'] += time.perf_counter() - wall
+            stats['cpu'] += _cpu_seconds() - cpu
+            stats['peak_rss_mb'] = _peak_rss_mb()
+
+    def count(self, **counts):
+        self.record['counts'].update(counts)
+
+    def error(self, exc):
+        """Records the exception type of a failed entry"""
+        self.record['error_type'] = type(exc).__name__
+
+    def finish(self, status):
+        """The record with total wall time and the entry status"""
+        self.record['wall'] = time.perf_counter() - self._start
+        self.record['status'] = status
+        return self.record
+
+
+def stage(telemetry, name):
+    """telemetry.stage(name), or a no-op context without telemetry"""
+    return contextlib.nullcontext() if telemetry is None else telemetry.stage(name)
+
+
+def reused_record(input_row, id_value, type_value, source):
+    """Record of an input row whose rows were reused (source: 'duplicate' or 'resume')"""
+    return {'input_row': input_row, 'id': id_value, 'type': type_value, 'cache': {'entry': 'hit', 'source': source}}
+
+
+class TelemetryLog:
+    """Appends telemetry records as JSON lines (one write per line, O_APPEND)"""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        if not append and os.path.exists(path):
+            os.remove(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.records = []
+
+    def write(self, record):
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        if 'stages' in record:
+            self.records.append(record)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_records(path):
+    """Computed-entry records of a telemetry file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'stages' in record:
+                yield record
+
+
+def stage_summary(records):
+    """
+    DataFrame with one row per stage (in pipeline order): number of entries,
+    wall time percentiles, total wall and CPU time, maximum peak RSS
+    """
+    wall, cpu, rss = {}, {}, {}
+    for record in records:
+        for name, stats in record['stages'].items():
+            wall.setdefault(name, []).append(stats['wall'])
+            cpu.setdefault(name, []).append(stats['cpu'])
+            if stats.get('peak_rss_mb') is not None:
+                rss.setdefault(name, []).append(stats['peak_rss_mb'])
+
+    rows = []
+    for name, values in wall.items():
+        values = np.asarray(values)
+        row = {'stage': name, 'entries': len(values)}
+        for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            row[f'wall_p{q}'] = v
+        row['wall_max'] = values.max()
+        row['wall_total'] = values.sum()
+        row['cpu_total'] = sum(cpu[name])
+        row['peak_rss_mb'] = max(rss[name]) if name in rss else None
+        rows.append(row)
+    return pd.DataFrame(rows)
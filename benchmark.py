@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the analyzer stages
+
+Runs the analysis pipeline on DSSP fixtures (benchmarks/fixtures/<ID>.dssp)
+without network access or mkdssp, times every stage separately:
+load_dssp, find_all_strands, build_sheet_adjacency, find_all_motifs,
+filter_motifs_by_topology, analyze_topology, linear_topology,
+classify_topology and layout_2d (visualize_topology_interactive), and
+compares topologies and classes with golden results (output.csv).
+The classifier is also benchmarked on the golden topology strings alone,
+which needs no fixtures at all. --scaling times the same stages on
+synthetic structures (synthetic.py) of growing residue and chain counts.
+
+Writes a JSON report; with --baseline (an earlier report) every stage that
+got slower than --max-ratio (and by more than --min-seconds) is listed as a
+regression. Exit code 1 on regressions or golden mismatches.
+
+Synthetic fixtures (SYN_*.dssp) and their golden rows (benchmarks/golden.csv)
+are checked in, so the golden comparison runs offline; --synthetic-fixtures
+rewrites them. Fixtures of the structures in output.csv are created once,
+with network access and mkdssp, by --fetch.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from analyzer import MTaseAnalyzer, topology_strings
+from classifier import classify_topology
+from synthetic import synthetic_structure, write_dssp
+
+FIXTURES_DIR = os.path.join('benchmarks', 'fixtures')
+# Golden rows of the real structures and of the synthetic fixtures
+GOLDEN_FILES = ['output.csv', os.path.join('benchmarks', 'golden.csv')]
+
+# Checked-in synthetic fixtures: name -> synthetic_structure options
+SYNTHETIC_FIXTURES = {
+    'SYN_CANONICAL': {},
+    'SYN_CORE': {'c_extension': False},
+    'SYN_MINIMAL': {'strands': 4, 'c_extension': False},
+    'SYN_EXTENDED': {'strands': 9, 'insertions': {6: 40}},
+    'SYN_DIMER': {'chains': 2, 'helices': 12, 'insertions': {5: 50}}
+}
+
+STAGES = [
+    'load_dssp', 'find_all_strands', 'build_sheet_adjacency', 'find_all_motifs',
+    'filter_motifs_by_topology', 'analyze_topology', 'linear_topology',
+    'classify_topology', 'layout_2d'
+]
+
+# Output columns compared with the golden table
+GOLDEN_COLUMNS = ['full_secondary_elements', 'strands_secondary_elements', 'strand_directions', 'class']
+
+
+def load_golden(paths):
+    """Golden rows {(source_id, chain, found_motif, found_motif_position): row} of all existing paths"""
+    golden = {}
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        golden.update({(r['source_id'], r['chain'], r['found_motif'], r['found_motif_position']): r
+                       for r in df.to_dict('records')})
+    return golden
+
+
+def run_pipeline(dssp_file, layout=True):
+    """
+    One pass of the interactive pipeline on a DSSP file.
+    Returns ({stage: seconds}, structure counts, output rows).
+    The analyzer logger is left unconfigured, so stages are timed as in batch runs (no log output).
+    """
+    times = dict.fromkeys(STAGES, 0.0)
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        times[stage] += time.perf_counter() - start
+        return value
+
+    analyzer = MTaseAnalyzer()
+    if not timed('load_dssp', analyzer.load_dssp, dssp_file):
+        raise ValueError(f"Cannot load {dssp_file}")
+    timed('find_all_strands', analyzer.find_all_strands)
+    timed('build_sheet_adjacency', analyzer.build_sheet_adjacency)
+    motifs = timed('find_all_motifs', analyzer.find_all_motifs)
+    filtered = timed('filter_motifs_by_topology', analyzer.filter_motifs_by_topology, motifs)
+
+    rows = []
+    for motif in filtered:
+        result = timed('analyze_topology', analyzer.analyze_topology, motif)
+        if not result:
+            continue
+        elements = timed('linear_topology', analyzer.linear_topology, result)
+        full, strands_only, directions = topology_strings(elements)
+        classification = timed('classify_topology', classify_topology, elements, motif['text'])
+        if layout:
+            timed('layout_2d', analyzer.visualize_topology_interactive, result)
+        rows.append({
+            'chain': motif['chain'],
+            'found_motif': motif['text'],
+            'found_motif_position': f"{motif['res']}-{motif['res'] + len(motif['text']) - 1}",
+            'full_secondary_elements': full,
+            'strands_secondary_elements': strands_only,
+            'strand_directions': directions,
+            'class': classification['class']
+        })
+
+    counts = {
+        'residues': len(analyzer.res_data),
+        'chains': len({r['chain'] for r in analyzer.res_data.values()}),
+        'strands': len(analyzer.strands),
+        'helices': len(analyzer.helices),
+        'motifs': len(motifs),
+        'motifs_s2_down': len(filtered)
+    }
+    return times, counts, rows
+
+
+def compare_golden(structure_id, rows, golden):
+    """Golden comparison of one structure: {'status', 'mismatches'}"""
+    expected = {key: row for key, row in golden.items() if key[0] == structure_id}
+    if not expected:
+        return {'status': 'no_golden', 'mismatches': []}
+
+    mismatches = []
+    found = set()
+    for row in rows:
+        key = (structure_id, row['chain'], row['found_motif'], row['found_motif_position'])
+        found.add(key)
+        if key not in expected:
+            mismatches.append({'motif': list(key[1:]), 'problem': 'not in golden'})
+            continue
+        for column in GOLDEN_COLUMNS:
+            if row[column] != expected[key][column]:
+                mismatches.append({'motif': list(key[1:]), 'column': column,
+                                   'expected': expected[key][column], 'actual': row[column]})
+    for key in expected.keys() - found:
+        mismatches.append({'motif': list(key[1:]), 'problem': 'missing'})
+    return {'status': 'mismatch' if mismatches else 'match', 'mismatches': mismatches}
+
+
+def benchmark_structure(dssp_file, golden, repeat=3, layout=True):
+    """Report entry of one fixture; stage times are the minimum over repeat runs"""
+    structure_id = os.path.splitext(os.path.basename(dssp_file))[0]
+    best = None
+    for _ in range(repeat):
+        times, counts, rows = run_pipeline(dssp_file, layout)
+        best = times if best is None else {s: min(best[s], times[s]) for s in STAGES}
+    entry = {'file': dssp_file, 'counts': counts, 'stages': best, 'total': sum(best.values())}
+    entry['golden'] = compare_golden(structure_id, rows, golden)
+    return structure_id, entry
+
+
+def benchmark_classifier(golden, repeat=3):
+    """classify_topology on every golden topology string: time and class mismatches"""
+    rows = [r for r in golden.values() if r['full_secondary_elements']]
+    best = None
+    mismatches = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calls = [classify_topology(r['full_secondary_elements'], r['found_motif'] or None)['class'] for r in rows]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    for r, cls in zip(rows, calls):
+        if cls != r['class']:
+            mismatches.append({'structure': r['source_id'], 'chain': r['chain'],
+                               'expected': r['class'], 'actual': cls})
+    return {'topologies': len(rows), 'seconds': best,
+            'status': 'mismatch' if mismatches else 'match', 'mismatches': mismatches}
+
+
+def scaling_structure(residues, chains):
+    """Synthetic structure of the given size (the 4-strand layout for very small chains)"""
+    try:
+        return synthetic_structure(chains, residues=residues)
+    except ValueError:
+        return synthetic_structure(chains, residues=residues, strands=4, c_extension=False)
+
+
+def benchmark_scaling(residue_counts, chain_counts, repeat=1, layout=True):
+    """
+    Stage times on synthetic structures: every residue count with one chain,
+    then every chain count with the smallest residue count per chain
+    """
+    sizes = [(n, 1) for n in residue_counts] + [(min(residue_counts), c) for c in chain_counts if c > 1]
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for residues, chains in sizes:
+            dssp_file = os.path.join(temp_dir, f"synthetic_{residues}x{chains}.dssp")
+            write_dssp(dssp_file, scaling_structure(residues, chains))
+            print(f"🔬 synthetic: {residues} residues x {chains} chain(s)")
+            best = None
+            for _ in range(repeat):
+                times, counts, rows = run_pipeline(dssp_file, layout)
+                best = times if best is None else {s: min(best[s], times[s]) for s in STAGES}
+            results.append({
+                'residues': residues,
+                'chains': chains,
+                'counts': counts,
+                'stages': best,
+                'total': sum(best.values()),
+                # One planted motif per chain must survive the S2 filter
+                'status': 'match' if counts['motifs_s2_down'] == chains else 'mismatch'
+            })
+    return results
+
+
+def find_regressions(report, baseline, max_ratio, min_seconds):
+    """Stages slower than baseline by more than max_ratio and min_seconds"""
+    regressions = []
+
+    def check(name, stage, current, previous):
+        if previous is None or current is None:
+            return
+        if current > previous * max_ratio and current - previous > min_seconds:
+            regressions.append({'structure': name, 'stage': stage, 'baseline': previous,
+                                'current': current, 'ratio': current / previous if previous else None})
+
+    for name, entry in report['structures'].items():
+        old = baseline.get('structures', {}).get(name)
+        if old is None:
+            continue
+        for stage, seconds in entry['stages'].items():
+            check(name, stage, seconds, old['stages'].get(stage))
+        check(name, 'total', entry['total'], old.get('total'))
+    old_scaling = {(e['residues'], e['chains']): e for e in baseline.get('scaling') or []}
+    for entry in report.get('scaling') or []:
+        old = old_scaling.get((entry['residues'], entry['chains']))
+        if old is None:
+            continue
+        name = f"synthetic {entry['residues']}x{entry['chains']}"
+        for stage, seconds in entry['stages'].items():
+            check(name, stage, seconds, old['stages'].get(stage))
+        check(name, 'total', entry['total'], old['total'])
+    if report.get('classifier') and baseline.get('classifier'):
+        check('golden topologies', 'classify_topology',
+              report['classifier']['seconds'], baseline['classifier']['seconds'])
+    return regressions
+
+
+def write_synthetic_fixtures(fixtures_dir, golden_file):
+    """
+    Rewrites the SYNTHETIC_FIXTURES DSSP files and their golden rows (current
+    pipeline results); only after an intended change of the results
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+    rows = []
+    for name, options in SYNTHETIC_FIXTURES.items():
+        dssp_file = os.path.join(fixtures_dir, f"{name}.dssp")
+        write_dssp(dssp_file, synthetic_structure(**options))
+        _, _, structure_rows = run_pipeline(dssp_file, layout=False)
+        rows.extend(dict(source_id=name, source_type='synthetic', **row) for row in structure_rows)
+        print(f"  ✏️ {dssp_file}: {len(structure_rows)} motif(s)")
+    columns = ['source_id', 'source_type', 'chain', 'found_motif', 'found_motif_position'] + GOLDEN_COLUMNS
+    pd.DataFrame(rows, columns=columns).to_csv(golden_file, index=False, encoding='utf-8-sig')
+    print(f"  ✏️ {golden_file}: {len(rows)} golden row(s)")
+
+
+def fetch_fixtures(golden, fixtures_dir):
+    """Downloads golden structures and runs DSSP once (needs network and mkdssp)"""
+    from batch_analyze import get_structure, preprocess_structure, run_dssp
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for structure_id, type_value in dict.fromkeys((k[0], r['source_type']) for k, r in golden.items()):
+        if type_value == 'synthetic':
+            continue
+        target = os.path.join(fixtures_dir, f"{structure_id}.dssp")
+        if os.path.exists(target):
+            continue
+        print(f"  ⬇️ {structure_id} ({type_value})")
+        temp_dir = None
+        try:
+            pdb_file, temp_dir = get_structure(structure_id, type_value)
+            pdb_file, temp_dir, _ = preprocess_structure(pdb_file, temp_dir, type_value)
+            shutil.copyfile(run_dssp(pdb_file), target)
+        except Exception as e:
+            print(f"  ❌ {structure_id}: {e}")
+        finally:
+            if temp_dir and os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
+
+
+def print_report(report):
+    """Stage table, golden comparison and regressions"""
+    structures = report['structures']
+    if structures:
+        table = pd.DataFrame({name: entry['stages'] for name, entry in structures.items()}).T
+        table['total'] = [entry['total'] for entry in structures.values()]
+        table['residues'] = [entry['counts']['residues'] for entry in structures.values()]
+        print("\n⏱️ Stage times (s, best of {}):".format(report['repeat']))
+        print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+        for name, entry in structures.items():
+            if entry['golden']['status'] == 'mismatch':
+                print(f"\n❌ {name}: {len(entry['golden']['mismatches'])} difference(s) from golden")
+                for m in entry['golden']['mismatches'][:5]:
+                    print(f"   {m}")
+
+    if report.get('scaling'):
+        table = pd.DataFrame([dict(e['stages'], residues=e['residues'], chains=e['chains'], total=e['total'],
+                                   status=e['status']) for e in report['scaling']]).set_index(['residues', 'chains'])
+        print("\n⏱️ Scaling on synthetic structures (s):")
+        print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+
+    classifier = report.get('classifier')
+    if classifier:
+        print(f"\n⏱️ classify_topology on {classifier['topologies']} golden topologies: "
+              f"{classifier['seconds']:.4f} s ({classifier['status']})")
+        for m in classifier['mismatches'][:5]:
+            print(f"   ❌ {m}")
+
+    for r in report['regressions']:
+        print(f"\n🐢 Regression: {r['structure']} {r['stage']}: "
+              f"{r['baseline']:.4f} s -> {r['current']:.4f} s")
+    print("\n" + ("✅ Passed" if report['passed'] else "❌ Failed"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MTase analyzer offline benchmark")
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, metavar='DIR',
+                        help=f"directory with <ID>.dssp fixtures (default: {FIXTURES_DIR})")
+    parser.add_argument('--golden', nargs='+', default=GOLDEN_FILES, metavar='CSV',
+                        help=f"golden batch outputs to compare with (default: {' '.join(GOLDEN_FILES)})")
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help="runs per structure, the best time is reported (default: 3)")
+    parser.add_argument('--no-layout', dest='layout', action='store_false',
+                        help="skip the 2D layout stage")
+    parser.add_argument('--report', default='benchmark_report.json', metavar='JSON',
+                        help="report file (default: benchmark_report.json)")
+    parser.add_argument('--baseline', metavar='JSON', help="earlier report to check for regressions")
+    parser.add_argument('--max-ratio', type=float, default=1.25, metavar='R',
+                        help="regression if a stage is more than R times slower than the baseline (default: 1.25)")
+    parser.add_argument('--min-seconds', type=float, default=0.005, metavar='S',
+                        help="ignore slowdowns smaller than S seconds (default: 0.005)")
+    parser.add_argument('--scaling', action='store_true',
+                        help="also time the stages on synthetic structures of growing size")
+    parser.add_argument('--scaling-residues', default='100,1000,5000,20000,50000', metavar='N1,N2,...',
+                        help="residue counts (one chain) for --scaling (default: 100,1000,5000,20000,50000)")
+    parser.add_argument('--scaling-chains', default='1,10,30,60', metavar='C1,C2,...',
+                        help="chain counts (smallest residue count each) for --scaling (default: 1,10,30,60)")
+    parser.add_argument('--fetch', action='store_true',
+                        help="create missing fixtures for the golden structures (network and mkdssp needed)")
+    parser.add_argument('--synthetic-fixtures', action='store_true',
+                        help="rewrite the synthetic fixtures and their golden rows (the last --golden file)")
+    args = parser.parse_args()
+
+    if args.synthetic_fixtures:
+        write_synthetic_fixtures(args.fixtures, args.golden[-1])
+    golden = load_golden(args.golden)
+    if args.fetch:
+        fetch_fixtures(golden, args.fixtures)
+
+    fixtures = sorted(glob.glob(os.path.join(args.fixtures, '*.dssp')))
+    if not fixtures:
+        print(f"⚠️ No fixtures in {args.fixtures} (create them with --synthetic-fixtures or --fetch); benchmarking the classifier only")
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'thresholds': {'max_ratio': args.max_ratio, 'min_seconds': args.min_seconds},
+        'structures': {},
+        'classifier': benchmark_classifier(golden, args.repeat) if golden else None
+    }
+    for dssp_file in fixtures:
+        print(f"🔬 {os.path.basename(dssp_file)}")
+        try:
+            name, entry = benchmark_structure(dssp_file, golden, args.repeat, args.layout)
+        except Exception as e:
+            print(f"  ❌ Error: {e}")
+            continue
+        report['structures'][name] = entry
+
+    if args.scaling:
+        report['scaling'] = benchmark_scaling([int(n) for n in args.scaling_residues.split(',')],
+                                              [int(c) for c in args.scaling_chains.split(',')],
+                                              args.repeat, args.layout)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    report['regressions'] = find_regressions(report, baseline, args.max_ratio, args.min_seconds)
+    golden_ok = all(e['golden']['status'] != 'mismatch' for e in report['structures'].values())
+    golden_ok = golden_ok and (report['classifier'] or {}).get('status') != 'mismatch'
+    golden_ok = golden_ok and all(e['status'] == 'match' for e in report.get('scaling') or [])
+    report['passed'] = golden_ok and not report['regressions']
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_report(report)
+    print(f"📄 Report saved to {args.report}")
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,10 @@ Pure topology-based - NO MOTIF REQUIRED!
 """
 
 import re
+import sys
+
+import numpy as np
+import pandas as pd
 
 # Minimum number of strands required for canonical MTase catalytic domain
 MIN_STRAND_COUNT = 6
@@ -129,10 +133,26 @@ def classify_by_topology(strand_list, has_s0, has_s_minus_1, gap_s6_s7, has_n_he
     return 'Unknown', 'low', reasons
 
 
+# Precompiled patterns for parsing topology strings
+STRAND_TOKEN_RE = re.compile(r'S(-?\d+)\([↑↓]\)')
+ELEMENT_TOKEN_RE = re.compile(
+    r'(S-?\d+)\([↑↓]\)\[(-?\d+)-(-?\d+)\]'
+    r'|(H[ud][^\[\s]*)\[(-?\d+)-(-?\d+)\]'
+)
+N_HELIX_NAME_RE = re.compile(r'Hd_\d+')
+C_HELIX_NAME_RE = re.compile(r'H[ud]_\d+')
+
+CLASSIFICATION_COLUMNS = [
+    'class', 'confidence', 'reasons', 'strand_order', 'has_s0', 'has_s-1',
+    'gap_s6_s7', 'has_n_helix', 'has_c_helix'
+]
+# classify_topology keys that are named differently in batch output tables
+OUTPUT_COLUMNS = {'confidence': 'class_confidence', 'reasons': 'class_reasons'}
+
+
 def parse_strand_order(full_topology):
     """Extracts strand order from full topology string"""
-    matches = re.findall(r'S(-?\d+)\([↑↓]\)', full_topology)
-    return [f"S{m}" for m in matches]
+    return [f"S{m}" for m in STRAND_TOKEN_RE.findall(full_topology)]
 
 
 def has_strand(strand_list, name):
@@ -176,56 +196,268 @@ def has_c_terminal_helix(full_topology):
     return False
 
 
+def parse_topology(full_topology):
+    """
+    Parses a topology string into (type, name, start, end) tuples in N→C order
+    (type is 'strand' or 'helix')
+    """
+    elements = []
+    for m in ELEMENT_TOKEN_RE.finditer(full_topology):
+        if m.group(1):
+            elements.append(('strand', m.group(1), int(m.group(2)), int(m.group(3))))
+        else:
+            elements.append(('helix', m.group(4), int(m.group(5)), int(m.group(6))))
+    return elements
+
+
+def _as_elements(topology):
+    """Topology string or list of elements (TopologyElement or tuples) -> parsed tuples"""
+    if isinstance(topology, str):
+        return parse_topology(topology)
+    return [
+        (e.type, e.name, e.start, e.end) if hasattr(e, 'type') else tuple(e)
+        for e in topology
+    ]
+
+
+def topology_features(elements):
+    """
+    Classification features from parsed elements.
+    Same semantics as the string helpers above (residue ranges with negative
+    numbers are not matched there, so they are ignored here as well).
+    """
+    strand_pos = [i for i, e in enumerate(elements) if e[0] == 'strand']
+    strand_list = [elements[i][1] for i in strand_pos]
+
+    def first_index(name):
+        return strand_list.index(name) if name in strand_list else -1
+
+    def first_range(name):
+        for i in strand_pos:
+            kind, s_name, start, end = elements[i]
+            if s_name == name and start >= 0 and end >= 0:
+                return start, end
+        return None
+
+    s0_index, s2_index, s5_index = first_index('S0'), first_index('S2'), first_index('S5')
+    s6_index, s7_index = first_index('S6'), first_index('S7')
+    permuted = s6_index != -1 and s7_index != -1 and s7_index < s6_index
+
+    gap_s6_s7 = None
+    if s6_index != -1 and s7_index != -1 and not permuted:
+        s6_range, s7_range = first_range('S6'), first_range('S7')
+        if s6_range and s7_range:
+            gap_s6_s7 = s7_range[0] - s6_range[1]
+
+    has_n_helix = False
+    has_c_helix = False
+    if strand_pos:
+        has_n_helix = any(
+            kind == 'helix' and start >= 0 and end >= 0 and N_HELIX_NAME_RE.fullmatch(name)
+            for kind, name, start, end in elements[:strand_pos[0]]
+        )
+        last_kind, last_name, last_start, last_end = elements[strand_pos[-1]]
+        if last_start >= 0 and last_end >= 0:
+            has_c_helix = any(
+                kind == 'helix' and start >= 0 and end >= 0 and C_HELIX_NAME_RE.fullmatch(name)
+                for kind, name, start, end in elements[strand_pos[-1] + 1:]
+            )
+
+    return {
+        'strand_list': strand_list,
+        'n_strands': len(strand_list),
+        'has_s0': s0_index != -1,
+        'has_s-1': 'S-1' in strand_list,
+        'has_s6': s6_index != -1,
+        'has_s7': s7_index != -1,
+        'permuted': permuted,
+        's7_index': s7_index,
+        's0_at_n': s0_index != -1 and s5_index != -1 and s0_index < s5_index,
+        's0_at_c': s0_index != -1 and s2_index != -1 and s0_index > s2_index,
+        's5_s6_at_end': 'S5' in strand_list[-2:] or 'S6' in strand_list[-2:],
+        'gap_s6_s7': gap_s6_s7,
+        'has_n_helix': has_n_helix,
+        'has_c_helix': has_c_helix
+    }
+
+
+def _gap_display(features):
+    """Gap value as written to output tables"""
+    if features['has_s6'] and features['has_s7'] and features['permuted']:
+        return 'N/A (permuted)'
+    return features['gap_s6_s7'] if features['gap_s6_s7'] is not None else 'N/A'
+
+
 def classify_topology(full_topology, motif=None):
     """
     Main classification function - uses pure topology, motif is ignored!
     
     Parameters:
-    - full_topology: string with full secondary structure elements
+    - full_topology: string with full secondary structure elements,
+      or the element list returned by MTaseAnalyzer.linear_topology
     - motif: (optional) ignored, kept for backward compatibility
     
     Returns:
     - dictionary with classification results
     """
-    strand_list = parse_strand_order(full_topology)
-    
-    has_s0 = has_strand(strand_list, 'S0')
-    has_s_minus_1 = has_strand(strand_list, 'S-1')
-    has_s6 = has_strand(strand_list, 'S6')
-    has_s7 = has_strand(strand_list, 'S7')
-    
-    # Calculate gap only if in normal order (S6 before S7)
-    gap_s6_s7 = None
-    if has_s6 and has_s7 and not is_permuted_order(strand_list):
-        gap_s6_s7 = get_gap_between_strands(full_topology, 'S6', 'S7')
-    
-    has_n_helix = has_n_terminal_helix(full_topology)
-    has_c_helix = has_c_terminal_helix(full_topology)
+    features = topology_features(_as_elements(full_topology))
+    strand_list = features['strand_list']
     
     class_name, confidence, reasons = classify_by_topology(
-        strand_list, has_s0, has_s_minus_1, gap_s6_s7, has_n_helix, has_c_helix
+        strand_list, features['has_s0'], features['has_s-1'],
+        features['gap_s6_s7'], features['has_n_helix'], features['has_c_helix']
     )
     
-    # Format gap for output
-    gap_display = gap_s6_s7 if gap_s6_s7 is not None else 'N/A'
-    if has_s6 and has_s7 and is_permuted_order(strand_list):
-        gap_display = 'N/A (permuted)'
-    
     return {
         'class': class_name,
         'confidence': confidence,
         'reasons': '; '.join(reasons),
         'strand_order': ' → '.join(strand_list),
-        'has_s0': has_s0,
-        'has_s-1': has_s_minus_1,
-        'gap_s6_s7': gap_display,
-        'has_n_helix': has_n_helix,
-        'has_c_helix': has_c_helix
+        'has_s0': features['has_s0'],
+        'has_s-1': features['has_s-1'],
+        'gap_s6_s7': _gap_display(features),
+        'has_n_helix': features['has_n_helix'],
+        'has_c_helix': features['has_c_helix']
     }
 
 
+# Rules of classify_by_topology in evaluation order: (class, confidence, reason template)
+_RULES = [
+    ('Unknown', 'low', "Too few strands ({n_strands} < " + str(MIN_STRAND_COUNT) + ") - incomplete catalytic domain"),
+    ('A', 'high', "S0 and S-1 present at C-terminus (C-terminal extension)"),
+    ('B', 'high', "Permuted order: S7 at position {s7_index}, S5/S6 at C-terminus"),
+    ('D', 'medium', "S0 at N-terminus with large gap S6-S7 ({gap} aa) - hybrid D/E feature"),
+    ('E', 'high', "S0 at N-terminus, small gap S6-S7 ({gap} aa), no S-1"),
+    ('D', 'high', "Large gap S6-S7 ({gap} aa) - TRD insertion between Hd3 and S7"),
+    ('C', 'high', "Small gap S6-S7 ({gap} aa), C-helix present"),
+    ('F', 'high', "N-terminal helix present"),
+    ('A', 'medium', "S0 present at C-terminus but S-1 missing (incomplete C-terminal extension)"),
+    ('Unknown', 'low', "No clear class assignment"),
+    ('C', 'high', "Reduced beta-sheet, C-helix present"),
+]
+
+
+def _classify_feature_table(features):
+    """Vectorized classify_by_topology over a DataFrame of topology_features"""
+    col = lambda name: features[name].to_numpy(dtype=bool)
+    n_strands = features['n_strands'].to_numpy(dtype=int)
+    s7_index = features['s7_index'].to_numpy(dtype=int)
+    gap = features['gap_s6_s7'].to_numpy(dtype=float)
+    has_gap = ~np.isnan(gap)
+    s0, s_minus_1 = col('has_s0'), col('has_s-1')
+    s0_at_n, s0_at_c = col('s0_at_n'), col('s0_at_c')
+    n_helix, c_helix = col('has_n_helix'), col('has_c_helix')
+    no_ext = ~s0 & ~s_minus_1
+
+    conditions = [
+        n_strands < MIN_STRAND_COUNT,
+        s0 & s_minus_1 & s0_at_c,
+        (s7_index >= 0) & (s7_index <= 3) & col('s5_s6_at_end'),
+        s0 & ~s_minus_1 & s0_at_n & has_gap & (gap >= 100),
+        s0 & ~s_minus_1 & s0_at_n & has_gap & (gap < 100) & n_helix,
+        no_ext & has_gap & (gap >= 100) & n_helix & ~c_helix,
+        no_ext & c_helix & ~n_helix,
+        no_ext & n_helix,
+        s0 & ~s_minus_1 & s0_at_c,
+    ]
+    rule = np.select(conditions, np.arange(len(conditions)), default=len(conditions))
+    rule[(rule == 6) & ~has_gap] = len(_RULES) - 1
+
+    classes = np.array([r[0] for r in _RULES], dtype=object)[rule]
+    confidence = np.array([r[1] for r in _RULES], dtype=object)[rule]
+    reasons = np.empty(len(rule), dtype=object)
+    for rule_id in np.unique(rule):
+        rows = np.flatnonzero(rule == rule_id)
+        template = _RULES[rule_id][2]
+        reasons[rows] = [
+            template.format(n_strands=n_strands[i], s7_index=s7_index[i],
+                            gap=int(gap[i]) if has_gap[i] else None)
+            for i in rows
+        ]
+    return classes, confidence, reasons
+
+
+def classify_many(topologies):
+    """
+    Classifies many topologies at once.
+    
+    Parameters:
+    - topologies: iterable (list, pandas Series / DataFrame column) of topology
+      strings or element lists; missing values (None/NaN/'') give empty rows
+    
+    Returns:
+    - DataFrame with CLASSIFICATION_COLUMNS, aligned with the input
+      (index preserved for a Series)
+    """
+    index = topologies.index if isinstance(topologies, pd.Series) else None
+    keys = [
+        t if isinstance(t, str) else (tuple(_as_elements(t)) if isinstance(t, (list, tuple)) else None)
+        for t in topologies
+    ]
+    keys = [k if k else None for k in keys]
+
+    # Identical topologies (typical for historical tables) are parsed and classified once
+    codes, uniques = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=True)
+    feature_rows = [topology_features(_as_elements(t)) for t in uniques]
+    unique_out = pd.DataFrame(index=range(len(uniques)), columns=CLASSIFICATION_COLUMNS, dtype=object)
+    if feature_rows:
+        features = pd.DataFrame(feature_rows, dtype=object)
+        classes, confidence, reasons = _classify_feature_table(features)
+        unique_out['class'] = classes
+        unique_out['confidence'] = confidence
+        unique_out['reasons'] = reasons
+        unique_out['strand_order'] = [' → '.join(f['strand_list']) for f in feature_rows]
+        unique_out['gap_s6_s7'] = [_gap_display(f) for f in feature_rows]
+        for name in ['has_s0', 'has_s-1', 'has_n_helix', 'has_c_helix']:
+            unique_out[name] = [f[name] for f in feature_rows]
+
+    empty = pd.DataFrame([[None] * len(CLASSIFICATION_COLUMNS)], columns=CLASSIFICATION_COLUMNS, dtype=object)
+    table = pd.concat([unique_out, empty], ignore_index=True)
+    result = table.iloc[np.where(codes < 0, len(uniques), codes)].reset_index(drop=True)
+    if index is not None:
+        result.index = index
+    return result
+
+
+def reclassify_table(df, column='full_secondary_elements'):
+    """
+    Re-classifies an existing batch output table (output.csv, output_topologies.csv)
+    from its topology column, without touching structures.
+    Returns a copy with the classification columns replaced.
+    """
+    out = df.copy()
+    classified = classify_many(df[column])
+    for name in CLASSIFICATION_COLUMNS:
+        out[OUTPUT_COLUMNS.get(name, name)] = classified[name]
+    return out
+
+
+def main():
+    """Re-classify an existing output table: classifier.py input.csv [output.csv]"""
+    input_file = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else input_file
+    
+    df = pd.read_csv(input_file, encoding='utf-8-sig')
+    if 'full_secondary_elements' not in df.columns:
+        print(f"❌ {input_file} has no 'full_secondary_elements' column")
+        sys.exit(1)
+    
+    old_classes = df['class'].copy() if 'class' in df.columns else None
+    df_out = reclassify_table(df)
+    df_out.to_csv(output_file, index=False, encoding='utf-8-sig')
+    
+    print(f"✅ Re-classified {len(df_out)} rows, saved to {output_file}")
+    if old_classes is not None:
+        changed = (old_classes.fillna('') != df_out['class'].fillna('')).sum()
+        print(f"📊 Changed class calls: {changed}")
+    for cls, count in df_out['class'].value_counts().items():
+        print(f"   Class {cls}: {count}")
+
+
 # Test function
-if __name__ == "__main__":
+if __name__ == "__main__" and len(sys.argv) > 1:
+    main()
+elif __name__ == "__main__":
     test_cases = [
         # Class A example (3S1S)
         ("Hd_191[191-211] — Hd_301[301-315] — S5(↑)[324-327] — Hd2[334-341] — S6(↑)[351-354] — Hd3[358-369] — S7(↑)[383-385] — Hu3[389-397] — S4(↑)[400-405] — Hu2[443-454] — S3(↑)[460-466] — Hu1[468-484] — S1(↑)[490-495] — S2(↓)[509-515] — S0(↑)[522-528] — Hd_532[532-546] — S-1(↓)[558-564] — Hu_565[565-570]", None),
@@ -49,6 +49,13 @@ def render_sidebar():
                 key="custom_motifs"
             )
         
+        # Отладка: анализ под cProfile, горячие точки под результатами
+        st.checkbox(
+            "Debug: profile analysis",
+            key="profile_analysis",
+            help="Run the analysis under cProfile (chains in one thread) and show the hotspots"
+        )
+        
         st.markdown("---")
         
         # Кнопка запуска
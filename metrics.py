@@ -0,0 +1,322 @@
+"""
+Live Prometheus metrics for batch_analyze.py (--metrics-port) and the Streamlit app
+
+A small registry of counters, gauges and histograms with labels, rendered in
+the Prometheus text exposition format by an HTTP server thread on localhost
+(GET /metrics). PipelineMetrics holds the metrics shared by batch workers and
+the web server: structures by status and per second, queue depth, running
+DSSP processes, cache hit ratios, errors by type and stage latency
+histograms. The DSSP counter lives in shared memory, so pool and queue
+worker processes update the gauge served by the main process.
+"""
+
+import collections
+import http.server
+import multiprocessing
+import os
+import threading
+import time
+
+# Stage latency buckets (seconds): from sub-millisecond analyzer steps to slow downloads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# Window of the structures-per-second gauge
+RATE_WINDOW = 60.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {', '.join(self.labels) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """(suffix, [(label, value)], value) of every series"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', list(zip(self.labels, key)), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    Gauge set by the caller, or read at scrape time from callback()
+    (a number, or {label values tuple: number} for labelled gauges)
+    """
+    type = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.callback is None:
+            yield from super().samples()
+            return
+        value = self.callback()
+        values = value if isinstance(value, dict) else {(): value}
+        for key, v in sorted(values.items()):
+            yield '', list(zip(self.labels, key)), v
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with _sum and _count"""
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            labels = list(zip(self.labels, key))
+            for bound, count in zip(self.buckets, counts):
+                yield '_bucket', labels + [('le', _format_value(bound))], count
+            yield '_sum', labels, total
+            yield '_count', labels, counts[-1]
+
+
+class Registry:
+    """Named metrics rendered together"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        return self._add(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class InFlight:
+    """
+    Number of running operations in shared memory (usable from pool and
+    queue worker processes); `with in_flight:` counts one operation
+    """
+
+    def __init__(self):
+        self._value = multiprocessing.Value('i', 0)
+
+    def __enter__(self):
+        with self._value.get_lock():
+            self._value.value += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._value.get_lock():
+            self._value.value -= 1
+
+    @property
+    def value(self):
+        return self._value.value
+
+
+class RateWindow:
+    """Events per second over the last `window` seconds (or since start, if shorter)"""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self._start = time.monotonic()
+        self._times = collections.deque()
+        self._lock = threading.Lock()
+
+    def add(self, n=1):
+        now = time.monotonic()
+        with self._lock:
+            self._times.extend([now] * n)
+
+    def rate(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._times and self._times[0] < now - self.window:
+                self._times.popleft()
+            n = len(self._times)
+        return n / max(min(now - self._start, self.window), 1e-9)
+
+
+class StageLaps:
+    """Stage times of sequential code: lap(stage) ends the stage that started at the previous lap"""
+
+    def __init__(self):
+        self.stages = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+class PipelineMetrics:
+    """Metrics of the analysis pipeline (batch workers and the web server)"""
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.rate = RateWindow()
+        self.dssp_in_flight = InFlight()
+        self.structures = r.counter('mtase_structures_total', "Structures analyzed, by entry status", ['status'])
+        r.gauge('mtase_structures_per_second', f"Structures analyzed per second (last {RATE_WINDOW:.0f} s)",
+                callback=self.rate.rate)
+        self.queue_depth = r.gauge('mtase_queue_depth', "Entries waiting to be analyzed, by state", ['state'])
+        r.gauge('mtase_dssp_in_flight', "DSSP processes running", callback=lambda: self.dssp_in_flight.value)
+        self.cache = r.counter('mtase_cache_lookups_total', "Cache lookups, by cache and result (hit/miss)",
+                               ['cache', 'result'])
+        r.gauge('mtase_cache_hit_ratio', "Share of cache lookups that were hits", ['cache'],
+                callback=self._hit_ratios)
+        self.errors = r.counter('mtase_errors_total', "Failed structures, by error type", ['type'])
+        self.stage_seconds = r.histogram('mtase_stage_seconds', "Wall time of pipeline stages", ['stage'])
+
+    def _hit_ratios(self):
+        lookups = collections.defaultdict(lambda: [0, 0])
+        for _, labels, value in self.cache.samples():
+            labels = dict(labels)
+            lookups[labels['cache']][labels['result'] == 'hit'] += value
+        return {(cache,): hits / (hits + misses) for cache, (misses, hits) in lookups.items() if hits + misses}
+
+    def observe_structure(self, status, stages=None, error_type=None):
+        """One analyzed structure: status, {stage: seconds}, error type of a failure"""
+        self.structures.inc(status=status)
+        self.rate.add()
+        for stage, seconds in (stages or {}).items():
+            self.stage_seconds.observe(seconds, stage=stage)
+        if error_type:
+            self.errors.inc(type=error_type)
+
+    def observe_record(self, record):
+        """A computed-entry record of batch_telemetry (EntryTelemetry.finish)"""
+        self.cache.inc(cache='entry', result='miss')
+        self.observe_structure(record['status'], {name: s['wall'] for name, s in record['stages'].items()},
+                               record.get('error_type'))
+
+    def observe_reused(self):
+        """An input row answered from the entry cache (duplicate or resumed entry)"""
+        self.cache.inc(cache='entry', result='hit')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(registry, port, host='127.0.0.1'):
+    """Serves registry at http://host:port/metrics from a daemon thread; returns the server"""
+    handler = type('MetricsHandler', (_Handler,), {'registry': registry})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+_app_metrics = None
+_app_lock = threading.Lock()
+
+
+def app_metrics():
+    """
+    PipelineMetrics of this web server process (one per process, Streamlit
+    reruns share it); the endpoint is started when MTASE_METRICS_PORT is set
+    """
+    global _app_metrics
+    with _app_lock:
+        if _app_metrics is None:
+            metrics = PipelineMetrics()
+            # Analyses running in the server (all sessions)
+            metrics.in_progress = InFlight()
+            metrics.registry.gauge('mtase_analyses_in_progress', "Analyses running in the web server",
+                                   callback=lambda: metrics.in_progress.value)
+            port = os.environ.get('MTASE_METRICS_PORT')
+            if port:
+                try:
+                    start_server(metrics.registry, int(port), os.environ.get('MTASE_METRICS_HOST', '127.0.0.1'))
+                except OSError as e:
+                    print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            _app_metrics = metrics
+        return _app_metrics
@@ -1,7 +1,9 @@
 import streamlit as st
 from analyzer import MTaseAnalyzer
 from utils.helpers import download_structure, parse_uploaded_file
-from components.visualizations import show_linear_topology, show_2d_topology, show_3d_topology
+from components.visualizations import show_linear_topology, show_strand_table, show_2d_topology, show_3d_topology
+from profiling import RunProfile, profiled
+from metrics import StageLaps, app_metrics
 import pandas as pd
 import os
 
@@ -28,7 +30,13 @@ def show():
         # Прогресс-бар для отслеживания шагов
         progress_bar = st.progress(0, text="Starting analysis...")
         
-        with st.spinner("🔄 Loading structure and running analysis..."):
+        # Отладочный режим: весь анализ под cProfile
+        profile_analysis = st.session_state.get('profile_analysis', False)
+        # Метрики сервера: время этапов, статус и тип ошибки каждого анализа
+        metrics = app_metrics()
+        laps = StageLaps()
+        with st.spinner("🔄 Loading structure and running analysis..."), profiled(profile_analysis) as profile, \
+                metrics.in_progress:
             try:
                 # Шаг 1: Создаем анализатор
                 progress_bar.progress(10, text="Initializing analyzer...")
@@ -37,24 +45,26 @@ def show():
                 # Шаг 2: Загружаем структуру
                 progress_bar.progress(20, text="Downloading structure...")
                 if source_type == 'pdb':
-                    result_files = download_structure(structure_source, source='pdb')
+                    result_files = download_structure(structure_source, source='pdb', in_flight=metrics.dssp_in_flight)
                     dssp_file = result_files['dssp']
                     st.session_state.current_pdb_file = result_files['pdb']
                     st.session_state.structure_source = 'pdb'
                     
                 elif source_type == 'alphafold':
-                    result_files = download_structure(structure_source, source='alphafold')
+                    result_files = download_structure(structure_source, source='alphafold', in_flight=metrics.dssp_in_flight)
                     if result_files is None:
                         st.error(f"Failed to download AlphaFold structure for {structure_source}")
+                        metrics.observe_structure('error', laps.stages, 'DownloadError')
                         return
                     dssp_file = result_files['dssp']
                     st.session_state.current_pdb_file = result_files['pdb']
                     st.session_state.structure_source = 'alphafold'
                     
                 elif source_type == 'upload':
-                    result_files = parse_uploaded_file(structure_source)
+                    result_files = parse_uploaded_file(structure_source, in_flight=metrics.dssp_in_flight)
                     if result_files is None:
                         st.error("Failed to parse uploaded PDB file")
+                        metrics.observe_structure('error', laps.stages, 'UploadError')
                         return
                     dssp_file = result_files['dssp']
                     st.session_state.current_pdb_file = result_files['pdb']
@@ -62,13 +72,17 @@ def show():
                 
                 if not dssp_file:
                     st.error("Failed to load structure")
+                    metrics.observe_structure('error', laps.stages, 'DSSPError')
                     return
+                laps.lap('get_structure')
                 
                 # Шаг 3: Загружаем DSSP
                 progress_bar.progress(40, text="Loading DSSP data...")
                 if not analyzer.load_dssp(dssp_file):
                     st.error("Failed to load DSSP file. Make sure DSSP is installed.")
+                    metrics.observe_structure('error', laps.stages, 'DSSPError')
                     return
+                laps.lap('load_dssp')
                 
                 # Кнопка для скачивания DSSP файла
                 with open(dssp_file, 'r') as f:
@@ -83,7 +97,9 @@ def show():
                 # Шаг 4: Находим вторичные структуры
                 progress_bar.progress(60, text="Identifying secondary structures...")
                 analyzer.find_all_strands()
+                laps.lap('find_all_strands')
                 analyzer.build_sheet_adjacency()
+                laps.lap('build_sheet_adjacency')
                 
                 # Шаг 5: Находим мотивы
                 progress_bar.progress(80, text="Searching catalytic motifs...")
@@ -99,19 +115,22 @@ def show():
                         motifs = analyzer.find_all_motifs()
                         st.warning("No custom motifs entered, using default patterns")
                 
-                # Фильтруем мотивы
-                motifs = analyzer.filter_motifs_by_topology(motifs)
-                
-                # Шаг 6: Анализируем каждый мотив
+                # Шаг 6: Фильтруем и анализируем мотивы (идентичные цепи - один раз, разные - параллельно)
                 progress_bar.progress(90, text="Analyzing topology...")
+                # cProfile видит только свой поток - при профилировании цепи анализируются в нём
+                laps.lap('find_all_motifs')
+                analyzed = analyzer.analyze_filtered_motifs(motifs, max_workers=1 if profile_analysis else None)
+                laps.lap('analyze_topology')
+                motifs = [motif for motif, _ in analyzed]
+                snapshot = analyzer.snapshot()
                 results = {}
-                for motif in motifs:
+                for motif, topology in analyzed:
                     chain = motif['chain']
                     motif_res = motif['res']
                     motif_text = motif['text']
                     key = f"{chain}_{motif_text}_{motif_res}"
                     
-                    result = analyzer.analyze_topology(motif_data=motif)
+                    result = topology.to_dict(snapshot)
                     
                     if result:
                         result['motif'] = motif
@@ -163,12 +182,17 @@ def show():
                 progress_bar.progress(100, text="Analysis complete!")
                 st.session_state.analyzer = analyzer
                 st.session_state.results = results
+                # Словарь profile заполняется при выходе из блока profiled
+                st.session_state.profile = profile
+                st.session_state.profile_name = getattr(structure_source, 'name', structure_source)
                 st.success(f"✅ Analysis complete! Found {len(motifs)} motifs in {len(results)} chains")
+                metrics.observe_structure('ok' if results else 'no_motifs', laps.stages)
                 
                 # Убираем прогресс-бар после завершения
                 progress_bar.empty()
                 
             except Exception as e:
+                metrics.observe_structure('error', laps.stages, type(e).__name__)
                 st.error(f"Error during analysis: {str(e)}")
                 import traceback
                 st.code(traceback.format_exc())
@@ -225,6 +249,18 @@ def show():
         df = pd.DataFrame(table_data)
         st.dataframe(df, use_container_width=True, hide_index=True)
         
+        # Горячие точки отладочного профилирования
+        profile = st.session_state.get('profile')
+        if profile and profile.get('stats'):
+            with st.expander("🔥 Profile (debug)"):
+                run_profile = RunProfile()
+                run_profile.add(st.session_state.get('profile_name', 'structure'), profile)
+                st.caption(f"Analysis wall time: {profile['wall']:.3f} s")
+                st.markdown("**Hotspots by own time**")
+                st.dataframe(run_profile.hotspots('tottime', 20), use_container_width=True, hide_index=True)
+                st.markdown("**Hotspots by cumulative time**")
+                st.dataframe(run_profile.hotspots('cumtime', 20), use_container_width=True, hide_index=True)
+        
         # Выбор мотива
         if table_data:
             motif_options = [f"{row['Chain']}: {row['Motif']} (sheet: {row['Sheet sequence']})" for row in table_data]
@@ -308,6 +344,10 @@ def show():
                     st.markdown("**Linear Topology with All Elements**")
                     show_linear_topology(data['result'], st.session_state.analyzer)
 
+                # Таблица тяжей считается только по запросу
+                if st.checkbox("Show strand table", key="show_strand_table"):
+                    show_strand_table(data['result'], st.session_state.analyzer)
+
             with tab2:
                 st.subheader("2D Topology Diagram")
                 fig = st.session_state.analyzer.visualize_topology_interactive(data['result'])
@@ -0,0 +1,171 @@
+"""
+cProfile helpers for batch_analyze.py (--profile) and the Streamlit debug toggle
+
+profiled / profile_call run code under cProfile and return its raw stats (a
+plain picklable dict, so pool workers can send them back with their rows).
+RunProfile merges the stats of every structure of a run, remembers which
+structures spent the most time in each function and turns the result into
+ranked hotspot tables and a text report.
+"""
+
+import cProfile
+import contextlib
+import heapq
+import os
+import pstats
+import time
+
+import pandas as pd
+
+# Functions of each structure considered for attribution, structures named per function
+TOP_PER_STRUCTURE = 20
+WORST_PER_FUNCTION = 3
+# pstats sort keys of the hotspot tables: own time, time including callees
+SORT_COLUMNS = {'tottime': 2, 'cumtime': 3}
+
+
+@contextlib.contextmanager
+def profiled(enabled=True):
+    """
+    Profiles the with-block when enabled; the yielded dict receives 'stats'
+    (raw pstats dict) and 'wall' (seconds) on exit and stays empty otherwise
+    """
+    profile = {}
+    if not enabled:
+        yield profile
+        return
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield profile
+    finally:
+        profiler.disable()
+        profile['wall'] = time.perf_counter() - start
+        profiler.create_stats()
+        profile['stats'] = profiler.stats
+
+
+def profile_call(func, *args, **kwargs):
+    """(func(*args, **kwargs), profile dict of profiled)"""
+    with profiled() as profile:
+        result = func(*args, **kwargs)
+    return result, profile
+
+
+class _RawStats:
+    # pstats.Stats accepts any object with create_stats() and a stats dict
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def function_name(func):
+    """'dir/file.py:line(function)' of a pstats key; built-ins keep their own name"""
+    filename, line, name = func
+    if filename == '~':
+        return name
+    parts = os.path.normpath(filename).split(os.sep)
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+class RunProfile:
+    """
+    Merged cProfile stats of the structures of a run.
+
+    Per structure only its TOP_PER_STRUCTURE most expensive functions (by own
+    and by cumulative time) are remembered, and per function only the
+    WORST_PER_FUNCTION structures, so memory does not grow with the run.
+    """
+
+    def __init__(self, worst_structures=20):
+        self.stats = None
+        self.structures = 0
+        self.wall = 0.0
+        self.worst_structures = worst_structures
+        self._slowest = []  # heap of (wall, name, top functions)
+        self._worst = {sort: {} for sort in SORT_COLUMNS}  # sort -> func -> heap of (time, name)
+
+    def add(self, name, profile):
+        """Adds the profile dict (see profiled) of the structure called name"""
+        raw = profile['stats']
+        stats = pstats.Stats(_RawStats(raw))
+        if self.stats is None:
+            self.stats = stats
+        else:
+            self.stats.add(stats)
+        self.structures += 1
+        self.wall += profile['wall']
+
+        for sort, col in SORT_COLUMNS.items():
+            for func, values in heapq.nlargest(TOP_PER_STRUCTURE, raw.items(), key=lambda kv: kv[1][col]):
+                worst = self._worst[sort].setdefault(func, [])
+                item = (values[col], name)
+                if len(worst) < WORST_PER_FUNCTION:
+                    heapq.heappush(worst, item)
+                else:
+                    heapq.heappushpop(worst, item)
+
+        own = heapq.nlargest(3, raw.items(), key=lambda kv: kv[1][2])
+        item = (profile['wall'], name, [(function_name(f), v[2]) for f, v in own])
+        if len(self._slowest) < self.worst_structures:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    def hotspots(self, sort='tottime', top=30):
+        """
+        DataFrame of the top functions by sort ('tottime' or 'cumtime'): calls,
+        own and cumulative seconds, share of the profiled time and the
+        structures that spent the most time in the function
+        """
+        if self.stats is None:
+            return pd.DataFrame()
+        col = SORT_COLUMNS[sort]
+        total = self.stats.total_tt or 1.0
+        ranked = heapq.nlargest(top, self.stats.stats.items(), key=lambda kv: kv[1][col])
+        rows = []
+        for rank, (func, (cc, nc, tt, ct, _)) in enumerate(ranked, start=1):
+            worst = sorted(self._worst[sort].get(func, []), reverse=True)
+            rows.append({
+                'rank': rank,
+                'function': function_name(func),
+                'calls': nc,
+                'own_s': tt,
+                'own_%': 100.0 * tt / total,
+                'cum_s': ct,
+                'worst_structures': ', '.join(f"{name} ({t:.3f}s)" for t, name in worst)
+            })
+        return pd.DataFrame(rows)
+
+    def slowest(self):
+        """DataFrame of the slowest structures (wall time) with their top functions by own time"""
+        rows = []
+        for rank, (wall, name, own) in enumerate(sorted(self._slowest, reverse=True), start=1):
+            rows.append({
+                'rank': rank,
+                'structure': name,
+                'wall_s': wall,
+                'top_functions': ', '.join(f"{f} ({t:.3f}s)" for f, t in own)
+            })
+        return pd.DataFrame(rows)
+
+    def report(self, top=30):
+        """Text report: hotspots by own and by cumulative time, slowest structures"""
+        if self.stats is None:
+            return "No profiled structures\n"
+        fmt = lambda v: f"{v:.3f}"
+        lines = [f"Profile of {self.structures} structure(s): {self.wall:.3f} s wall, "
+                 f"{self.stats.total_tt:.3f} s profiled", ""]
+        for sort, title in (('tottime', 'own time'), ('cumtime', 'cumulative time')):
+            lines += [f"Hotspots by {title}:",
+                      self.hotspots(sort, top).to_string(index=False, float_format=fmt), ""]
+        lines += ["Slowest structures:", self.slowest().to_string(index=False, float_format=fmt), ""]
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """Merged stats in the binary pstats format (pstats, snakeviz, ...)"""
+        if self.stats is not None:
+            self.stats.dump_stats(path)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Synthetic Rossmann-like structures for scaling tests
+
+Builds idealized MTase-like chains: a flat parallel beta sheet in the
+canonical strand order (S5 S6 S7 S4 S3 S1 S2, optionally followed by the
+C-terminal S0 and S-1; S2 and S-1 antiparallel) with crossover helices
+above and below the sheet, the catalytic motif right after S4, optional
+domain insertions and a distant helical domain that pads the chain to a
+requested residue count. Writes DSSP files in the column layout read by
+MTaseAnalyzer.load_dssp and, optionally, PDB files with backbone atoms.
+
+Example:
+    python synthetic.py big.dssp --strands 7 --chains 4 --residues 20000 --insertion 6:300 --motif 150:DPPW
+"""
+
+import argparse
+import string
+
+# Canonical N -> C order of the sheet strands (analyzer names) and the C-terminal extension
+CORE_ORDER = [5, 6, 7, 4, 3, 1, 2]
+EXTENSION_ORDER = [0, -1]
+ANTIPARALLEL = {2, -1}
+
+STRAND_LENGTH = 5
+HELIX_LENGTH = 10
+LOOP_LENGTH = 4
+STRAND_SPACING = 4.8
+STRAND_RISE = 3.3
+HELIX_RISE = 1.5
+HELIX_HEIGHT = 10.0
+# Padding domain: helices on a grid well outside helix_radius of the sheet
+DOMAIN_HEIGHT = 60.0
+DOMAIN_SPACING = 10.0
+DOMAIN_COLUMNS = 20
+DOMAIN_LOOP = 6
+DOMAIN_HELIX = 12
+CHAIN_SPACING = 200.0
+
+# Backbone atoms written by write_pdb and their offsets (Å) from CA; the
+# geometry is idealized, only the analyzer reads the DSSP file
+BACKBONE_OFFSETS = [('N', (-1.2, -0.8, 0.0)), ('CA', (0.0, 0.0, 0.0)), ('C', (1.2, -0.8, 0.0)),
+                    ('O', (1.2, -2.0, 0.0))]
+
+# One-character chain IDs of the DSSP format
+CHAIN_IDS = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+THREE_LETTER = {
+    'A': 'ALA', 'C': 'CYS', 'D': 'ASP', 'E': 'GLU', 'F': 'PHE', 'G': 'GLY', 'H': 'HIS', 'I': 'ILE',
+    'K': 'LYS', 'L': 'LEU', 'M': 'MET', 'N': 'ASN', 'P': 'PRO', 'Q': 'GLN', 'R': 'ARG', 'S': 'SER',
+    'T': 'THR', 'V': 'VAL', 'W': 'TRP', 'Y': 'TYR'
+}
+
+
+def strand_order(strands=7, c_extension=True):
+    """
+    N -> C order of strand names: the canonical order restricted to S1..S<strands>
+    (at least S1-S4); more than 7 strands adds S8, S9, ... after S7
+    """
+    if strands < 4:
+        raise ValueError("At least 4 strands (S1-S4) are needed")
+    order = [n for n in CORE_ORDER if n <= strands]
+    extra = list(range(8, strands + 1))
+    if extra:
+        i = order.index(7) + 1
+        order[i:i] = extra
+    return order + (EXTENSION_ORDER if c_extension else [])
+
+
+class _ChainBuilder:
+    """Residues (aa, ss, (x, y, z)) of one chain, appended element by element"""
+
+    def __init__(self):
+        self.residues = []
+        self.last_x = 0.0
+        self._loop_i = 0
+        self._domain_i = 0
+
+    def loop(self, n, aa='A'):
+        for _ in range(n):
+            self._loop_i += 1
+            self.residues.append((aa, ' ', (self.last_x, 30.0 + self._loop_i % 7, 30.0 + self._loop_i % 5)))
+
+    def strand(self, x, up=True):
+        self.last_x = x
+        self.loop(LOOP_LENGTH)
+        for k in range(STRAND_LENGTH):
+            y = k if up else STRAND_LENGTH - 1 - k
+            self.residues.append(('V', 'E', (x, y * STRAND_RISE, 0.0)))
+
+    def helix(self, side):
+        self.loop(LOOP_LENGTH)
+        z = HELIX_HEIGHT if side == 'u' else -HELIX_HEIGHT
+        for k in range(HELIX_LENGTH):
+            self.residues.append(('L', 'H', (self.last_x + 1.0, k * HELIX_RISE, z)))
+
+    def motif(self, text):
+        for k, aa in enumerate(text):
+            self.residues.append((aa, ' ', (self.last_x, 18.0 + 2.0 * k, 0.0)))
+
+    def domain(self, n, height):
+        """n residues of loop + helix units (DOMAIN_LOOP + DOMAIN_HELIX) on a grid far from the sheet"""
+        sign = 1.0 if height > 0 else -1.0
+        while n > 0:
+            j = self._domain_i
+            self._domain_i += 1
+            x = (j % DOMAIN_COLUMNS) * DOMAIN_SPACING
+            y = (j // DOMAIN_COLUMNS) * DOMAIN_SPACING
+            # Loops longer than 5 residues keep the helices separate (see find_all_strands)
+            for k in range(min(DOMAIN_LOOP, n)):
+                self.residues.append(('G', ' ', (x + 1.0 + k, y, height)))
+            n -= DOMAIN_LOOP
+            for k in range(min(DOMAIN_HELIX, max(n, 0))):
+                self.residues.append(('L', 'H', (x, y, height + sign * k * HELIX_RISE)))
+            n -= DOMAIN_HELIX
+
+
+def rossmann_chain(strands=7, helices=None, c_extension=True, motif='NPPY', insertions=None, residues=None):
+    """
+    Residues (aa, ss, (x, y, z)) of one synthetic chain.
+    strands - sheet strands S1..S<strands> (plus S0, S-1 with c_extension);
+    helices - number of helices (default: one per crossover); extra helices go
+    to the distant domain; insertions - {strand name: residues} domain
+    insertions after that strand; residues - total length, padded with the
+    distant helical domain (ValueError if the sheet does not fit).
+    """
+    order = strand_order(strands, c_extension)
+    insertions = insertions or {}
+    s4 = order.index(4)
+
+    # Helix slots (N -> C): N-terminal, after each strand except the S1-S2 hairpin;
+    # helices before S4 lie below the sheet, the crossover into S4 and the rest above
+    slots = ['d']
+    for i, name in enumerate(order):
+        if name in (1, 2) or i == len(order) - 1 and name not in (0, -1):
+            slots.append(None)
+        elif i < s4:
+            slots.append('u' if i == s4 - 1 else 'd')
+        else:
+            slots.append('d' if name == 0 else 'u')
+    n_slots = sum(1 for s in slots if s)
+    if helices is None:
+        helices = n_slots
+
+    builder = _ChainBuilder()
+    used = 0
+    min_x = min(7 - n for n in order)
+    for i, name in enumerate(order):
+        if slots[i] and used < helices:
+            builder.helix(slots[i])
+            used += 1
+        builder.strand((7 - name - min_x) * STRAND_SPACING, up=name not in ANTIPARALLEL)
+        if name == 4 and motif:
+            builder.motif(motif)
+        if name in insertions:
+            builder.domain(insertions[name], -DOMAIN_HEIGHT)
+    if slots[-1] and used < helices:
+        builder.helix(slots[-1])
+        used += 1
+    builder.loop(3)
+    if used < helices:
+        builder.domain((DOMAIN_LOOP + DOMAIN_HELIX) * (helices - used), DOMAIN_HEIGHT)
+
+    if residues is not None:
+        if residues < len(builder.residues):
+            raise ValueError(f"{residues} residues do not fit the layout ({len(builder.residues)} needed)")
+        if residues > len(builder.residues):
+            builder.domain(residues - len(builder.residues), DOMAIN_HEIGHT + 40.0)
+    return builder.residues
+
+
+def plant_motifs(residues, motifs):
+    """Copy of residues with motif texts written at 1-based residue numbers {position: text}"""
+    residues = list(residues)
+    for position, text in motifs.items():
+        for k, aa in enumerate(text):
+            i = position - 1 + k
+            if not 0 <= i < len(residues):
+                raise ValueError(f"Motif {text} at {position} is outside the chain")
+            _, ss, xyz = residues[i]
+            residues[i] = (aa, ss, xyz)
+    return residues
+
+
+def synthetic_structure(chains=1, motifs=None, **chain_options):
+    """
+    {chain ID: residues} of identical chains (see rossmann_chain) placed
+    CHAIN_SPACING apart; motifs {position: text} are planted in every chain
+    """
+    if not 1 <= chains <= len(CHAIN_IDS):
+        raise ValueError(f"1 to {len(CHAIN_IDS)} chains are supported (one-character chain IDs)")
+    base = rossmann_chain(**chain_options)
+    if motifs:
+        base = plant_motifs(base, motifs)
+    structure = {}
+    for ci in range(chains):
+        dx, dy, dz = ci % 8 * CHAIN_SPACING, ci // 8 % 8 * CHAIN_SPACING, ci // 64 * CHAIN_SPACING
+        structure[CHAIN_IDS[ci]] = [(aa, ss, (x + dx, y + dy, z + dz)) for aa, ss, (x, y, z) in base]
+    return structure
+
+
+def write_dssp(path, structure):
+    """DSSP file (residue, chain, amino acid, SS and CA columns) of a synthetic structure"""
+    lines = ["==== Secondary Structure Definition by the program DSSP ====\n",
+             "  #  RESIDUE AA STRUCTURE BP1 BP2  ACC     N-H-->O    O-->H-N    N-H-->O    O-->H-N"
+             "    TCO  KAPPA ALPHA  PHI   PSI    X-CA   Y-CA   Z-CA\n"]
+    n = 0
+    for chain, residues in structure.items():
+        for rn, (aa, ss, (x, y, z)) in enumerate(residues, start=1):
+            n += 1
+            if n > 99999:
+                raise ValueError("DSSP files hold at most 99999 residues")
+            lines.append(f"{n:5d}{rn:5d} {chain} {aa}  {ss}".ljust(115) + f"{x:7.1f} {y:7.1f} {z:7.1f}\n")
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+def write_pdb(path, structure):
+    """
+    PDB file of a synthetic structure: N, CA, C and O of every residue (fixed
+    offsets from CA, BACKBONE_OFFSETS), so the sequence prefilter of
+    batch_analyze keeps every residue, as it would with a real model
+    """
+    lines = []
+    serial = 0
+    for chain, residues in structure.items():
+        for rn, (aa, _, (x, y, z)) in enumerate(residues, start=1):
+            for atom, (dx, dy, dz) in BACKBONE_OFFSETS:
+                serial += 1
+                lines.append(f"ATOM  {serial % 100000:5d}  {atom:<3} {THREE_LETTER.get(aa, 'UNK')} {chain}"
+                             f"{rn % 10000:4d}    {x + dx:8.3f}{y + dy:8.3f}{z + dz:8.3f}  1.00  0.00"
+                             f"           {atom[0]}\n")
+        lines.append("TER\n")
+    lines.append("END\n")
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+def _position_text(spec):
+    position, text = spec.split(':')
+    return int(position), text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Rossmann-like DSSP/PDB generator")
+    parser.add_argument('output', help="DSSP file to write")
+    parser.add_argument('--pdb', metavar='FILE', help="also write a PDB file (backbone atoms N, CA, C, O)")
+    parser.add_argument('--strands', type=int, default=7, help="sheet strands S1..S<N> (default: 7)")
+    parser.add_argument('--no-extension', dest='c_extension', action='store_false',
+                        help="no C-terminal S0 / S-1 strands")
+    parser.add_argument('--helices', type=int, help="number of helices (default: one per crossover)")
+    parser.add_argument('--chains', type=int, default=1, help="identical chains (default: 1)")
+    parser.add_argument('--residues', type=int, help="residues per chain (padded with a distant helical domain)")
+    parser.add_argument('--motif-text', default='NPPY', help="catalytic motif after S4 ('' for none)")
+    parser.add_argument('--insertion', action='append', default=[], metavar='STRAND:RESIDUES',
+                        help="domain insertion after strand STRAND (repeatable)")
+    parser.add_argument('--motif', action='append', default=[], metavar='POSITION:TEXT',
+                        help="plant TEXT at residue POSITION of every chain (repeatable)")
+    args = parser.parse_args()
+
+    structure = synthetic_structure(
+        chains=args.chains,
+        motifs=dict(_position_text(m) for m in args.motif),
+        strands=args.strands,
+        helices=args.helices,
+        c_extension=args.c_extension,
+        motif=args.motif_text,
+        insertions={int(strand): int(n) for strand, n in (i.split(':') for i in args.insertion)},
+        residues=args.residues
+    )
+    write_dssp(args.output, structure)
+    if args.pdb:
+        write_pdb(args.pdb, structure)
+    n = sum(len(r) for r in structure.values())
+    print(f"✅ {args.output}: {len(structure)} chain(s), {n} residues")
+
+
+if __name__ == "__main__":
+    main()
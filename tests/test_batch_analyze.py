@@ -0,0 +1,120 @@
+"""Entry runner and batch paths of batch_analyze"""
+
+import csv
+import os
+
+import pytest
+
+import batch_analyze
+from synthetic import synthetic_structure, write_pdb
+
+
+def square(task):
+    print(f"task {task}")
+    return task * task
+
+
+def test_run_entries_bounds_tasks_in_flight(capsys):
+    read = []
+
+    def tasks():
+        for task in range(50):
+            read.append(task)
+            yield task
+
+    results = []
+    for result in batch_analyze.run_entries(square, tasks(), jobs=2, max_pending=4):
+        results.append(result)
+        assert len(read) <= len(results) + 4
+    assert results == [task * task for task in range(50)]
+    assert capsys.readouterr().out == ''.join(f"task {task}\n" for task in range(50))
+
+
+class Crash(BaseException):
+    """A killed process: not caught like the errors of one entry"""
+
+
+def run_batch(tmp_path, monkeypatch, ids, crash_at=None, *options):
+    """Runs batch_analyze on ids with a stubbed analysis; returns (computed IDs, output rows)"""
+    input_file, output_file = tmp_path / 'input.csv', tmp_path / 'output.csv'
+    input_file.write_text('ID,Type\n' + ''.join(f'{id_value},pdb\n' for id_value in ids))
+    computed = []
+
+    def entry_rows(task, telemetry=None, tracer=None):
+        idx, total, id_value, type_value, args = task
+        if id_value == crash_at:
+            raise Crash()
+        computed.append(id_value)
+        return [{'source_id': id_value, 'source_type': type_value, 'chain': chain, 'found_motif': 'NPPY',
+                 'class': id_value[0], 'status': 'ok'} for chain in 'AB']
+
+    monkeypatch.setattr(batch_analyze, 'entry_rows', entry_rows)
+    monkeypatch.setattr('sys.argv', ['batch_analyze.py', str(input_file), str(output_file), '--no-prefilter',
+                                     '--buffer-size', '1'] + list(options))
+    try:
+        batch_analyze.main()
+    except Crash:
+        pass
+    with open(output_file, encoding='utf-8-sig', newline='') as f:
+        return computed, [(r['input_row'], r['source_id'], r['chain']) for r in csv.DictReader(f)]
+
+
+def test_crashed_run_resumes_where_it_stopped(tmp_path, monkeypatch, capsys):
+    ids = ['AAA', 'BBB', 'AAA', 'CCC', 'DDD']
+    computed, rows = run_batch(tmp_path, monkeypatch, ids, crash_at='CCC')
+    assert computed == ['AAA', 'BBB']
+    assert rows == [(str(i), id_value, chain) for i, id_value in enumerate(ids[:3]) for chain in 'AB']
+
+    computed, rows = run_batch(tmp_path, monkeypatch, ids)
+    assert computed == ['CCC', 'DDD']
+    assert rows == [(str(i), id_value, chain) for i, id_value in enumerate(ids) for chain in 'AB']
+    out = capsys.readouterr().out
+    assert 'Resuming: 2 entries already done' in out
+    # The summary counts the kept rows as well as the recomputed ones
+    assert 'Chains with motifs: 10' in out
+
+    computed, rows = run_batch(tmp_path, monkeypatch, ids)
+    assert computed == []
+    computed, rows = run_batch(tmp_path, monkeypatch, ids, None, '--force')
+    assert computed == ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+def test_lost_output_is_recomputed(tmp_path, monkeypatch):
+    ids = ['AAA', 'BBB']
+    run_batch(tmp_path, monkeypatch, ids)
+    os.remove(tmp_path / 'output.csv')
+    computed, rows = run_batch(tmp_path, monkeypatch, ids)
+    assert computed == ids
+    assert len(rows) == 4
+
+
+def alphafold_model(tmp_path, plddt):
+    """Synthetic PDB file whose residue i of n has pLDDT plddt(i, n); returns (file, n)"""
+    pdb_file = tmp_path / 'model.pdb'
+    write_pdb(str(pdb_file), synthetic_structure())
+    n = residue_numbers(str(pdb_file))[-1]
+    lines = pdb_file.read_text().splitlines(keepends=True)
+    with open(pdb_file, 'w') as f:
+        for line in lines:
+            if line.startswith('ATOM  '):
+                line = f"{line[:60]}{plddt(int(line[22:26]), n):6.2f}{line[66:]}"
+            f.write(line)
+    return str(pdb_file), n
+
+
+def residue_numbers(pdb_file):
+    with open(pdb_file) as f:
+        return sorted({int(line[22:26]) for line in f if line.startswith('ATOM  ')})
+
+
+@pytest.mark.parametrize('mode', ['trim', 'mask'])
+def test_low_plddt_residues_are_removed(tmp_path, mode):
+    head, middle = set(range(1, 6)), {20, 21}
+    pdb_file, n = alphafold_model(tmp_path, lambda i, n: 40.0 if i in head | middle or i > n - 3 else 90.0)
+    out_file, removed = batch_analyze.mask_low_plddt(pdb_file, 70, mode, str(tmp_path / 'masked.pdb'))
+
+    # trim only cuts the low-confidence termini, mask every low-confidence residue
+    dropped = head | set(range(n - 2, n + 1)) | (middle if mode == 'mask' else set())
+    assert residue_numbers(out_file) == [i for i in range(1, n + 1) if i not in dropped]
+    assert removed == len(dropped)
+    assert residue_numbers(pdb_file) == list(range(1, n + 1))
@@ -0,0 +1,126 @@
+"""Result writer, journal and output file helpers of batch_io"""
+
+import csv
+
+from batch_io import Journal, ResultWriter, keep_rows, merge_shards
+
+COLUMNS = ['source_id', 'source_type', 'chain', 'status', 'input_row']
+
+
+def rows(id_value, input_row, n):
+    return [{'source_id': id_value, 'source_type': 'pdb', 'chain': chr(ord('A') + i), 'status': 'ok',
+             'input_row': input_row} for i in range(n)]
+
+
+def entry(id_value, status='ok'):
+    return {'id': id_value, 'type': 'pdb', 'hash': 'h', 'status': status}
+
+
+def read_output(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+class Crash(Exception):
+    pass
+
+
+def crashing(rows, after):
+    """Yields the first `after` rows, then dies like a killed process"""
+    for i, row in enumerate(rows):
+        if i == after:
+            raise Crash()
+        yield row
+
+
+def test_crash_in_the_middle_of_an_entry_recomputes_it(tmp_path):
+    out, journal_file = str(tmp_path / 'out.csv'), str(tmp_path / 'out.csv.journal')
+    journal = Journal(journal_file)
+    writer = ResultWriter(out, COLUMNS, buffer_size=3, journal=journal)
+    writer.write_rows(rows('A', 0, 2), entry=entry('A'))
+    try:
+        # The buffer fills (and is flushed) after B's first row, then the process dies
+        writer.write_rows(crashing(rows('B', 1, 4), 2), entry=entry('B'))
+    except Crash:
+        pass
+    journal.close()
+
+    assert [r['source_id'] for r in read_output(out)] == ['A', 'A', 'B']
+    completed = Journal(journal_file).completed('h')
+    assert completed == {('A', 'pdb')}
+    kept, kept_keys = keep_rows(out, completed)
+    assert kept == {0} and kept_keys == {('A', 'pdb')}
+    assert [r['source_id'] for r in read_output(out)] == ['A', 'A']
+
+
+def test_entries_are_journaled_once_flushed(tmp_path):
+    out, journal_file = str(tmp_path / 'out.csv'), str(tmp_path / 'out.csv.journal')
+    journal = Journal(journal_file)
+    with ResultWriter(out, COLUMNS, buffer_size=3, journal=journal) as writer:
+        writer.write_rows(rows('A', 0, 2), entry=entry('A'))
+        writer.write_rows(rows('B', 1, 4), entry=entry('B'))
+        assert Journal(journal_file).completed('h') == {('A', 'pdb')}
+    journal.close()
+    assert Journal(journal_file).completed('h') == {('A', 'pdb'), ('B', 'pdb')}
+    assert len(read_output(out)) == 6
+
+
+def test_failed_entries_are_not_completed(tmp_path):
+    journal_file = str(tmp_path / 'journal')
+    journal = Journal(journal_file)
+    journal.record([entry('A'), entry('B', 'error'), dict(entry('C'), hash='old')])
+    journal.close()
+    assert Journal(journal_file).completed('h') == {('A', 'pdb')}
+
+
+def test_torn_journal_line_is_dropped(tmp_path):
+    journal_file = tmp_path / 'journal'
+    journal = Journal(str(journal_file))
+    journal.record([entry('A'), entry('B')])
+    journal.close()
+    with open(journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"id": "C", "ty')
+    assert Journal(str(journal_file)).completed('h') == {('A', 'pdb'), ('B', 'pdb')}
+
+
+def test_torn_row_with_quoted_newlines_is_cut(tmp_path):
+    out = str(tmp_path / 'out.csv')
+    columns = COLUMNS + ['error']
+    with ResultWriter(out, columns) as writer:
+        writer.write_rows([dict(rows('A', 0, 1)[0], error='DSSP Error:\nline 1\nline "2"\n')])
+        writer.write_rows([dict(rows('B', 1, 1)[0], error='')])
+    with open(out, 'rb') as f:
+        complete = f.read()
+    # A crash while writing the next row, torn right after a newline inside its error field
+    with open(out, 'ab') as f:
+        f.write(b'C,pdb,A,error,2,"DSSP Error:\nline 1\n')
+
+    kept, kept_keys = keep_rows(out, {('A', 'pdb'), ('B', 'pdb'), ('C', 'pdb')})
+    assert kept_keys == {('A', 'pdb'), ('B', 'pdb')}
+    output = read_output(out)
+    assert output[0]['error'] == 'DSSP Error:\nline 1\nline "2"\n'
+    assert len(output) == 2
+
+    with open(out, 'ab') as f:
+        f.write(b'C,pdb,A,err')
+    with ResultWriter(out, columns, append=True) as writer:
+        writer.write_rows(rows('D', 3, 1))
+    with open(out, 'rb') as f:
+        assert f.read().startswith(complete)
+    assert [r['source_id'] for r in read_output(out)] == ['A', 'B', 'D']
+
+
+def test_shards_are_merged_in_input_order(tmp_path):
+    first, second, out = str(tmp_path / 'shard_1.csv'), str(tmp_path / 'shard_2.csv'), str(tmp_path / 'out.csv')
+    with ResultWriter(first, COLUMNS) as writer:
+        # A resumed shard run appends recomputed entries at the end
+        writer.write_rows(rows('A', 0, 1) + rows('D', 3, 2) + rows('C', 2, 1))
+    with ResultWriter(second, COLUMNS) as writer:
+        writer.write_rows(rows('B', 1, 1) + rows('E', 4, 1))
+    with open(second, 'a', encoding='utf-8') as f:
+        f.write('F,pdb,A,o')
+
+    summary, entries = merge_shards([first, second], out)
+    assert [(r['input_row'], r['source_id']) for r in read_output(out)] == \
+        [('0', 'A'), ('1', 'B'), ('2', 'C'), ('3', 'D'), ('3', 'D'), ('4', 'E')]
+    assert entries == 5
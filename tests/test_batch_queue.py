@@ -0,0 +1,67 @@
+"""Leasing, retries and export of the SQLite work queue"""
+
+import csv
+
+import pytest
+
+from batch_queue import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / 'input.csv'
+    path.write_text('ID,Type\n1abc,pdb\n2abc,pdb\n1abc,pdb\n')
+    return str(path)
+
+
+def ok_row(key):
+    return {'source_id': key[0], 'source_type': key[1], 'chain': 'A', 'status': 'ok'}
+
+
+def test_workers_never_lease_the_same_entry(tmp_path, input_file):
+    with WorkQueue(str(tmp_path / 'queue.db')) as queue:
+        assert queue.seed(input_file, chunk_size=2)
+        assert not queue.seed(input_file)
+        assert queue.meta('total') == 3
+        assert queue.lease('w1') == (0, '1abc', 'pdb')
+        assert queue.lease('w2') == (1, '2abc', 'pdb')
+        assert queue.lease('w3') is None
+        assert queue.counts() == {LEASED: 2}
+
+
+def test_expired_lease_is_requeued_and_then_failed(tmp_path, input_file):
+    with WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=-1, max_attempts=2) as queue:
+        queue.seed(input_file)
+        key = ('1abc', 'pdb')
+        assert queue.lease('w1')[1:] == key
+        # w1 lost its lease: w2 takes the entry over, w1 can no longer store rows
+        assert queue.lease('w2')[1:] == key
+        assert not queue.heartbeat(key, 'w1')
+        assert not queue.complete(key, 'w1', [ok_row(key)])
+        # Out of attempts: the next lease fails the entry instead of requeueing it
+        assert queue.lease('w3')[1:] == ('2abc', 'pdb')
+        assert queue.counts()[FAILED] == 1
+
+
+def test_failed_attempt_is_retried_and_export_keeps_input_order(tmp_path, input_file):
+    out = str(tmp_path / 'out.csv')
+    with WorkQueue(str(tmp_path / 'queue.db'), max_attempts=2) as queue:
+        queue.seed(input_file)
+        first, second = ('1abc', 'pdb'), ('2abc', 'pdb')
+        queue.lease('w1')
+        assert queue.complete(first, 'w1', [dict(ok_row(first), status='error')], error='timeout')
+        assert queue.counts() == {PENDING: 2}
+        assert queue.lease('w1')[1:] == first
+        queue.complete(first, 'w1', [ok_row(first)])
+        queue.lease('w1')
+        queue.complete(second, 'w1', [dict(ok_row(second), status='error')], error='no structure')
+        assert queue.counts() == {DONE: 1, PENDING: 1}
+        queue.lease('w1')
+        queue.complete(second, 'w1', [dict(ok_row(second), status='error')], error='no structure')
+        assert queue.finished()
+
+        summary = queue.export(out, ['source_id', 'source_type', 'chain', 'status', 'input_row'])
+    with open(out, encoding='utf-8-sig', newline='') as f:
+        assert [(r['input_row'], r['source_id'], r['status']) for r in csv.DictReader(f)] == \
+            [('0', '1abc', 'ok'), ('1', '2abc', 'error'), ('2', '1abc', 'ok')]
+    assert summary.status_counts == {'ok': 2, 'error': 1}
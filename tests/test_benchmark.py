@@ -0,0 +1,53 @@
+"""Golden comparison of benchmark.py on the checked-in fixtures"""
+
+import glob
+import os
+
+import pytest
+
+import benchmark
+from synthetic import synthetic_structure, write_dssp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, benchmark.FIXTURES_DIR)
+GOLDEN = [os.path.join(ROOT, path) for path in benchmark.GOLDEN_FILES]
+
+
+@pytest.fixture(scope='module')
+def golden():
+    return benchmark.load_golden(GOLDEN)
+
+
+def test_every_fixture_has_golden_rows(golden):
+    names = {os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(FIXTURES, '*.dssp'))}
+    assert set(benchmark.SYNTHETIC_FIXTURES) <= names
+    assert names <= {key[0] for key in golden}
+
+
+@pytest.mark.parametrize('name', sorted(benchmark.SYNTHETIC_FIXTURES))
+def test_synthetic_fixture_matches_its_generator(tmp_path, name):
+    path = tmp_path / f"{name}.dssp"
+    write_dssp(str(path), synthetic_structure(**benchmark.SYNTHETIC_FIXTURES[name]))
+    with open(os.path.join(FIXTURES, f"{name}.dssp"), 'rb') as f:
+        assert path.read_bytes() == f.read()
+
+
+@pytest.mark.parametrize('dssp_file', sorted(glob.glob(os.path.join(FIXTURES, '*.dssp'))),
+                         ids=os.path.basename)
+def test_fixture_matches_golden(golden, dssp_file):
+    _, entry = benchmark.benchmark_structure(dssp_file, golden, repeat=1, layout=False)
+    assert entry['golden'] == {'status': 'match', 'mismatches': []}
+
+
+def test_golden_mismatch_is_reported(golden):
+    key = next(k for k in golden if k[0] == 'SYN_CANONICAL')
+    changed = dict(golden)
+    changed[key] = dict(golden[key], strand_directions='↓')
+    dssp_file = os.path.join(FIXTURES, 'SYN_CANONICAL.dssp')
+    _, entry = benchmark.benchmark_structure(dssp_file, changed, repeat=1, layout=False)
+    assert entry['golden']['status'] == 'mismatch'
+    assert [m['column'] for m in entry['golden']['mismatches']] == ['strand_directions']
+
+
+def test_classifier_matches_golden(golden):
+    assert benchmark.benchmark_classifier(golden, repeat=1)['status'] == 'match'
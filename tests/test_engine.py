@@ -0,0 +1,88 @@
+"""Stateless topology engine: distance matrices, cropping, analysis"""
+
+import numpy as np
+import pytest
+from scipy.spatial import distance_matrix
+
+import synthetic
+from analyzer import MTaseAnalyzer, engine
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    dssp_file = str(tmp_path / 'synthetic.dssp')
+    synthetic.write_dssp(dssp_file, synthetic.synthetic_structure(strands=9, helices=12, insertions={5: 50}))
+    analyzer = MTaseAnalyzer()
+    analyzer.load_dssp(dssp_file)
+    analyzer.find_all_strands()
+    return analyzer
+
+
+@pytest.fixture
+def snapshot(analyzer):
+    return analyzer.snapshot()
+
+
+def dense_min_distances(snapshot, rows_a, rows_b):
+    full = distance_matrix(snapshot.coords[np.concatenate(rows_a)], snapshot.coords[np.concatenate(rows_b)])
+    a_bounds = np.cumsum([0] + [len(r) for r in rows_a[:-1]])
+    b_bounds = np.cumsum([0] + [len(r) for r in rows_b[:-1]])
+    return np.minimum.reduceat(np.minimum.reduceat(full, a_bounds, axis=0), b_bounds, axis=1)
+
+
+@pytest.mark.parametrize('block_size', [1, 40, engine.BLOCK_SIZE])
+def test_blocked_min_distances_equal_the_dense_matrix(snapshot, monkeypatch, block_size):
+    monkeypatch.setattr(engine, 'BLOCK_SIZE', block_size)
+    strand_ids, helix_ids = snapshot.chain_strand_ids('A'), snapshot.chain_helix_ids('A')
+    s_rows = [snapshot.strand_rows[i] for i in strand_ids]
+    h_rows = [snapshot.helix_rows[i] for i in helix_ids]
+
+    assert np.array_equal(engine.strand_min_distances(snapshot, strand_ids),
+                          dense_min_distances(snapshot, s_rows, s_rows))
+    centers, min_dist = engine.helix_strand_distances(snapshot, helix_ids, strand_ids)
+    assert np.array_equal(min_dist, dense_min_distances(snapshot, h_rows, s_rows))
+    assert centers.shape == min_dist.shape
+
+
+def test_cropped_analysis_does_not_build_chain_matrices(analyzer, snapshot):
+    motifs = analyzer.find_all_motifs()
+    params = engine.TopologyParams(crop_radius=15.0)
+    geometry = engine.SnapshotGeometry(snapshot)
+    results = [engine.analyze_snapshot(snapshot, m, params, geometry) for m in motifs]
+    directions = [engine.s2_direction(snapshot, m, params, geometry) for m in motifs]
+    assert not geometry._strands and not geometry._helices
+
+    # Same results as with the chain matrices already cached, and without geometry
+    cached = engine.SnapshotGeometry(snapshot)
+    cached.strand_distances('A')
+    cached.helix_distances('A')
+    assert results == [engine.analyze_snapshot(snapshot, m, params, cached) for m in motifs]
+    assert results == [engine.analyze_snapshot(snapshot, m, params) for m in motifs]
+    assert directions == [engine.s2_direction(snapshot, m, params, cached) for m in motifs]
+    assert any(r is not None for r in results)
+
+
+def test_retained_structure_survives_the_next_load(tmp_path):
+    first, second = str(tmp_path / 'first.dssp'), str(tmp_path / 'second.dssp')
+    synthetic.write_dssp(first, synthetic.synthetic_structure())
+    synthetic.write_dssp(second, synthetic.synthetic_structure(strands=9, helices=12, insertions={5: 50}))
+    fresh = MTaseAnalyzer()
+    fresh.load_dssp(first)
+    fresh.find_all_strands()
+    expected = [engine.analyze_snapshot(fresh.snapshot(), m, fresh.params()) for m in fresh.find_all_motifs()]
+
+    analyzer = MTaseAnalyzer(reuse_buffers=True)
+    analyzer.load_dssp(first)
+    analyzer.find_all_strands()
+    res_data, snapshot, params = analyzer.res_data, analyzer.snapshot(), analyzer.params()
+    motifs = analyzer.find_all_motifs()
+    results = [engine.analyze_snapshot(snapshot, m, params) for m in motifs]
+    assert results == expected and any(r is not None for r in results)
+
+    analyzer.reset().load_dssp(second)
+    analyzer.find_all_strands()
+    analyzer.snapshot()
+    assert np.array_equal(snapshot.coords, fresh.snapshot().coords)
+    assert [engine.analyze_snapshot(snapshot, m, params) for m in motifs] == expected
+    # Coordinates of res_data live in the reused buffer: the old dict is emptied, not overwritten
+    assert res_data == {}
@@ -0,0 +1,23 @@
+"""Sequence prefilter of batch_analyze on synthetic PDB files"""
+
+import batch_analyze
+from analyzer import MOTIF_PATTERNS
+from synthetic import synthetic_structure, write_pdb
+
+
+def test_synthetic_pdb_passes_the_prefilter(tmp_path):
+    structure = synthetic_structure(chains=2)
+    pdb_file = str(tmp_path / 'synthetic.pdb')
+    write_pdb(pdb_file, structure)
+
+    sequences = batch_analyze.pdb_chain_sequences(pdb_file)
+    assert sequences == {chain: ''.join(aa for aa, _, _ in residues) for chain, residues in structure.items()}
+    assert batch_analyze.sequence_motif_chains(sequences, MOTIF_PATTERNS) == ['A', 'B']
+
+
+def test_ca_only_model_has_no_sequence(tmp_path):
+    pdb_file = tmp_path / 'ca_only.pdb'
+    write_pdb(str(pdb_file), synthetic_structure())
+    pdb_file.write_text(''.join(line for line in pdb_file.read_text().splitlines(keepends=True)
+                                if line[12:16].strip() in ('', 'CA')))
+    assert batch_analyze.pdb_chain_sequences(str(pdb_file)) == {}
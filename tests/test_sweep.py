@@ -0,0 +1,32 @@
+"""Parameter sweep over a synthetic structure"""
+
+import pytest
+
+import synthetic
+from analyzer import MTaseAnalyzer, TopologyParams, parameter_grid, strand_table
+from analyzer.chains import analyze_motifs_snapshot
+
+
+@pytest.mark.parametrize('layout', [{}, {'helices': 12, 'insertions': {5: 50}}])
+def test_helix_contacts_match_the_strand_table(tmp_path, layout):
+    dssp_file = str(tmp_path / 'synthetic.dssp')
+    synthetic.write_dssp(dssp_file, synthetic.synthetic_structure(**layout))
+    analyzer = MTaseAnalyzer()
+    analyzer.load_dssp(dssp_file)
+    analyzer.find_all_strands()
+    grid = parameter_grid(TopologyParams(), crop_radius=[None, 12.0, 18.0, 25.0], helix_radius=[10, 20, 40])
+    rows = analyzer.sweep_parameters(grid)
+    motifs = analyzer.find_all_motifs()
+    snapshot = analyzer.snapshot()
+
+    checked = 0
+    rows = iter(rows)
+    for params in grid:
+        for topology in analyze_motifs_snapshot(snapshot, motifs, params, max_workers=1):
+            row = next(rows)
+            if row['helix_contacts'] is None:
+                continue
+            table = strand_table(snapshot, topology, params)
+            assert row['helix_contacts'] == sum(len(r.hu) + len(r.hd) for r in table), params
+            checked += 1
+    assert checked
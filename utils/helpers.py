@@ -1,13 +1,22 @@
+import contextlib
 import os
 import tempfile
 import urllib.request
 import subprocess
 import stat
-import streamlit as st
+import sys
 
 # 1. Указываем путь к твоему файлу mkdssp, который лежит в корне проекта
 DSSP_BIN = os.path.join(os.getcwd(), "mkdssp")
 
+def show_error(message):
+    """Ошибка в интерфейсе Streamlit; вне приложения (streamlit не загружен) - в stdout"""
+    if 'streamlit' in sys.modules:
+        import streamlit as st
+        st.error(message)
+    else:
+        print(f"❌ {message}")
+
 # Функция для удаления строки DBREF, т.к. dssp иногда неправильно её считывает и выдает ошибку, сама строка не несет информации необходимой
 def clean_pdb_file(pdb_path):
     """Удаляет строки DBREF и REMARK из PDB файла"""
@@ -21,8 +30,11 @@ def clean_pdb_file(pdb_path):
     
     return pdb_path
 
-def download_structure(identifier, source='pdb'):
-    """Загрузка структуры и запуск локального DSSP"""
+def download_structure(identifier, source='pdb', in_flight=contextlib.nullcontext()):
+    """
+    Загрузка структуры и запуск локального DSSP
+    in_flight - контекст, отмечающий работающий DSSP (например, metrics.InFlight)
+    """
     identifier = identifier.strip().upper()
     temp_dir = tempfile.mkdtemp()
     
@@ -40,7 +52,7 @@ def download_structure(identifier, source='pdb'):
         clean_pdb_file(pdb_file)
         
     except Exception as e:
-        st.error(f"Ошибка загрузки: {e}")
+        show_error(f"Ошибка загрузки: {e}")
         return None
     
     dssp_file = os.path.join(temp_dir, f"{identifier}.dssp")
@@ -53,7 +65,7 @@ def download_structure(identifier, source='pdb'):
         except Exception as e:
             print(f"Предупреждение chmod: {e}")
     else:
-        st.error("Файл mkdssp не найден в корне проекта!")
+        show_error("Файл mkdssp не найден в корне проекта!")
         return None
 
     # Создаем копию окружения и добавляем текущую папку в путь поиска библиотек
@@ -62,14 +74,15 @@ def download_structure(identifier, source='pdb'):
 
 
 
-    result = subprocess.run(
-        [DSSP_BIN, pdb_file, dssp_file], 
-        capture_output=True, 
-        text=True, env=env
-    )
+    with in_flight:
+        result = subprocess.run(
+            [DSSP_BIN, pdb_file, dssp_file], 
+            capture_output=True, 
+            text=True, env=env
+        )
     
     if result.returncode != 0:
-        st.error(f"DSSP Error: {result.stderr}")
+        show_error(f"DSSP Error: {result.stderr}")
         return None
         
     return {
@@ -79,8 +92,8 @@ def download_structure(identifier, source='pdb'):
         'source': source
     }
 
-def parse_uploaded_file(uploaded_file):
-    """Обработка загруженного PDB файла"""
+def parse_uploaded_file(uploaded_file, in_flight=contextlib.nullcontext()):
+    """Обработка загруженного PDB файла (in_flight - как в download_structure)"""
     temp_dir = tempfile.mkdtemp()
     
     pdb_file = os.path.join(temp_dir, uploaded_file.name)
@@ -97,14 +110,15 @@ def parse_uploaded_file(uploaded_file):
     env = os.environ.copy()
     env["LD_LIBRARY_PATH"] = os.getcwd() + ":" + env.get("LD_LIBRARY_PATH", "")
     # Запуск
-    result = subprocess.run(
-        [DSSP_BIN, pdb_file, dssp_file], 
-        capture_output=True, 
-        text=True, env=env
-    )
+    with in_flight:
+        result = subprocess.run(
+            [DSSP_BIN, pdb_file, dssp_file], 
+            capture_output=True, 
+            text=True, env=env
+        )
     
     if result.returncode != 0:
-        st.error(f"DSSP Error: {result.stderr}")
+        show_error(f"DSSP Error: {result.stderr}")
         return None
     
     return {